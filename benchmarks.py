@@ -0,0 +1,318 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Benchmarks de las partes más costosas del juego.
+
+Se ejecutan con el driver de vídeo "dummy" de SDL, así que no abren ninguna
+ventana y funcionan igual en CI. Los resultados se guardan en JSON para poder
+compararlos entre commits:
+
+    python benchmarks.py --salida base.json
+    python benchmarks.py --salida nuevo.json --comparar base.json
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from main import (
+    Ball, PlayerPaddle, OpponentPaddle, Particle, Match, SceneManager, MatchScene,
+    ANCHO_PANTALLA, ALTO_PANTALLA, TAMANO_BOLA, ANCHO_PALA, ALTO_PALA, VELOCIDAD_JUGADOR,
+    BLANCO, ENTRADA_ARRIBA, ENTRADA_ABAJO,
+)
+from entorno import PongEnv, VectorPongEnv
+from multibola import MultiBallField
+from particulas import ParticlePool, VIDA_PARTICULA
+from simulacion import VectorizedMatches
+
+# Tiempo mínimo que se mide cada benchmark en cada repetición
+TIEMPO_MINIMO = 0.2
+REPETICIONES = 5
+
+
+def medir(funcion, preparar=None):
+    """
+    Ejecuta `funcion` en bucle durante al menos TIEMPO_MINIMO segundos, REPETICIONES
+    veces, y devuelve la mejor cifra de segundos por llamada.
+    """
+    mejor = float("inf")
+    for _ in range(REPETICIONES):
+        if preparar is not None:
+            preparar()
+        llamadas = 0
+        inicio = time.perf_counter()
+        transcurrido = 0.0
+        while transcurrido < TIEMPO_MINIMO:
+            for _ in range(100):
+                funcion()
+            llamadas += 100
+            transcurrido = time.perf_counter() - inicio
+        mejor = min(mejor, transcurrido / llamadas)
+    return mejor
+
+
+def mejor_de(funcion):
+    """Para benchmarks que miden una tarea larga: la mejor de REPETICIONES ejecuciones de `funcion`."""
+    return min(funcion() for _ in range(REPETICIONES))
+
+
+def nueva_bola():
+    return Ball(ANCHO_PANTALLA / 2 - TAMANO_BOLA / 2, ALTO_PANTALLA / 2 - TAMANO_BOLA / 2, TAMANO_BOLA, 7)
+
+
+def nuevas_palas():
+    jugador = PlayerPaddle(ANCHO_PANTALLA - ANCHO_PALA - 20, ALTO_PANTALLA / 2 - ALTO_PALA / 2,
+                           ANCHO_PALA, ALTO_PALA, VELOCIDAD_JUGADOR)
+    oponente = OpponentPaddle(20, ALTO_PANTALLA / 2 - ALTO_PALA / 2, ANCHO_PALA, ALTO_PALA, 7)
+    return jugador, oponente
+
+
+def bench_ball_move_swept():
+    """Un paso de la bola con colisiones continuas, como en Match.step."""
+    ball = nueva_bola()
+    palas = nuevas_palas()
+
+    def paso():
+        ball.move_swept(palas, None)
+        # Mantenemos la bola dentro de la pantalla
+        if not 0 < ball.rect.x < ANCHO_PANTALLA - TAMANO_BOLA:
+            ball.reset()
+    return medir(paso)
+
+
+def bench_ball_bounce():
+    ball = nueva_bola()
+    jugador, _ = nuevas_palas()
+    pool = ParticlePool(capacity=512, rng=0)
+
+    def rebote():
+        ball.speed_x = 7
+        ball.bounce(jugador, pool)
+    return medir(rebote)
+
+
+def bench_particulas_pool(cantidad):
+    """
+    Régimen estable con unas `cantidad` partículas vivas: en cada actualización
+    se lanzan las que mueren, como si la bola rebotara sin parar.
+    """
+    pool = ParticlePool(capacity=cantidad, rng=0)
+    por_fotograma = max(1, cantidad // VIDA_PARTICULA)
+
+    def paso():
+        pool.emit(400, 300, 1, por_fotograma)
+        pool.update()
+
+    def llenar():
+        pool.clear()
+        # Edades repartidas, como tras un rato de partida
+        for _ in range(VIDA_PARTICULA):
+            paso()
+    return medir(paso, preparar=llenar)
+
+
+def bench_particulas_lista(cantidad):
+    """La implementación original (un objeto por partícula) como referencia, en el mismo régimen."""
+    estado = {}
+    por_fotograma = max(1, cantidad // VIDA_PARTICULA)
+
+    def paso():
+        particulas = estado["particulas"]
+        particulas.extend(Particle(400, 300, 1) for _ in range(por_fotograma))
+        for particula in particulas:
+            particula.update()
+        estado["particulas"] = [p for p in particulas if p.lifespan > 0]
+
+    def llenar():
+        estado["particulas"] = []
+        for _ in range(VIDA_PARTICULA):
+            paso()
+    return medir(paso, preparar=llenar)
+
+
+def bench_ball_draw(pantalla):
+    ball = nueva_bola()
+    palas = nuevas_palas()
+    for _ in range(ball.trail.maxlen):
+        ball.move_swept(palas, None)
+    return medir(lambda: ball.draw(pantalla))
+
+
+def bench_fotograma(pantalla, fuentes):
+    """Coste de dibujar y presentar un fotograma completo de MatchScene."""
+    juego = SceneManager(pantalla, fuentes)
+    escena = MatchScene(juego, partida=Match("medio", seed=0))
+    for _ in range(30):
+        escena.partida.step(0)
+    escena.partida.particles.emit(400, 300, 1, 15)
+
+    def fotograma():
+        escena.draw(pantalla)
+        escena.present()
+    return medir(fotograma)
+
+
+def entrada_perseguidora(partida):
+    """Un jugador automático sencillo: mueve la pala hacia la bola."""
+    diferencia = partida.ball.rect.centery - partida.player.rect.centery
+    if diferencia < -VELOCIDAD_JUGADOR:
+        return ENTRADA_ARRIBA
+    if diferencia > VELOCIDAD_JUGADOR:
+        return ENTRADA_ABAJO
+    return 0
+
+
+def bench_partida_sin_ventana(max_pasos=200_000):
+    """Pasos de simulación por segundo de una partida completa con Match."""
+    def partida_completa():
+        partida = Match("medio", seed=0, efectos=False)
+        inicio = time.perf_counter()
+        while partida.ganador() is None and partida.pasos < max_pasos:
+            partida.step(entrada_perseguidora(partida))
+        return (time.perf_counter() - inicio) / partida.pasos
+    return mejor_de(partida_completa)
+
+
+def bench_simulacion_vectorizada(partidas=10_000, pasos=200):
+    """Fotogramas simulados por segundo con el motor vectorizado."""
+    sim = VectorizedMatches(partidas, seed=0)
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        sim.step()
+    return (time.perf_counter() - inicio) / (partidas * pasos)
+
+
+def bench_multibola(bolas=500):
+    """Un paso del modo multibola: movimiento, palas, obstáculos y choques entre bolas."""
+    campo = MultiBallField(capacity=2 * bolas, ancho=ANCHO_PANTALLA, alto=ALTO_PANTALLA, rng=0)
+    campo.start(bolas)
+    jugador, oponente = nuevas_palas()
+    palas = (jugador.rect, oponente.rect)
+    return medir(lambda: campo.step(palas))
+
+
+def bench_multibola_draw(pantalla, bolas=500):
+    campo = MultiBallField(capacity=2 * bolas, ancho=ANCHO_PANTALLA, alto=ALTO_PANTALLA, rng=0)
+    campo.start(bolas)
+    sprite = Ball.sprites.ellipse(TAMANO_BOLA, TAMANO_BOLA, BLANCO)
+    return medir(lambda: campo.draw(pantalla, sprite))
+
+
+def bench_entorno(pixeles=False):
+    """Pasos por segundo del entorno de RL, con vector de estado o con píxeles."""
+    entorno = PongEnv(seed=0, pixeles=pixeles, escala=4)
+    entorno.reset()
+
+    def paso():
+        *_, terminado, truncado, _ = entorno.step(1)
+        if terminado or truncado:
+            entorno.reset()
+    return medir(paso)
+
+
+def bench_entorno_vectorizado(n=256, pasos=100):
+    """Pasos por segundo y por entorno de VectorPongEnv."""
+    entornos = VectorPongEnv(n, seed=0)
+    entornos.reset()
+    acciones = np.ones(n, dtype=np.int64)
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        entornos.step(acciones)
+    return (time.perf_counter() - inicio) / (n * pasos)
+
+
+def ejecutar():
+    pygame.init()
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuentes = {
+        "titulo": pygame.font.Font(None, 74),
+        "boton": pygame.font.Font(None, 50),
+        "juego": pygame.font.Font(None, 74),
+        "info": pygame.font.Font(None, 24),
+    }
+
+    benchmarks = {
+        "ball_move_swept": bench_ball_move_swept,
+        "ball_bounce_con_particulas": bench_ball_bounce,
+        "ball_draw_con_estela": lambda: bench_ball_draw(pantalla),
+        "fotograma_completo": lambda: bench_fotograma(pantalla, fuentes),
+        "partida_sin_ventana_por_paso": bench_partida_sin_ventana,
+        "simulacion_vectorizada_por_fotograma": bench_simulacion_vectorizada,
+        "multibola_500_por_paso": bench_multibola,
+        "multibola_500_draw": lambda: bench_multibola_draw(pantalla),
+        "entorno_rl_por_paso": bench_entorno,
+        "entorno_rl_pixeles_por_paso": lambda: bench_entorno(pixeles=True),
+        "entorno_rl_vectorizado_por_paso": bench_entorno_vectorizado,
+    }
+    for cantidad in (100, 1_000, 10_000):
+        benchmarks[f"particulas_pool_{cantidad}"] = lambda c=cantidad: bench_particulas_pool(c)
+        benchmarks[f"particulas_lista_{cantidad}"] = lambda c=cantidad: bench_particulas_lista(c)
+
+    resultados = {}
+    for nombre, benchmark in benchmarks.items():
+        segundos = benchmark()
+        resultados[nombre] = {"segundos_por_op": segundos, "ops_por_segundo": 1 / segundos}
+        print(f"{nombre:<40}{segundos * 1e6:12.2f} µs/op {1 / segundos:14,.0f} op/s")
+    pygame.quit()
+    return resultados
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultados, base, tolerancia):
+    """Devuelve los benchmarks que son más lentos que en `base` por encima de la tolerancia."""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        ratio = actual["segundos_por_op"] / anterior["segundos_por_op"]
+        marca = "  <-- más lento" if ratio > 1 + tolerancia else ""
+        print(f"{nombre:<40}{ratio:8.2f}x{marca}")
+        if marca:
+            regresiones.append(nombre)
+    return regresiones
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks del juego de tenis")
+    parser.add_argument("--salida", default="benchmarks.json", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", metavar="BASE", help="JSON de una ejecución anterior con la que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="ralentización permitida antes de considerar una regresión (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = ejecutar()
+    with open(args.salida, "w") as archivo:
+        json.dump({
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }, archivo, indent=2)
+
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            base = json.load(archivo)["resultados"]
+        regresiones = comparar(resultados, base, args.tolerancia)
+        if regresiones:
+            print(f"Regresiones de rendimiento: {', '.join(regresiones)}")
+            sys.exit(1)
@@ -0,0 +1,103 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Control adaptativo de la calidad gráfica.
+
+La física avanza a paso fijo, así que un equipo lento no ralentiza el juego,
+pero sí baja los fotogramas por segundo. `QualityController` mide cuánto
+tarda de verdad cada fotograma (hasta justo antes del flip, sin la espera
+de `tick` ni la del vsync) y, si se acerca al presupuesto de un fotograma a 60 FPS, baja un
+nivel de calidad; cuando sobra tiempo durante un buen rato, lo vuelve a
+subir. Los umbrales distintos para bajar y para subir, la espera tras cada
+cambio y las varias ventanas seguidas que hacen falta para subir evitan que
+la calidad oscile de un nivel a otro.
+"""
+import numpy as np
+
+# Niveles de calidad, del mejor al más barato.
+# "particulas": fracción de las partículas de cada golpe que se generan.
+# "estela": posiciones de la estela de la bola (LONGITUD_ESTELA en main.py es 10).
+# "antialias": línea central y textos con suavizado.
+# "transparencias": paneles semitransparentes (p. ej. el del perfilador).
+NIVELES_CALIDAD = {
+    "alta": {"particulas": 1.0, "estela": 10, "antialias": True, "transparencias": True},
+    "media": {"particulas": 0.5, "estela": 6, "antialias": True, "transparencias": True},
+    "baja": {"particulas": 0.25, "estela": 3, "antialias": False, "transparencias": True},
+    "minima": {"particulas": 0.0, "estela": 0, "antialias": False, "transparencias": False},
+}
+NOMBRES_CALIDAD = tuple(NIVELES_CALIDAD)
+
+FPS_OBJETIVO = 60
+# Fotogramas que se miden antes de decidir
+VENTANA = 30
+# Se baja de nivel si el percentil 90 supera esta fracción del presupuesto...
+UMBRAL_BAJAR = 0.9
+# ...y se sube si queda por debajo de esta durante VENTANAS_PARA_SUBIR ventanas seguidas
+UMBRAL_SUBIR = 0.5
+VENTANAS_PARA_SUBIR = 4
+# Ventanas que se ignoran tras un cambio, mientras el nuevo nivel se estabiliza
+VENTANAS_ESPERA = 2
+
+
+class QualityController:
+    """
+    Nivel de calidad actual y su ajuste automático. Con `automatico=False` el
+    nivel queda fijo en `nivel`.
+    """
+    def __init__(self, nivel="alta", automatico=True, fps_objetivo=FPS_OBJETIVO, ventana=VENTANA):
+        self.indice = NOMBRES_CALIDAD.index(nivel)
+        self.automatico = automatico
+        self.presupuesto = 1000 / fps_objetivo
+        self.tiempos = np.zeros(ventana)
+        self._medidos = 0
+        self._espera = 0
+        self._ventanas_holgadas = 0
+        # Cambios de nivel realizados (para pruebas y diagnóstico)
+        self.cambios = 0
+
+    @property
+    def nombre(self):
+        return NOMBRES_CALIDAD[self.indice]
+
+    @property
+    def ajustes(self):
+        return NIVELES_CALIDAD[self.nombre]
+
+    def record(self, milisegundos):
+        """
+        Registra el tiempo real de un fotograma en milisegundos. Devuelve True si
+        el nivel de calidad ha cambiado.
+        """
+        if not self.automatico:
+            return False
+        self.tiempos[self._medidos] = milisegundos
+        self._medidos += 1
+        if self._medidos < len(self.tiempos):
+            return False
+        self._medidos = 0
+        if self._espera:
+            self._espera -= 1
+            return False
+
+        p90 = float(np.percentile(self.tiempos, 90))
+        if p90 > self.presupuesto * UMBRAL_BAJAR:
+            self._ventanas_holgadas = 0
+            return self._cambiar(+1)
+        if p90 < self.presupuesto * UMBRAL_SUBIR:
+            self._ventanas_holgadas += 1
+            if self._ventanas_holgadas >= VENTANAS_PARA_SUBIR:
+                self._ventanas_holgadas = 0
+                return self._cambiar(-1)
+        else:
+            self._ventanas_holgadas = 0
+        return False
+
+    def _cambiar(self, paso):
+        indice = min(max(self.indice + paso, 0), len(NOMBRES_CALIDAD) - 1)
+        if indice == self.indice:
+            return False
+        self.indice = indice
+        self.cambios += 1
+        self._espera = VENTANAS_ESPERA
+        return True
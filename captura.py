@@ -0,0 +1,297 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Grabación en vídeo de lo que se ve en la pantalla.
+
+Guardar cada fotograma desde el bucle del juego lo frenaría, así que el bucle
+solo copia los píxeles de la pantalla (una vista de `pygame.surfarray`, sin
+crear superficies) a uno de los búferes de un anillo reservado de antemano, y
+un hilo aparte los comprime y los escribe en disco. Si el hilo se retrasa y no queda ningún búfer libre, el fotograma se
+descarta (y se avisa) en lugar de esperar. Solo se graban los fotogramas que
+de verdad se han presentado.
+
+Sin comprimir serían unos 115 MB por segundo a 60 FPS. Como la pantalla es casi
+toda negra y entre un fotograma y el siguiente solo se mueven la bola y las
+palas, cada fotograma se combina con XOR con el anterior (lo que no cambia queda
+a cero) y se codifica por longitud de racha. Por defecto se guardan los píxeles
+tal cual, a tamaño completo, y la grabación es exacta. Con `ligera=True` cada
+fotograma se reduce a 1/ESCALA_LIGERA en cada eje y se pasa a una paleta de 256
+colores (RGB 3-3-2), lo que pierde detalle y colores pero ocupa unas 4 veces
+menos. Cada INTERVALO_CLAVE fotogramas se guarda uno completo (XOR con negro),
+para poder saltar a cualquier punto sin decodificar la grabación desde el
+principio.
+
+En `video.bin` cada fotograma es una cabecera "<BI" (si es clave, número de
+rachas) seguida de la longitud de cada racha (uint32) y de su valor (el píxel
+como uint32, o su índice en la paleta como uint8). `indice.csv` dice qué fotograma es cada uno, en qué momento se tomó y dónde
+empieza, y `video.json` describe el formato. Después, sin prisa:
+
+    python captura.py grabacion/ --png      # un PNG por fotograma en grabacion/png/
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+
+# Búferes del anillo: con 8, el escritor puede ir hasta 8 fotogramas por detrás
+CAPACIDAD = 8
+# En una grabación ligera cada fotograma se guarda reducido a 1/ESCALA_LIGERA en cada eje
+ESCALA_LIGERA = 2
+# Un fotograma completo cada tantos (los demás son diferencias con el anterior)
+INTERVALO_CLAVE = 60
+# Como mucho un aviso por segundo mientras se descartan fotogramas
+SEGUNDOS_ENTRE_AVISOS = 1
+
+ARCHIVO_VIDEO = "video.bin"
+ARCHIVO_INDICE = "indice.csv"
+ARCHIVO_INFO = "video.json"
+
+CABECERA_FOTOGRAMA = struct.Struct("<BI")
+
+
+def a_paleta(pixeles, shifts):
+    """Convierte píxeles de 32 bits al índice de su color en la paleta RGB 3-3-2."""
+    # Cada canal es uno de los 4 bytes del píxel: se trabaja con bytes, no con enteros de 32 bits
+    canales = pixeles.view(np.uint8).reshape(pixeles.shape + (4,))
+    if sys.byteorder == "big":
+        canales = canales[..., ::-1]
+    r, g, b = (canales[..., shift // 8] for shift in shifts[:3])
+    paleta = r & 0xE0
+    paleta |= (g & 0xE0) >> 3
+    paleta |= b >> 6
+    return paleta
+
+
+def a_rgb(pixeles, shifts):
+    """Convierte píxeles de 32 bits (como enteros) a un array (..., 3) de RGB."""
+    desplazamientos = np.array(shifts[:3], dtype=np.uint32)
+    return ((pixeles[..., None] >> desplazamientos) & 0xFF).astype(np.uint8)
+
+
+def paleta_rgb():
+    """Color RGB de cada uno de los 256 índices de la paleta, como array (256, 3)."""
+    indices = np.arange(256)
+    return np.stack([(indices >> 5) * 255 // 7, (indices >> 2 & 7) * 255 // 7, (indices & 3) * 255 // 3],
+                    axis=1).astype(np.uint8)
+
+
+def codificar_rachas(valores):
+    """(longitudes, valores) de las rachas de valores iguales de un array 1D."""
+    cambios = np.flatnonzero(valores[1:] != valores[:-1]) + 1
+    inicios = np.concatenate(([0], cambios))
+    longitudes = np.diff(np.append(inicios, valores.size)).astype(np.uint32)
+    return longitudes, valores[inicios]
+
+
+class FrameRecorder:
+    """
+    Graba en `carpeta` los fotogramas que se le pasan con `capture`. `pantalla`
+    fija el tamaño y el formato de píxel, que debe ser de 32 bits. Con `ligera`
+    se graban reducidos y en la paleta de 256 colores, con pérdida.
+    """
+    def __init__(self, pantalla, carpeta, capacidad=CAPACIDAD, ligera=False):
+        if pantalla.get_bytesize() != 4:
+            raise ValueError("La grabación necesita una pantalla de 32 bits por píxel")
+        self.carpeta = carpeta
+        self.ligera = ligera
+        self.escala = ESCALA_LIGERA if ligera else 1
+        escala = self.escala
+        ancho, alto = pantalla.get_size()
+        self.ancho, self.alto = -(-ancho // escala), -(-alto // escala)
+        self.shifts = pantalla.get_shifts()
+        # Un fotograma por búfer, fila a fila como en la memoria de la superficie
+        self._anillo = np.empty((capacidad, self.alto, self.ancho), dtype=np.uint32)
+        # Se escribe ya para que el sistema reserve las páginas ahora y no durante la partida
+        self._anillo.fill(0)
+        self._libres = queue.Queue(capacidad)
+        for i in range(capacidad):
+            self._libres.put(i)
+        # Búferes ya copiados, pendientes de escribir: (búfer, número de fotograma, segundos)
+        self._llenos = queue.Queue(capacidad)
+        # Último fotograma escrito (en la paleta si es ligera), del que el siguiente guarda las diferencias
+        self._anterior = np.zeros((self.alto, self.ancho), dtype=np.uint8 if ligera else np.uint32)
+        self._hilo = None
+        self._inicio = None
+        self._ultimo_aviso = 0.0
+        # Estadísticas
+        self.fotogramas = 0
+        self.escritos = 0
+        self.descartados = 0
+        self.bytes_escritos = 0
+
+    def start(self):
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._video = open(os.path.join(self.carpeta, ARCHIVO_VIDEO), "wb")
+        self._indice = open(os.path.join(self.carpeta, ARCHIVO_INDICE), "w", newline="")
+        self._indice.write("fotograma,segundos,posicion\n")
+        self._inicio = time.perf_counter()
+        self._hilo = threading.Thread(target=self._escribir, name="captura", daemon=True)
+        self._hilo.start()
+        return self
+
+    def capture(self, pantalla):
+        """Copia el fotograma actual. Devuelve False si se ha descartado."""
+        numero = self.fotogramas
+        self.fotogramas += 1
+        try:
+            bufer = self._libres.get_nowait()
+        except queue.Empty:
+            self._descartar()
+            return False
+        # La vista bloquea la superficie: se suelta en cuanto se ha copiado
+        vista = pygame.surfarray.pixels2d(pantalla)
+        np.copyto(self._anillo[bufer], vista[::self.escala, ::self.escala].T)
+        del vista
+        # Nunca espera: hay tantos huecos en la cola como búferes
+        self._llenos.put((bufer, numero, time.perf_counter() - self._inicio))
+        return True
+
+    def _descartar(self):
+        self.descartados += 1
+        ahora = time.perf_counter()
+        if ahora - self._ultimo_aviso >= SEGUNDOS_ENTRE_AVISOS:
+            self._ultimo_aviso = ahora
+            print(f"¡Advertencia! La grabación de vídeo va retrasada: {self.descartados} "
+                  f"fotogramas descartados de {self.fotogramas}.")
+
+    def _comprimir(self, pixeles):
+        """Bytes de un fotograma: clave (XOR con negro) o diferencias con el anterior escrito."""
+        actual = a_paleta(pixeles, self.shifts) if self.ligera else pixeles.copy()
+        clave = self.escritos % INTERVALO_CLAVE == 0
+        diferencias = actual if clave else actual ^ self._anterior
+        self._anterior = actual
+        longitudes, valores = codificar_rachas(diferencias.ravel())
+        return CABECERA_FOTOGRAMA.pack(clave, len(longitudes)) + longitudes.tobytes() + valores.tobytes()
+
+    def _escribir(self):
+        while True:
+            elemento = self._llenos.get()
+            if elemento is None:
+                break
+            bufer, numero, segundos = elemento
+            # Las operaciones de NumPy y write sueltan el GIL, así que el juego sigue a su ritmo
+            datos = self._comprimir(self._anillo[bufer])
+            self._libres.put(bufer)
+            self._indice.write(f"{numero},{segundos:.4f},{self.bytes_escritos}\n")
+            self._video.write(datos)
+            self.bytes_escritos += len(datos)
+            self.escritos += 1
+
+    def close(self):
+        """Espera a que se escriban los fotogramas pendientes y cierra los archivos."""
+        if self._hilo is None:
+            return
+        self._llenos.put(None)
+        self._hilo.join()
+        self._hilo = None
+        self._video.close()
+        self._indice.close()
+        segundos = time.perf_counter() - self._inicio
+        with open(os.path.join(self.carpeta, ARCHIVO_INFO), "w") as archivo:
+            json.dump({
+                "ancho": self.ancho,
+                "alto": self.alto,
+                "escala": self.escala,
+                "paleta": self.ligera,
+                "shifts": list(self.shifts),
+                "formato": ("paleta rgb332" if self.ligera else "rgb32") + ", xor con el anterior, rachas",
+                "intervalo_clave": INTERVALO_CLAVE,
+                "fotogramas": self.fotogramas,
+                "escritos": self.escritos,
+                "descartados": self.descartados,
+                "bytes": self.bytes_escritos,
+                "segundos": segundos,
+            }, archivo, indent=2)
+        if self.descartados:
+            print(f"Grabación de vídeo: {self.descartados} de {self.fotogramas} fotogramas descartados.")
+
+
+def leer_captura(carpeta):
+    """
+    Devuelve (info, fotogramas, indice): `fotogramas` da acceso a cada fotograma como
+    array (alto, ancho, 3) de RGB, decodificado al acceder a él, e `indice` es un
+    array con el número de fotograma, los segundos y la posición de cada uno.
+    """
+    with open(os.path.join(carpeta, ARCHIVO_INFO)) as archivo:
+        info = json.load(archivo)
+    datos = np.memmap(os.path.join(carpeta, ARCHIVO_VIDEO), dtype=np.uint8, mode="r") if info["bytes"] else b""
+    with open(os.path.join(carpeta, ARCHIVO_INDICE), newline="") as archivo:
+        filas = list(csv.reader(archivo))[1:]
+    indice = np.array([(int(numero), float(segundos), int(posicion)) for numero, segundos, posicion in filas])
+    return info, _RgbFrames(datos, indice.reshape(-1, 3), info), indice.reshape(-1, 3)
+
+
+class _RgbFrames:
+    """Decodifica cada fotograma al acceder a él, desde el fotograma clave anterior."""
+    def __init__(self, datos, indice, info):
+        self.datos = datos
+        self.posiciones = indice[:, 2].astype(np.int64)
+        self.forma = (info["alto"], info["ancho"])
+        self.intervalo_clave = info["intervalo_clave"]
+        # Las grabaciones anteriores a la opción sin pérdida eran todas con paleta
+        self.paleta = info.get("paleta", True)
+        self.tipo = np.uint8 if self.paleta else np.uint32
+        self.colores = paleta_rgb()
+        self.shifts = info.get("shifts")
+        # Último fotograma decodificado, para que recorrerlos en orden no repita trabajo
+        self._cache = (None, None)
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def _diferencias(self, i):
+        posicion = int(self.posiciones[i])
+        _, rachas = CABECERA_FOTOGRAMA.unpack_from(self.datos, posicion)
+        posicion += CABECERA_FOTOGRAMA.size
+        longitudes = np.frombuffer(self.datos, np.uint32, rachas, posicion)
+        valores = np.frombuffer(self.datos, self.tipo, rachas, posicion + 4 * rachas)
+        return np.repeat(valores, longitudes).reshape(self.forma)
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        anterior, pixeles = self._cache
+        inicio = i - i % self.intervalo_clave
+        if anterior is not None and inicio <= anterior < i:
+            inicio = anterior + 1
+        else:
+            pixeles = None
+        for j in range(inicio, i + 1):
+            diferencias = self._diferencias(j)
+            pixeles = diferencias if pixeles is None else pixeles ^ diferencias
+        self._cache = (i, pixeles)
+        return self.colores[pixeles] if self.paleta else a_rgb(pixeles, self.shifts)
+
+
+def exportar_png(carpeta):
+    """Escribe cada fotograma de la grabación como PNG en `carpeta`/png."""
+    info, fotogramas, indice = leer_captura(carpeta)
+    destino = os.path.join(carpeta, "png")
+    os.makedirs(destino, exist_ok=True)
+    for i in range(len(fotogramas)):
+        # make_surface espera (ancho, alto, 3)
+        superficie = pygame.surfarray.make_surface(fotogramas[i].swapaxes(0, 1))
+        pygame.image.save(superficie, os.path.join(destino, f"fotograma-{int(indice[i, 0]):06d}.png"))
+    return len(fotogramas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Utilidades para las grabaciones de vídeo del juego")
+    parser.add_argument("carpeta", help="carpeta de una grabación hecha con main.py --video")
+    parser.add_argument("--png", action="store_true", help="exporta cada fotograma como PNG")
+    args = parser.parse_args()
+
+    info, fotogramas, indice = leer_captura(args.carpeta)
+    print(f"{info['ancho']}x{info['alto']}, {info['escritos']} fotogramas escritos, "
+          f"{info['descartados']} descartados, {info['segundos']:.1f} s, {info['bytes'] / 1e6:.1f} MB")
+    if args.png:
+        print(f"{exportar_png(args.carpeta)} PNG escritos en {os.path.join(args.carpeta, 'png')}")
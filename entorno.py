@@ -0,0 +1,238 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Entorno de aprendizaje por refuerzo con la interfaz de Gym/Gymnasium.
+
+El agente controla la pala derecha (la del jugador) contra la IA del oponente.
+Cada llamada a `step` es un paso de `Match` (las mismas `Ball`, `PlayerPaddle`
+y `OpponentPaddle` del juego), sin ventana, sin `reloj.tick` y sin la espera
+tras cada punto, así que el entorno avanza tan rápido como la CPU permita.
+
+`VectorPongEnv` avanza muchos entornos a la vez: con el vector de estado y la IA
+perseguidora los simula juntos en arrays de NumPy (`simulacion.VectorizedMatches`).
+
+Para no reservar memoria en cada paso, las observaciones se escriben siempre
+en los mismos arrays: quien quiera guardarlas (p. ej. en un replay buffer)
+debe copiarlas. Las observaciones en píxeles son una vista de
+`pygame.surfarray` sobre la superficie donde se dibuja, sin copia.
+
+    entorno = PongEnv("medio", seed=0)
+    estado, info = entorno.reset()
+    while True:
+        estado, recompensa, terminado, truncado, info = entorno.step(accion)
+"""
+import numpy as np
+import pygame
+
+from main import (
+    Match, ANCHO_PANTALLA, ALTO_PANTALLA, TAMANO_BOLA, ALTO_PALA, NEGRO, BLANCO, ENTRADA_ARRIBA, ENTRADA_ABAJO,
+)
+from simulacion import VectorizedMatches
+
+# Acciones: coinciden con los bits de entrada del jugador, así `step` no traduce nada
+QUIETA = 0
+ARRIBA = ENTRADA_ARRIBA
+ABAJO = ENTRADA_ABAJO
+ACCIONES = (QUIETA, ARRIBA, ABAJO)
+# Dirección de la pala (-1 arriba, 1 abajo) de cada entrada, para VectorizedMatches
+DIRECCIONES = np.array([0, -1, 1, 0])
+
+# Componentes del vector de estado, todas normalizadas a [-1, 1] aprox.
+ESTADO = ("bola_x", "bola_y", "bola_vx", "bola_vy", "jugador_y", "oponente_y")
+# Velocidad horizontal máxima de la bola (ver Ball.bounce), para normalizar
+VELOCIDAD_MAXIMA_BOLA = 15
+
+
+class PongEnv:
+    """
+    Una partida como entorno de RL. La recompensa es +1 cuando el agente marca
+    y -1 cuando marca el oponente. El episodio termina al llegar uno de los dos a
+    `PUNTUACION_GANADORA`, o se trunca a los `max_pasos` pasos si se indican.
+
+    Con `pixeles=True` la observación es una vista (ancho, alto, 3) de la pantalla
+    dibujada a 1/`escala` de su tamaño, en lugar del vector de estado.
+    """
+    def __init__(self, dificultad="medio", ia="perseguidora", seed=None, max_pasos=None,
+                 pixeles=False, escala=1):
+        self.dificultad = dificultad
+        self.ia = ia
+        self.max_pasos = max_pasos
+        self.pixeles = pixeles
+        self.escala = escala
+        # Semilla de cada episodio: la primera es `seed`, las siguientes salen de este generador
+        self._semillas = np.random.default_rng(seed)
+        self.partida = None
+
+        self.estado = np.zeros(len(ESTADO), dtype=np.float32)
+        self._info = {"puntuacion_jugador": 0, "puntuacion_oponente": 0, "pasos": 0}
+
+        self.pantalla = None
+        self.vista = None
+        if pixeles:
+            self.pantalla = pygame.Surface((ANCHO_PANTALLA // escala, ALTO_PANTALLA // escala))
+            self.vista = pygame.surfarray.pixels3d(self.pantalla)
+            # Las vistas bloquean la superficie mientras existen, así que no se puede
+            # usar `blit`: se dibuja escribiendo directamente en los píxeles (un entero
+            # por píxel), que además es bastante más rápido que `Surface.fill`.
+            self._pixeles = pygame.surfarray.pixels2d(self.pantalla)
+            self._negro = self.pantalla.map_rgb(NEGRO)
+            self._blanco = self.pantalla.map_rgb(BLANCO)
+            self._pixeles.fill(self._negro)
+            # Zonas pintadas en el último dibujo, lo único que hay que borrar en el siguiente
+            self._dibujados = [(0, 0, 0, 0)] * 3
+
+    def reset(self, seed=None):
+        """Empieza un episodio nuevo y devuelve (observación, info)."""
+        if seed is None:
+            seed = int(self._semillas.integers(2 ** 63))
+        self.partida = Match(self.dificultad, seed, self.ia, efectos=False)
+        return self._observar(), self._actualizar_info()
+
+    def step(self, accion):
+        """Avanza un paso con `accion` (QUIETA, ARRIBA o ABAJO)."""
+        partida = self.partida
+        marcador = partida.puntuacion_jugador - partida.puntuacion_oponente
+        recompensa = 0.0
+        if partida.step(accion):
+            recompensa = float(partida.puntuacion_jugador - partida.puntuacion_oponente - marcador)
+        terminado = partida.ganador() is not None
+        truncado = not terminado and self.max_pasos is not None and partida.pasos >= self.max_pasos
+        return self._observar(), recompensa, terminado, truncado, self._actualizar_info()
+
+    def _actualizar_info(self):
+        info, partida = self._info, self.partida
+        info["puntuacion_jugador"] = partida.puntuacion_jugador
+        info["puntuacion_oponente"] = partida.puntuacion_oponente
+        info["pasos"] = partida.pasos
+        return info
+
+    def _observar(self):
+        if self.pixeles:
+            self.render()
+            return self.vista
+        self.escribir_estado(self.estado)
+        return self.estado
+
+    def escribir_estado(self, destino):
+        """Escribe el vector de estado (ver ESTADO) en `destino`, sin reservar memoria."""
+        ball, player, opponent = self.partida.ball, self.partida.player, self.partida.opponent
+        destino[0] = ball.rect.centerx / ANCHO_PANTALLA * 2 - 1
+        destino[1] = ball.rect.centery / ALTO_PANTALLA * 2 - 1
+        destino[2] = ball.speed_x / VELOCIDAD_MAXIMA_BOLA
+        destino[3] = ball.speed_y / VELOCIDAD_MAXIMA_BOLA
+        destino[4] = player.rect.centery / ALTO_PANTALLA * 2 - 1
+        destino[5] = opponent.rect.centery / ALTO_PANTALLA * 2 - 1
+
+    def render(self):
+        """Dibuja la partida (bola y palas como rectángulos) y devuelve la vista de píxeles."""
+        pixeles, escala, blanco, dibujados = self._pixeles, self.escala, self._blanco, self._dibujados
+        for izquierda, arriba, derecha, abajo in dibujados:
+            pixeles[izquierda:derecha, arriba:abajo] = self._negro
+        for i, objeto in enumerate((self.partida.player, self.partida.opponent, self.partida.ball)):
+            rect = objeto.rect
+            # Se recorta a la pantalla: un índice negativo contaría desde el final
+            izquierda, arriba = max(rect.left // escala, 0), max(rect.top // escala, 0)
+            derecha = max(rect.right // escala, izquierda + 1)
+            abajo = max(rect.bottom // escala, arriba + 1)
+            pixeles[izquierda:derecha, arriba:abajo] = blanco
+            dibujados[i] = (izquierda, arriba, derecha, abajo)
+        return self.vista
+
+
+class VectorPongEnv:
+    """
+    `n` entornos que avanzan juntos con una sola llamada. `step` recibe un array
+    de `n` acciones y devuelve arrays (estados, recompensas, terminados, truncados);
+    los entornos que terminan se reinician solos y su fila ya es el estado inicial
+    del episodio siguiente, como en los entornos vectorizados de Gymnasium.
+
+    Con el vector de estado y la IA perseguidora, las `n` partidas se simulan en
+    arrays de NumPy con `VectorizedMatches` (`sim`), con las mismas reglas que
+    `Match.step`. Con `pixeles=True` o la IA predictiva, que necesitan una `Match`
+    por entorno, es un envoltorio síncrono: `step` recorre uno tras otro los `n`
+    PongEnv de `entornos`, y `vistas` tiene la vista de píxeles de cada uno.
+    """
+    def __init__(self, n, dificultad="medio", ia="perseguidora", seed=None, max_pasos=None,
+                 pixeles=False, escala=1):
+        dificultades = [dificultad] * n if isinstance(dificultad, str) else list(dificultad)
+        if len(dificultades) != n:
+            raise ValueError("Se necesita una dificultad por entorno")
+        self.n = n
+        self.max_pasos = max_pasos
+        self.sim = None
+        self.entornos = None
+        self.vistas = None
+        if pixeles or ia != "perseguidora":
+            semillas = np.random.SeedSequence(seed).spawn(n)
+            self.entornos = [PongEnv(d, ia, np.random.default_rng(s), max_pasos, pixeles, escala)
+                             for d, s in zip(dificultades, semillas)]
+            if pixeles:
+                self.vistas = [entorno.vista for entorno in self.entornos]
+        else:
+            # Sin la espera tras cada punto, como PongEnv
+            self.sim = VectorizedMatches(n, dificultades, seed=seed, frames_espera=0)
+
+        # Arrays de salida, reutilizados en cada paso
+        self.estados = np.zeros((n, len(ESTADO)), dtype=np.float32)
+        self.recompensas = np.zeros(n, dtype=np.float32)
+        self.terminados = np.zeros(n, dtype=bool)
+        self.truncados = np.zeros(n, dtype=bool)
+
+    def reset(self):
+        if self.sim is not None:
+            self.sim.reset()
+            self._escribir_estados()
+            return self.estados
+        for i, entorno in enumerate(self.entornos):
+            entorno.reset()
+            self._observar(i, entorno)
+        return self.estados
+
+    def _observar(self, i, entorno):
+        if entorno.pixeles:
+            entorno.render()
+        else:
+            entorno.escribir_estado(self.estados[i])
+
+    def _escribir_estados(self):
+        """Como PongEnv.escribir_estado, para todas las partidas de `sim` a la vez."""
+        sim, estados = self.sim, self.estados
+        estados[:, 0] = (sim.ball_x + TAMANO_BOLA // 2) / ANCHO_PANTALLA * 2 - 1
+        estados[:, 1] = (sim.ball_y + TAMANO_BOLA // 2) / ALTO_PANTALLA * 2 - 1
+        estados[:, 2] = sim.speed_x / VELOCIDAD_MAXIMA_BOLA
+        estados[:, 3] = sim.speed_y / VELOCIDAD_MAXIMA_BOLA
+        estados[:, 4] = (sim.player_y + ALTO_PALA // 2) / ALTO_PANTALLA * 2 - 1
+        estados[:, 5] = (sim.opponent_y + ALTO_PALA // 2) / ALTO_PANTALLA * 2 - 1
+
+    def step(self, acciones):
+        if self.sim is not None:
+            return self._step_vectorizado(acciones)
+        estados, recompensas = self.estados, self.recompensas
+        terminados, truncados = self.terminados, self.truncados
+        for i, (entorno, accion) in enumerate(zip(self.entornos, np.asarray(acciones).tolist())):
+            partida = entorno.partida
+            marcador = partida.puntuacion_jugador - partida.puntuacion_oponente
+            recompensas[i] = 0.0
+            if partida.step(accion):
+                recompensas[i] = partida.puntuacion_jugador - partida.puntuacion_oponente - marcador
+            terminados[i] = partida.ganador() is not None
+            truncados[i] = (not terminados[i] and entorno.max_pasos is not None
+                            and partida.pasos >= entorno.max_pasos)
+            if terminados[i] or truncados[i]:
+                entorno.reset()
+            self._observar(i, entorno)
+        return estados, recompensas, terminados, truncados
+
+    def _step_vectorizado(self, acciones):
+        sim = self.sim
+        marcador = sim.puntuacion_jugador - sim.puntuacion_oponente
+        sim.step(DIRECCIONES[np.asarray(acciones)])
+        self.recompensas[:] = sim.puntuacion_jugador - sim.puntuacion_oponente - marcador
+        self.terminados[:] = sim.terminada
+        self.truncados[:] = False
+        if self.max_pasos is not None:
+            self.truncados[:] = ~sim.terminada & (sim.frames >= self.max_pasos)
+        sim.reset(self.terminados | self.truncados)
+        self._escribir_estados()
+        return self.estados, self.recompensas, self.terminados, self.truncados
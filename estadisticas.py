@@ -0,0 +1,293 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Estadísticas de las partidas que se guardan entre sesiones.
+
+Cada partida terminada se añade como un registro de tamaño fijo al final de
+`partidas.bin`, que nunca se reescribe. Los totales por dificultad y por
+jugador se llevan al día con cada registro y se guardan aparte en
+`agregados.json`, junto con cuántos bytes del registro incluyen: la pantalla
+de estadísticas solo lee los totales, sin recorrer el historial, por muchas
+partidas que haya.
+
+Escribir en disco no se hace nunca desde el bucle del juego: `record` solo
+deja el resumen de la partida en una cola y un hilo aparte lo añade al
+registro y actualiza los totales. Si el programa se cierra entre las dos
+cosas, al abrir de nuevo se suman las partidas que faltan (y se descarta un
+registro a medio escribir).
+
+Estructura de `partidas.bin`:
+    cabecera  "<4sB"           magia, versión
+    partida   "<d16s16sBBIHHf"  fecha, dificultad, jugador, puntuación del jugador,
+                                del oponente, pasos, golpes, rally más largo,
+                                velocidad máxima de la bola
+
+    python estadisticas.py estadisticas/               # muestra los totales
+    python estadisticas.py estadisticas/ --reconstruir # los recalcula desde el registro
+"""
+import argparse
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+MAGIA = b"TNST"
+VERSION = 1
+
+CABECERA = struct.Struct("<4sB")
+PARTIDA = struct.Struct("<d16s16sBBIHHf")
+# Bytes de los campos de texto (dificultad y jugador) de PARTIDA
+LONGITUD_TEXTO = 16
+
+ARCHIVO_REGISTRO = "partidas.bin"
+ARCHIVO_AGREGADOS = "agregados.json"
+
+# Jugadores que muestra la clasificación
+PUESTOS_CLASIFICACION = 10
+
+
+class StatsError(Exception):
+    """El archivo no es un registro de estadísticas válido."""
+
+
+def resumen_partida(partida, jugador, fecha=None):
+    """Resumen de una Match terminada, listo para `StatsStore.record`."""
+    return {
+        "fecha": time.time() if fecha is None else fecha,
+        "dificultad": partida.dificultad,
+        "jugador": recortar(jugador),
+        "puntuacion_jugador": partida.puntuacion_jugador,
+        "puntuacion_oponente": partida.puntuacion_oponente,
+        "pasos": partida.pasos,
+        "golpes": sum(partida.rallies) + partida.golpes,
+        "rally_maximo": max(partida.rallies, default=0),
+        "velocidad_maxima": partida.ball.velocidad_maxima,
+    }
+
+
+def recortar(valor):
+    """El texto tal como cabe en el registro: 16 bytes en UTF-8, sin partir ningún carácter."""
+    return valor.encode("utf-8")[:LONGITUD_TEXTO].decode("utf-8", "ignore")
+
+
+def _texto(valor):
+    return recortar(valor).encode("utf-8")
+
+
+def codificar(resumen):
+    return PARTIDA.pack(resumen["fecha"], _texto(resumen["dificultad"]), _texto(resumen["jugador"]),
+                        resumen["puntuacion_jugador"], resumen["puntuacion_oponente"], resumen["pasos"],
+                        min(resumen["golpes"], 0xFFFF), min(resumen["rally_maximo"], 0xFFFF),
+                        resumen["velocidad_maxima"])
+
+
+def decodificar(datos, posicion=0):
+    (fecha, dificultad, jugador, puntuacion_jugador, puntuacion_oponente, pasos, golpes, rally_maximo,
+     velocidad_maxima) = PARTIDA.unpack_from(datos, posicion)
+    return {
+        "fecha": fecha,
+        "dificultad": dificultad.rstrip(b"\0").decode("utf-8"),
+        "jugador": jugador.rstrip(b"\0").decode("utf-8"),
+        "puntuacion_jugador": puntuacion_jugador,
+        "puntuacion_oponente": puntuacion_oponente,
+        "pasos": pasos,
+        "golpes": golpes,
+        "rally_maximo": rally_maximo,
+        "velocidad_maxima": velocidad_maxima,
+    }
+
+
+def leer_registro(ruta):
+    """Todas las partidas del registro, en orden (solo para herramientas: el juego no lo recorre)."""
+    with open(ruta, "rb") as archivo:
+        datos = archivo.read()
+    if len(datos) < CABECERA.size or CABECERA.unpack_from(datos) != (MAGIA, VERSION):
+        raise StatsError("No es un registro de estadísticas compatible")
+    fin = CABECERA.size + (len(datos) - CABECERA.size) // PARTIDA.size * PARTIDA.size
+    return [decodificar(datos, posicion) for posicion in range(CABECERA.size, fin, PARTIDA.size)]
+
+
+def nuevo_total():
+    return {"partidas": 0, "victorias": 0, "puntos_favor": 0, "puntos_contra": 0, "golpes": 0, "pasos": 0,
+            "rally_maximo": 0, "velocidad_maxima": 0.0}
+
+
+def sumar(total, resumen):
+    """Añade una partida a un total (por dificultad o por jugador)."""
+    total["partidas"] += 1
+    total["victorias"] += resumen["puntuacion_jugador"] > resumen["puntuacion_oponente"]
+    total["puntos_favor"] += resumen["puntuacion_jugador"]
+    total["puntos_contra"] += resumen["puntuacion_oponente"]
+    total["golpes"] += resumen["golpes"]
+    total["pasos"] += resumen["pasos"]
+    total["rally_maximo"] = max(total["rally_maximo"], resumen["rally_maximo"])
+    total["velocidad_maxima"] = max(total["velocidad_maxima"], resumen["velocidad_maxima"])
+
+
+class StatsStore:
+    """
+    Estadísticas guardadas en `carpeta`. Se llama a `start` antes de registrar
+    partidas con `record` y a `close` al salir. `por_dificultad` y `clasificacion`
+    se pueden consultar en cualquier momento desde el bucle del juego.
+    """
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.ruta_registro = os.path.join(carpeta, ARCHIVO_REGISTRO)
+        self.ruta_agregados = os.path.join(carpeta, ARCHIVO_AGREGADOS)
+        self._agregados = {"procesados": CABECERA.size, "dificultades": {}, "jugadores": {}}
+        # El hilo escritor actualiza los totales mientras la pantalla de estadísticas los lee
+        self._cerrojo = threading.Lock()
+        self._pendientes = queue.Queue()
+        self._hilo = None
+        self._registro = None
+        self._tamano = 0
+
+    def start(self):
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._registro = self._abrir_registro()
+        self._cargar_agregados()
+        self._hilo = threading.Thread(target=self._escribir, name="estadisticas", daemon=True)
+        self._hilo.start()
+        return self
+
+    def _abrir_registro(self):
+        registro = open(self.ruta_registro, "ab+")
+        tamano = registro.seek(0, os.SEEK_END)
+        if tamano == 0:
+            registro.write(CABECERA.pack(MAGIA, VERSION))
+            registro.flush()
+            self._tamano = CABECERA.size
+            return registro
+        registro.seek(0)
+        cabecera = registro.read(CABECERA.size)
+        if len(cabecera) < CABECERA.size or CABECERA.unpack(cabecera) != (MAGIA, VERSION):
+            registro.close()
+            raise StatsError(f"{self.ruta_registro} no es un registro de estadísticas compatible")
+        # Un cierre a mitad de escritura deja un registro incompleto: se descarta
+        completo = CABECERA.size + (tamano - CABECERA.size) // PARTIDA.size * PARTIDA.size
+        if completo != tamano:
+            registro.truncate(completo)
+        self._tamano = completo
+        return registro
+
+    def _leer_agregados(self):
+        """Los totales guardados, o None si no existen o no tienen la forma esperada."""
+        try:
+            with open(self.ruta_agregados) as archivo:
+                agregados = json.load(archivo)
+            procesados = agregados["procesados"]
+            dificultades, jugadores = agregados["dificultades"], agregados["jugadores"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+        if not (isinstance(procesados, int) and isinstance(dificultades, dict) and isinstance(jugadores, dict)
+                and CABECERA.size <= procesados <= self._tamano
+                and (procesados - CABECERA.size) % PARTIDA.size == 0):
+            # Dañados, o de otro registro (p. ej. se borró partidas.bin)
+            return None
+        return agregados
+
+    def _cargar_agregados(self):
+        agregados = self._leer_agregados()
+        if agregados is not None:
+            self._agregados = agregados
+        # Si no, se calculan desde el principio del registro
+        # Partidas que llegaron al registro pero no a los totales
+        self._registro.seek(self._agregados["procesados"])
+        pendientes = self._registro.read()
+        if pendientes:
+            for posicion in range(0, len(pendientes), PARTIDA.size):
+                self._sumar(decodificar(pendientes, posicion))
+            self._guardar_agregados()
+
+    def _sumar(self, resumen):
+        agregados = self._agregados
+        with self._cerrojo:
+            sumar(agregados["dificultades"].setdefault(resumen["dificultad"], nuevo_total()), resumen)
+            sumar(agregados["jugadores"].setdefault(resumen["jugador"], nuevo_total()), resumen)
+            agregados["procesados"] += PARTIDA.size
+
+    def _guardar_agregados(self):
+        # Se escribe en un archivo aparte y se reemplaza: nunca queda a medias
+        temporal = self.ruta_agregados + ".tmp"
+        # (solo este hilo cambia los totales, así que se pueden leer sin el cerrojo)
+        with open(temporal, "w") as archivo:
+            json.dump(self._agregados, archivo)
+        os.replace(temporal, self.ruta_agregados)
+
+    def record(self, resumen):
+        """Registra una partida (ver resumen_partida). Nunca espera a escribir en disco."""
+        self._pendientes.put(resumen)
+
+    def _escribir(self):
+        while True:
+            resumen = self._pendientes.get()
+            if resumen is None:
+                break
+            datos = codificar(resumen)
+            self._registro.write(datos)
+            self._registro.flush()
+            os.fsync(self._registro.fileno())
+            # Se suma lo que ha quedado en el registro (textos recortados, float32, golpes limitados),
+            # así los totales coinciden con los que se reconstruyen desde él
+            self._sumar(decodificar(datos))
+            self._guardar_agregados()
+
+    def close(self):
+        """Espera a que se escriban las partidas pendientes y cierra el registro."""
+        if self._hilo is None:
+            return
+        self._pendientes.put(None)
+        self._hilo.join()
+        self._hilo = None
+        self._registro.close()
+
+    def partidas(self):
+        with self._cerrojo:
+            return sum(total["partidas"] for total in self._agregados["dificultades"].values())
+
+    def por_dificultad(self):
+        """{dificultad: total}, con una copia de cada total."""
+        with self._cerrojo:
+            return {dificultad: dict(total) for dificultad, total in self._agregados["dificultades"].items()}
+
+    def clasificacion(self, puestos=PUESTOS_CLASIFICACION):
+        """Los `puestos` mejores jugadores como [(jugador, total)], por victorias y después por puntos."""
+        with self._cerrojo:
+            jugadores = [(jugador, dict(total)) for jugador, total in self._agregados["jugadores"].items()]
+        jugadores.sort(key=lambda elemento: (-elemento[1]["victorias"],
+                                             elemento[1]["puntos_contra"] - elemento[1]["puntos_favor"],
+                                             elemento[0]))
+        return jugadores[:puestos]
+
+
+def reconstruir(carpeta):
+    """Vuelve a calcular los totales recorriendo todo el registro."""
+    ruta_agregados = os.path.join(carpeta, ARCHIVO_AGREGADOS)
+    if os.path.exists(ruta_agregados):
+        os.remove(ruta_agregados)
+    estadisticas = StatsStore(carpeta).start()
+    estadisticas.close()
+    return estadisticas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Estadísticas guardadas de las partidas")
+    parser.add_argument("carpeta", help="carpeta de estadísticas de main.py --estadisticas")
+    parser.add_argument("--reconstruir", action="store_true",
+                        help="recalcula los totales desde el registro de partidas")
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        estadisticas = reconstruir(args.carpeta)
+    else:
+        estadisticas = StatsStore(args.carpeta).start()
+        estadisticas.close()
+    print(f"{estadisticas.partidas()} partidas")
+    for dificultad, total in estadisticas.por_dificultad().items():
+        print(f"{dificultad:>10}: {total['partidas']} partidas, {total['victorias']} victorias, "
+              f"rally más largo {total['rally_maximo']}, velocidad máxima {total['velocidad_maxima']:.1f}")
+    for puesto, (jugador, total) in enumerate(estadisticas.clasificacion(), 1):
+        print(f"{puesto:3}. {jugador}: {total['victorias']} victorias de {total['partidas']} partidas")
@@ -0,0 +1,189 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Modo de baja latencia y medición de la latencia de la entrada.
+
+Con `reloj.tick(60)` cada fotograma lee la entrada, dibuja, presenta y luego
+duerme lo que sobra. `tick` duerme con la resolución del temporizador del
+sistema (en Windows, a menudo varios milisegundos de más) y, con vsync, el
+flip se bloquea hasta el siguiente refresco de pantalla: la entrada leída al
+principio del fotograma se ve casi un fotograma entero después.
+
+`HybridPacer` le da la vuelta: primero espera y después lee la entrada, justo
+con el tiempo necesario para simular, dibujar y presentar antes de que toque
+mostrar el fotograma. La espera duerme hasta poco antes y los últimos
+`MARGEN_SPIN` segundos los pasa comprobando el reloj (gasta algo de CPU, pero
+acierta al microsegundo).
+
+`LatencyMeter` mide, para cada pulsación, cuánto pasa desde que llega hasta
+que termina el flip del fotograma que ya la tiene en cuenta. pygame no da la
+marca de tiempo de cada evento, así que se toma el punto medio entre la
+recogida de eventos en la que aparece y la anterior: con `tick`, que solo
+recoge eventos una vez por fotograma, la estimación tiene hasta medio
+fotograma de error; en el modo de baja latencia se recogen durante la espera
+cada `INTERVALO_SONDEO` segundos. No incluye lo que tardan el teclado y el
+sistema operativo en entregar la pulsación.
+"""
+import json
+import time
+
+import numpy as np
+
+# Últimos segundos de la espera que se pasan comprobando el reloj en lugar de durmiendo
+MARGEN_SPIN = 0.002
+# Fotogramas con los que se estima cuánto tarda uno (se usa el percentil 90)
+VENTANA_TRABAJO = 60
+# Tiempo extra que se deja para el trabajo del fotograma, por si tarda más de lo estimado
+MARGEN_TRABAJO = 0.001
+# Cada cuánto se recogen los eventos mientras se espera
+INTERVALO_SONDEO = 0.001
+
+# Cubos del histograma de latencias, en milisegundos
+ANCHO_CUBO_MS = 2
+MAXIMO_HISTOGRAMA_MS = 50
+
+
+def esperar_hasta(instante, margen_spin=MARGEN_SPIN, sondear=None):
+    """
+    Duerme hasta poco antes de `instante` (en `time.perf_counter`) y espera
+    activamente el resto. Si se da `sondear`, se llama cada INTERVALO_SONDEO segundos.
+    """
+    ahora = time.perf_counter()
+    while instante - ahora > margen_spin:
+        espera = instante - ahora - margen_spin
+        time.sleep(espera if sondear is None else min(espera, INTERVALO_SONDEO))
+        if sondear is not None:
+            sondear()
+        ahora = time.perf_counter()
+    siguiente_sondeo = ahora + INTERVALO_SONDEO
+    while ahora < instante:
+        if sondear is not None and ahora >= siguiente_sondeo:
+            sondear()
+            siguiente_sondeo = ahora + INTERVALO_SONDEO
+        ahora = time.perf_counter()
+
+
+class HybridPacer:
+    """
+    Ritmo de fotogramas de baja latencia. Se llama a `wait` antes de leer la
+    entrada, a `work_done` justo antes del flip y a `frame_done` justo después.
+    Con `vsync=True` el flip marca el refresco de la pantalla y el siguiente se
+    espera un periodo después. El tiempo que bloquea el flip no cuenta como trabajo.
+    """
+    def __init__(self, fps=60, vsync=False, margen_spin=MARGEN_SPIN):
+        self.periodo = 1 / fps
+        self.vsync = vsync
+        self.margen_spin = margen_spin
+        self.trabajo = np.zeros(VENTANA_TRABAJO)
+        self._medidos = 0
+        self._presentar = None # Cuándo debe terminar el flip del siguiente fotograma
+        self._inicio = None
+        self._fin_trabajo = None
+        # Milisegundos de trabajo del último fotograma, sin el flip (como Clock.get_rawtime)
+        self.rawtime = 0
+        # Milisegundos que tardó el último flip
+        self.flip = 0
+
+    def estimacion(self):
+        """Segundos que se reservan para el trabajo de un fotograma."""
+        medidos = min(self._medidos, VENTANA_TRABAJO)
+        if medidos == 0:
+            return MARGEN_TRABAJO
+        return float(np.percentile(self.trabajo[:medidos], 90)) + MARGEN_TRABAJO
+
+    def wait(self, sondear=None):
+        """
+        Espera hasta el último momento en que conviene empezar el fotograma y
+        devuelve los segundos transcurridos desde el inicio del anterior.
+        `sondear` se llama periódicamente durante la espera (ver esperar_hasta).
+        """
+        if self._presentar is not None:
+            esperar_hasta(self._presentar - self.estimacion(), self.margen_spin, sondear)
+        ahora = time.perf_counter()
+        dt = 0.0 if self._inicio is None else ahora - self._inicio
+        self._inicio = ahora
+        return dt
+
+    def work_done(self):
+        """Registra el fin del trabajo del fotograma, justo antes del flip."""
+        self._fin_trabajo = time.perf_counter()
+        trabajo = self._fin_trabajo - self._inicio
+        self.trabajo[self._medidos % VENTANA_TRABAJO] = trabajo
+        self._medidos += 1
+        self.rawtime = trabajo * 1000
+
+    def frame_done(self):
+        """Registra el fin del fotograma (tras el flip) y fija cuándo debe presentarse el siguiente."""
+        if self._fin_trabajo is None:
+            self.work_done() # Fotograma sin flip
+        ahora = time.perf_counter()
+        self.flip = (ahora - self._fin_trabajo) * 1000
+        self._fin_trabajo = None
+        if self.vsync or self._presentar is None:
+            # El flip ha vuelto justo tras el refresco: el siguiente es un periodo después
+            self._presentar = ahora + self.periodo
+        else:
+            # Sin vsync se sigue el reloj ideal; si vamos tarde, no se intenta recuperar
+            self._presentar = max(self._presentar + self.periodo, ahora)
+
+
+class LatencyMeter:
+    """
+    Latencias (en ms) desde cada pulsación hasta el flip que la muestra, en un
+    buffer circular. `key_seen` recibe el momento estimado de la pulsación.
+    """
+    def __init__(self, capacity=4096):
+        self.latencias = np.zeros(capacity)
+        self.total = 0
+        self._pendientes = []
+
+    def key_seen(self, instante=None):
+        self._pendientes.append(time.perf_counter() if instante is None else instante)
+
+    def flipped(self, instante=None):
+        if not self._pendientes:
+            return
+        instante = time.perf_counter() if instante is None else instante
+        for visto in self._pendientes:
+            self.latencias[self.total % len(self.latencias)] = (instante - visto) * 1000
+            self.total += 1
+        self._pendientes.clear()
+
+    def muestras(self):
+        return self.latencias[:min(self.total, len(self.latencias))]
+
+    def histogram(self, ancho_cubo=ANCHO_CUBO_MS, maximo=MAXIMO_HISTOGRAMA_MS):
+        """Devuelve (bordes, cuentas); el último cubo incluye todo lo que pasa de `maximo`."""
+        bordes = np.arange(0, maximo + ancho_cubo, ancho_cubo, dtype=float)
+        cuentas, _ = np.histogram(np.minimum(self.muestras(), maximo - 1e-9), bordes)
+        return bordes, cuentas
+
+    def resumen(self):
+        muestras = self.muestras()
+        if len(muestras) == 0:
+            return {"pulsaciones": 0}
+        p50, p90, p99 = np.percentile(muestras, [50, 90, 99])
+        return {"pulsaciones": len(muestras), "p50": float(p50), "p90": float(p90), "p99": float(p99),
+                "max": float(muestras.max())}
+
+    def informe(self):
+        """Texto con el resumen y el histograma, para la consola."""
+        resumen = self.resumen()
+        if resumen["pulsaciones"] == 0:
+            return "Latencia de la entrada: ninguna pulsación medida."
+        lineas = [f"Latencia de la entrada ({resumen['pulsaciones']} pulsaciones): p50 {resumen['p50']:.1f} ms, "
+                  f"p90 {resumen['p90']:.1f} ms, p99 {resumen['p99']:.1f} ms, máx. {resumen['max']:.1f} ms"]
+        bordes, cuentas = self.histogram()
+        escala = 40 / max(cuentas.max(), 1)
+        for inicio, fin, cuenta in zip(bordes, bordes[1:], cuentas):
+            if cuenta:
+                lineas.append(f"{inicio:5.0f}-{fin:<4.0f}ms {'#' * max(1, round(cuenta * escala))} {cuenta}")
+        return "\n".join(lineas)
+
+    def export(self, ruta):
+        bordes, cuentas = self.histogram()
+        with open(ruta, "w") as archivo:
+            json.dump({"resumen_ms": self.resumen(), "histograma_ms": {"bordes": bordes.tolist(),
+                                                                       "cuentas": cuentas.tolist()},
+                       "latencias_ms": self.muestras().tolist()}, archivo, indent=2)
@@ -1,10 +1,28 @@
 # Copyright (c) 2024 abel
 # Este software se distribuye bajo la Licencia MIT.
 # Ver el archivo LICENSE para más detalles.
+import time
+INICIO_PROCESO = time.perf_counter() # Para --medir-arranque: se toma antes de importar nada más
+
 import pygame
 import sys
 import os
 import random
+import argparse
+import socket
+from collections import deque
+
+from particulas import ParticlePool
+from multibola import MultiBallField
+from sprites import SpriteCache
+from textos import TextCache, LazyFont
+from renderizado import DirtyRectRenderer
+from repeticion import ReplayRecorder, Replay
+from perfilador import FrameProfiler, NULL_PROFILER
+from calidad import QualityController, NOMBRES_CALIDAD
+from latencia import HybridPacer, LatencyMeter
+from estadisticas import StatsStore, StatsError, resumen_partida
+# captura.py y red.py (que importa asyncio) solo se importan si se usan, para arrancar antes
 
 # --- Constantes ---
 ANCHO_PANTALLA = 800
@@ -20,14 +38,65 @@ ANCHO_PALA = 15
 ALTO_PALA = 100
 PUNTUACION_GANADORA = 5
 VELOCIDAD_JUGADOR = 10 # Velocidad de movimiento para las palas de los jugadores
+LONGITUD_ESTELA = 10 # Número de posiciones que recuerda la estela de la bola
+
+# --- Paso Fijo de Simulación ---
+PASOS_POR_SEGUNDO = 60 # La física avanza siempre a este ritmo, sea cual sea el de pantalla
+PASO_SIMULACION = 1 / PASOS_POR_SEGUNDO
+MAX_PASOS_POR_FOTOGRAMA = 5 # Evita la "espiral de la muerte" si un fotograma tarda mucho
+MAX_IMPACTOS_POR_PASO = 4 # Rebotes que se resuelven como máximo dentro de un mismo paso
+SEGUNDOS_ESPERA_PUNTO = 1 # Pausa tras cada punto antes de volver a sacar
+SEGUNDOS_SIN_RED = 5 # Sin noticias del otro jugador durante este tiempo, la partida en red termina
+JUGADOR = "Jugador" # Nombre con el que se guardan las estadísticas si no se indica otro
+
+# --- Entrada del Jugador (un bit por tecla, así se guarda en las repeticiones) ---
+ENTRADA_ARRIBA = 1
+ENTRADA_ABAJO = 2
+
+# Texto de ayuda de la partida
+AYUDA_PARTIDA = "Mover: ↑/↓ | Salir: X | Pausa: P"
 
 # --- Diccionario de Dificultades ---
+# "reaccion" (pasos que tarda en reaccionar a un cambio de trayectoria) y "error"
+# (píxeles de error máximo al predecir) solo afectan a la IA predictiva.
 DIFICULTADES = {
-    "facil": {"oponente_velocidad": 5, "bola_velocidad": 6},
-    "medio": {"oponente_velocidad": 7, "bola_velocidad": 7},
-    "dificil": {"oponente_velocidad": 9, "bola_velocidad": 8},
+    "facil": {"oponente_velocidad": 5, "bola_velocidad": 6, "reaccion": 18, "error": 60},
+    "medio": {"oponente_velocidad": 7, "bola_velocidad": 7, "reaccion": 10, "error": 35},
+    "dificil": {"oponente_velocidad": 9, "bola_velocidad": 8, "reaccion": 4, "error": 15},
 }
 
+# --- Tipos de IA del Oponente ---
+# "perseguidora": sigue la altura de la bola en cada fotograma (la IA clásica).
+# "predictiva": calcula dónde cruzará la bola y va directamente hacia allí.
+IAS = ("perseguidora", "predictiva")
+# Desvío máximo (en píxeles) con el que la perseguidora apunta a la bola en cada trayectoria.
+# Sin él, dos perseguidoras golpean siempre con el centro y se devuelven la bola en horizontal
+# para siempre; con él, cada golpe sale con un ángulo distinto.
+PUNTERIA_PERSEGUIDORA = 40
+
+# --- Fuentes y Caché de Textos ---
+FUENTES = {"titulo": 74, "boton": 50, "juego": 74, "info": 24} # Tamaño de cada fuente
+# Todos los textos de la interfaz pasan por aquí para rasterizarse solo cuando cambian
+textos = TextCache(capacity=64)
+
+# Textos fijos que vienen ya rasterizados en el atlas (tras cambiar alguno: python textos.py)
+RUTA_ATLAS = os.path.join("assets", "textos_menu.bmp")
+RUTA_INDICE_ATLAS = os.path.join("assets", "textos_menu.json")
+TEXTOS_ATLAS = (
+    [("titulo", "TENIS", True, BLANCO), ("boton", "Jugar", True, NEGRO),
+     ("boton", "Estadísticas", True, NEGRO), ("titulo", "ELIGE LA DIFICULTAD", True, BLANCO)]
+    + [("boton", dificultad.capitalize(), True, NEGRO) for dificultad in DIFICULTADES]
+    + [("boton", "Volver a Jugar", True, NEGRO), ("boton", "Menú Principal", True, NEGRO),
+       ("titulo", "¡Has ganado!", True, BLANCO), ("titulo", "¡Has perdido!", True, BLANCO),
+       ("titulo", "PAUSA", True, BLANCO)]
+)
+
+
+def cargar_fuentes():
+    """Fuentes del juego; cada una se carga la primera vez que hace falta rasterizar con ella."""
+    por_tamano = {}
+    return {nombre: por_tamano.setdefault(tamano, LazyFont(tamano)) for nombre, tamano in FUENTES.items()}
+
 # --- Clases del Juego ---
 
 def resource_path(relative_path):
@@ -41,30 +110,115 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def tiempo_de_impacto(x, y, ancho, alto, dx, dy, obstaculo):
+    """
+    Test de barrido entre rectángulos: devuelve el instante t en [0, 1) en que el
+    rectángulo (x, y, ancho, alto), desplazándose (dx, dy), empieza a tocar
+    `obstaculo`, o None si no lo toca durante el desplazamiento.
+    """
+    t_entrada, t_salida = 0.0, 1.0
+    for pos, tam, vel, o_pos, o_tam in ((x, ancho, dx, obstaculo.x, obstaculo.width),
+                                        (y, alto, dy, obstaculo.y, obstaculo.height)):
+        if vel == 0:
+            # Sin movimiento en este eje: tiene que estar ya solapado en él
+            if pos + tam <= o_pos or pos >= o_pos + o_tam:
+                return None
+            continue
+        t1 = (o_pos - pos - tam) / vel
+        t2 = (o_pos + o_tam - pos) / vel
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_entrada = max(t_entrada, t1)
+        t_salida = min(t_salida, t2)
+        if t_entrada >= t_salida:
+            return None
+    return t_entrada
+
+
 class Ball:
-    def __init__(self, x, y, size, speed):
+    # Sprites compartidos por todas las bolas: cada tamaño se dibuja una sola vez
+    sprites = SpriteCache()
+
+    def __init__(self, x, y, size, speed, trail_length=LONGITUD_ESTELA, rng=None):
         self.rect = pygame.Rect(x, y, size, size)
-        self.speed_x = speed * random.choice((1, -1))
-        self.speed_y = speed * random.choice((1, -1))
+        # Generador aleatorio propio de la partida (con semilla) o el global por defecto
+        self.rng = rng or random
+        self.speed_x = speed * self.rng.choice((1, -1))
+        self.speed_y = speed * self.rng.choice((1, -1))
         self.initial_speed = speed
-        self.trail = []
+        # Velocidad horizontal más alta que ha alcanzado la bola en la partida (para las estadísticas)
+        self.velocidad_maxima = float(speed)
+        # Se incrementa cada vez que cambia la trayectoria (rebote, pared o saque),
+        # para que quien la prediga sepa cuándo recalcular sin comprobar nada más.
+        self.trayectoria = 0
+        # Buffer circular de posiciones: al llenarse descarta la más antigua en O(1)
+        self.trail = deque(maxlen=trail_length)
 
     def move(self):
-        self.trail.append(self.rect.copy())
-        if len(self.trail) > 10: # Limita la longitud de la estela
-            self.trail.pop(0)
+        self.trail.append(self.rect.topleft)
         self.rect.x += self.speed_x
         self.rect.y += self.speed_y
 
+    def move_swept(self, paddles, particle_list):
+        """
+        Avanza la bola un paso con detección continua de colisiones. En lugar de mover
+        y comprobar después con colliderect, calcula el instante exacto de impacto con
+        las palas y las paredes, de modo que la bola no puede atravesarlas aunque vaya
+        muy rápida. Tras cada impacto se consume el resto del paso con la nueva velocidad.
+        """
+        self.trail.append(self.rect.topleft)
+        x, y = float(self.rect.x), float(self.rect.y)
+        ancho, alto = self.rect.size
+        restante = 1.0
+
+        for _ in range(MAX_IMPACTOS_POR_PASO):
+            dx, dy = self.speed_x * restante, self.speed_y * restante
+            t_impacto, pala_golpeada, pared = 1.0, None, False
+
+            for paddle in paddles:
+                # Solo cuenta la pala hacia la que se mueve la bola
+                if (paddle.rect.centerx - (x + ancho / 2)) * dx <= 0:
+                    continue
+                t = tiempo_de_impacto(x, y, ancho, alto, dx, dy, paddle.rect)
+                if t is not None and t < t_impacto:
+                    t_impacto, pala_golpeada = t, paddle
+
+            if dy < 0 and y + dy < 0:
+                t = max(0.0, -y / dy)
+                if t < t_impacto:
+                    t_impacto, pala_golpeada, pared = t, None, True
+            elif dy > 0 and y + alto + dy > ALTO_PANTALLA:
+                t = max(0.0, (ALTO_PANTALLA - alto - y) / dy)
+                if t < t_impacto:
+                    t_impacto, pala_golpeada, pared = t, None, True
+
+            x += dx * t_impacto
+            y += dy * t_impacto
+            if pala_golpeada is None and not pared:
+                break
+
+            # Colocamos la bola en el punto de contacto antes de resolver el rebote
+            self.rect.x, self.rect.y = x, y
+            if pared:
+                self.speed_y *= -1
+                self.trayectoria += 1
+            else:
+                self.bounce(pala_golpeada, particle_list)
+            restante *= 1 - t_impacto
+
+        self.rect.x, self.rect.y = x, y
+
     def check_wall_collision(self):
         if self.rect.top <= 0 or self.rect.bottom >= ALTO_PANTALLA:
             self.speed_y *= -1
+            self.trayectoria += 1
 
     def reset(self):
         self.rect.center = (int(ANCHO_PANTALLA / 2), int(ALTO_PANTALLA / 2))
-        self.speed_x = self.initial_speed * random.choice((1, -1))
-        self.speed_y = self.initial_speed * random.choice((1, -1))
-        self.trail = []
+        self.speed_x = self.initial_speed * self.rng.choice((1, -1))
+        self.speed_y = self.initial_speed * self.rng.choice((1, -1))
+        self.trail.clear()
+        self.trayectoria += 1
 
     def bounce(self, paddle, particle_list):
         # Aumentamos la velocidad con cada golpe, con un límite.
@@ -83,31 +237,86 @@ class Ball:
         bounce_factor = diff_y / (paddle.rect.height / 2)
         # La velocidad vertical ahora depende de la velocidad horizontal actual para mantener la proporción.
         self.speed_y = bounce_factor * abs(self.speed_x)
+        self.trayectoria += 1
+        self.velocidad_maxima = max(self.velocidad_maxima, abs(self.speed_x))
 
         # --- Creación de Partículas ---
         # Determinamos la dirección de las partículas (lejos de la pala)
         particle_direction = 1 if self.rect.centerx < ANCHO_PANTALLA / 2 else -1
-        # Creamos entre 10 y 15 partículas
-        for _ in range(random.randint(10, 15)):
-            particle = Particle(self.rect.centerx, self.rect.centery, particle_direction)
-            particle_list.append(particle)
+        # Creamos entre 10 y 15 partículas. El sorteo se hace aunque no haya efectos
+        # para no desplazar la secuencia aleatoria de la bola (las repeticiones dependen de ella).
+        cantidad = self.rng.randint(10, 15)
+        if particle_list is None:
+            return
+        if isinstance(particle_list, ParticlePool):
+            particle_list.emit(self.rect.centerx, self.rect.centery, particle_direction, cantidad)
+        else:
+            for _ in range(cantidad):
+                particle = Particle(self.rect.centerx, self.rect.centery, particle_direction, self.rng)
+                particle_list.append(particle)
         
-    def draw(self, screen):
-        # Dibujamos la estela
-        for i, rect in enumerate(self.trail):
-            # El color se desvanece a medida que se aleja
-            alpha = (i + 1) * (255 // (len(self.trail) + 1))
-            color = (alpha, alpha, alpha)
-            pygame.draw.ellipse(screen, color, rect)
+    def set_trail_length(self, length):
+        """Cambia el número de posiciones de la estela conservando las más recientes."""
+        if length != self.trail.maxlen:
+            self.trail = deque(self.trail, maxlen=length)
+
+    def bounds(self):
+        """Rectángulo que cubre la bola y toda su estela."""
+        if not self.trail:
+            return self.rect.copy()
+        xs = [x for x, _ in self.trail]
+        ys = [y for _, y in self.trail]
+        izquierda = min(min(xs), self.rect.x)
+        arriba = min(min(ys), self.rect.y)
+        derecha = max(max(xs), self.rect.x) + self.rect.width
+        abajo = max(max(ys), self.rect.y) + self.rect.height
+        return pygame.Rect(izquierda, arriba, derecha - izquierda, abajo - arriba)
+
+    def draw(self, screen, rect=None):
+        # `rect` permite dibujar la bola en una posición interpolada entre dos pasos
+        rect = rect or self.rect
+        # Dibujamos la estela copiando los sprites ya desvanecidos de la caché
+        if self.trail:
+            niveles = self.sprites.fade_levels(self.rect.width, self.rect.height, len(self.trail))
+            screen.blits(zip(niveles, self.trail), doreturn=False)
         # Dibujamos la pelota principal
-        pygame.draw.ellipse(screen, BLANCO, self.rect)
+        screen.blit(self.sprites.ellipse(self.rect.width, self.rect.height, BLANCO), rect)
+
+def predecir_interseccion(ball, x):
+    """
+    Altura del centro de la bola cuando alcance la coordenada `x` siguiendo su
+    trayectoria actual, con los rebotes en las paredes incluidos. Se calcula de
+    forma analítica: desplegamos las reflexiones como si la pantalla se repitiera
+    en espejo y volvemos a plegar el resultado. Devuelve None si la bola se aleja.
+    """
+    if (x - ball.rect.centerx) * ball.speed_x <= 0:
+        return None
+    if ball.speed_x < 0:
+        t = (ball.rect.left - x) / -ball.speed_x
+    else:
+        t = (x - ball.rect.right) / ball.speed_x
+    recorrido = ALTO_PANTALLA - ball.rect.height
+    y = (ball.rect.y + ball.speed_y * max(t, 0)) % (2 * recorrido)
+    if y > recorrido:
+        y = 2 * recorrido - y
+    return y + ball.rect.height / 2
+
+def leer_entrada():
+    """Estado actual de las flechas del teclado como máscara de bits ENTRADA_*."""
+    keys = pygame.key.get_pressed()
+    entrada = 0
+    if keys[pygame.K_UP]:
+        entrada |= ENTRADA_ARRIBA
+    if keys[pygame.K_DOWN]:
+        entrada |= ENTRADA_ABAJO
+    return entrada
 
 class Paddle:
     def __init__(self, x, y, width, height):
         self.rect = pygame.Rect(x, y, width, height)
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, BLANCO, self.rect)
+    def draw(self, screen, rect=None):
+        pygame.draw.rect(screen, BLANCO, rect or self.rect)
 
     def keep_in_bounds(self):
         if self.rect.top <= 0:
@@ -120,36 +329,88 @@ class PlayerPaddle(Paddle):
         super().__init__(x, y, width, height)
         self.speed = speed
 
-    def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_UP]:
+    def update(self, entrada=None):
+        # Sin entrada explícita (p. ej. de una repetición) leemos el teclado
+        if entrada is None:
+            entrada = leer_entrada()
+        if entrada & ENTRADA_ARRIBA:
             self.rect.y -= self.speed
-        if keys[pygame.K_DOWN]:
+        if entrada & ENTRADA_ABAJO:
             self.rect.y += self.speed
         self.keep_in_bounds()
 
 class OpponentPaddle(Paddle):
-    def __init__(self, x, y, width, height, speed):
+    def __init__(self, x, y, width, height, speed, ia="perseguidora", reaccion=0, error=0, rng=None,
+                 punteria=PUNTERIA_PERSEGUIDORA):
         super().__init__(x, y, width, height)
         self.speed = speed
+        self.ia = ia
+        # --- Estado de la IA perseguidora ---
+        self.punteria = punteria
+        self.desvio = 0
+        # --- Estado de la IA predictiva ---
+        self.reaccion = reaccion
+        self.error = error
+        self.rng = rng or random
+        self.objetivo = self.rect.centery
+        self._trayectoria = None # Trayectoria de la bola para la que se calculó el objetivo
+        self._espera = 0
+        self._pendiente = False
 
     def update(self, ball):
-        if self.rect.centery < ball.rect.centery:
+        if self.ia == "predictiva":
+            self._update_predictiva(ball)
+            return
+        # Con cada trayectoria nueva elige con qué parte de la pala golpear
+        if ball.trayectoria != self._trayectoria:
+            self._trayectoria = ball.trayectoria
+            self.desvio = self.rng.uniform(-self.punteria, self.punteria)
+        objetivo = ball.rect.centery + self.desvio
+        if self.rect.centery < objetivo:
             self.rect.y += self.speed
-        if self.rect.centery > ball.rect.centery:
+        if self.rect.centery > objetivo:
             self.rect.y -= self.speed
         self.keep_in_bounds()
 
+    def _update_predictiva(self, ball):
+        # Solo se vuelve a predecir cuando la bola cambia de trayectoria,
+        # y tras `reaccion` pasos, como si el oponente tardara en darse cuenta.
+        if ball.trayectoria != self._trayectoria:
+            self._trayectoria = ball.trayectoria
+            if not self._pendiente:
+                self._pendiente = True
+                self._espera = self.reaccion
+        if self._pendiente:
+            if self._espera > 0:
+                self._espera -= 1
+            else:
+                self._pendiente = False
+                cara = self.rect.right if self.rect.centerx < ANCHO_PANTALLA / 2 else self.rect.left
+                y = predecir_interseccion(ball, cara)
+                if y is None:
+                    # La bola se aleja: volvemos al centro a esperar
+                    self.objetivo = ALTO_PANTALLA / 2
+                else:
+                    self.objetivo = y + self.rng.uniform(-self.error, self.error)
+
+        self.move_towards(self.objetivo)
+
+    def move_towards(self, y):
+        # Nos movemos hacia el objetivo sin pasarnos, así la pala no tiembla
+        diferencia = y - self.rect.centery
+        self.rect.y += max(-self.speed, min(self.speed, diferencia))
+        self.keep_in_bounds()
+
 class Particle:
-    def __init__(self, x, y, direction):
+    def __init__(self, x, y, direction, rng=random):
         self.x = x
         self.y = y
         # Partículas pequeñas de 2 a 4 píxeles
-        self.size = random.randint(2, 4)
+        self.size = rng.randint(2, 4)
         # La velocidad horizontal es en la dirección opuesta al golpe
-        self.speed_x = direction * random.uniform(1, 4)
+        self.speed_x = direction * rng.uniform(1, 4)
         # La velocidad vertical es aleatoria hacia arriba o abajo
-        self.speed_y = random.uniform(-3, 3)
+        self.speed_y = rng.uniform(-3, 3)
         # Tiempo de vida en fotogramas (aprox. medio segundo a 60 FPS)
         self.lifespan = 30
 
@@ -161,264 +422,1118 @@ class Particle:
     def draw(self, screen):
         pygame.draw.rect(screen, BLANCO, (self.x, self.y, self.size, self.size))
 
-def menu_principal(pantalla, fuentes):
+class Match:
     """
-    Muestra el menú de inicio y espera a que el jugador haga clic en "Jugar".
+    Estado de una partida y su paso de simulación, sin depender de la ventana.
+    Con la misma semilla y la misma entrada en cada paso, el resultado es siempre el mismo.
+    Con `jugador_ia=(dificultad, ia)` la pala derecha también la controla la IA y la entrada se ignora.
+    Con `efectos=False` no se generan partículas (sin ventana no se ven y la física no depende de ellas).
+    Con `rival_remoto=True` la pala izquierda es de otro jugador y se mueve con `entrada_rival`.
     """
-    reloj = pygame.time.Clock()
-
-    titulo_texto = fuentes["titulo"].render("TENIS", True, BLANCO)
-    rect_titulo = titulo_texto.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2 - 100))
-
-    # Crear botón para jugar
-    boton_jugar = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2, 300, 60)
-
-    while True:
+    def __init__(self, dificultad, seed=None, ia="perseguidora", jugador_ia=None, efectos=True,
+                 rival_remoto=False):
+        config = DIFICULTADES[dificultad]
+        self.dificultad = dificultad
+        self.ia = ia
+        self.seed = seed if seed is not None else random.getrandbits(63)
+
+        # Flujos aleatorios independientes: la física no depende de los efectos visuales
+        self.rng = random.Random(self.seed)
+        self.ball = Ball(ANCHO_PANTALLA / 2 - TAMANO_BOLA / 2, ALTO_PANTALLA / 2 - TAMANO_BOLA / 2, TAMANO_BOLA,
+                         config["bola_velocidad"], rng=self.rng)
+        if jugador_ia is None:
+            self.player = PlayerPaddle(ANCHO_PANTALLA - ANCHO_PALA - 20, ALTO_PANTALLA / 2 - ALTO_PALA / 2,
+                                       ANCHO_PALA, ALTO_PALA, VELOCIDAD_JUGADOR)
+        else:
+            dificultad_jugador, ia_jugador = jugador_ia
+            config_jugador = DIFICULTADES[dificultad_jugador]
+            self.player = OpponentPaddle(ANCHO_PANTALLA - ANCHO_PALA - 20, ALTO_PANTALLA / 2 - ALTO_PALA / 2,
+                                         ANCHO_PALA, ALTO_PALA, config_jugador["oponente_velocidad"],
+                                         ia_jugador, config_jugador["reaccion"],
+                                         config_jugador["error"], random.Random(f"{self.seed}:ia_jugador"))
+        self.jugador_ia = jugador_ia
+        self.rival_remoto = rival_remoto
+        if rival_remoto:
+            self.opponent = PlayerPaddle(20, ALTO_PANTALLA / 2 - ALTO_PALA / 2, ANCHO_PALA, ALTO_PALA,
+                                         VELOCIDAD_JUGADOR)
+        else:
+            self.opponent = OpponentPaddle(20, ALTO_PANTALLA / 2 - ALTO_PALA / 2, ANCHO_PALA, ALTO_PALA,
+                                           config["oponente_velocidad"], ia, config["reaccion"], config["error"],
+                                           random.Random(f"{self.seed}:ia"))
+        self.particles = ParticlePool(capacity=512, color=BLANCO, rng=[self.seed, 1]) if efectos else None
+
+        self.puntuacion_jugador = 0
+        self.puntuacion_oponente = 0
+        self.pasos = 0
+        # Golpes de pala del punto en juego y de cada punto ya terminado
+        self.golpes = 0
+        self.rallies = []
+        self.profiler = NULL_PROFILER
+
+    def step(self, entrada, entrada_rival=0):
+        """Avanza un paso fijo de simulación. Devuelve True si se ha marcado un punto."""
+        if self.jugador_ia is None:
+            self.player.update(entrada)
+        else:
+            self.player.update(self.ball)
+        self.opponent.update(entrada_rival if self.rival_remoto else self.ball)
+        self.profiler.lap("palas")
+        # Colisiones continuas con las palas y las paredes
+        direccion = self.ball.speed_x > 0
+        self.ball.move_swept((self.player, self.opponent), self.particles)
+        self.profiler.lap("bola")
+        self.pasos += 1
+        # Las paredes no cambian la dirección horizontal: si cambia, ha habido golpe de pala
+        if (self.ball.speed_x > 0) != direccion:
+            self.golpes += 1
+
+        # Lógica de Puntuación
+        if self.ball.rect.right >= ANCHO_PANTALLA or self.ball.rect.left <= 0:
+            if self.ball.rect.right >= ANCHO_PANTALLA:
+                self.puntuacion_oponente += 1
+            else:
+                self.puntuacion_jugador += 1
+            self.rallies.append(self.golpes)
+            self.golpes = 0
+            self.ball.reset()
+            return True
+        # Actualizar partículas (las muertas dejan su hueco libre en el pool)
+        if self.particles is not None:
+            self.particles.update()
+        self.profiler.lap("particulas")
+        return False
+
+    def ganador(self):
+        """"jugador", "oponente" o None si la partida no ha terminado."""
+        if self.puntuacion_jugador >= PUNTUACION_GANADORA:
+            return "jugador"
+        if self.puntuacion_oponente >= PUNTUACION_GANADORA:
+            return "oponente"
+        return None
+
+def reproducir_sin_ventana(repeticion):
+    """Reproduce una repetición a máxima velocidad y devuelve la partida resultante."""
+    partida = Match(repeticion.dificultad, repeticion.seed, repeticion.ia, efectos=False)
+    for entrada in repeticion.inputs():
+        partida.step(entrada)
+    return partida
+
+def interpolar(rect, anterior, alpha):
+    """Rectángulo de `rect` situado entre su posición `anterior` y la actual según `alpha`."""
+    x = anterior[0] + (rect.x - anterior[0]) * alpha
+    y = anterior[1] + (rect.y - anterior[1]) * alpha
+    return pygame.Rect(round(x), round(y), rect.width, rect.height)
+
+def componer_fondo(fuentes, puntuacion_jugador, puntuacion_oponente, ayuda=AYUDA_PARTIDA):
+    """
+    Compone en una superficie los elementos que no se mueven durante la partida:
+    la línea central, las puntuaciones y el texto de ayuda.
+    """
+    fondo = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fondo.fill(NEGRO)
+    pygame.draw.aaline(fondo, BLANCO, (ANCHO_PANTALLA / 2, 0), (ANCHO_PANTALLA / 2, ALTO_PANTALLA))
+
+    texto_jugador = textos.render(fuentes["juego"], f"{puntuacion_jugador}", False, BLANCO)
+    fondo.blit(texto_jugador, (ANCHO_PANTALLA / 2 + 20, 20))
+    texto_oponente = textos.render(fuentes["juego"], f"{puntuacion_oponente}", False, BLANCO)
+    fondo.blit(texto_oponente, (ANCHO_PANTALLA / 2 - 50, 20))
+
+    info_texto = textos.render(fuentes["info"], ayuda, True, BLANCO)
+    fondo.blit(info_texto, (10, 10))
+    return fondo
+
+# --- Escenas ---
+# Todo el programa corre dentro de un único bucle (SceneManager.run). Cada pantalla
+# es una escena que recibe los eventos, se actualiza y se dibuja; para pasar a otra
+# pantalla llama a `juego.cambiar(...)`. Ninguna escena llama a otra, así que la pila
+# no crece y la partida anterior se libera en cuanto se deja de usar.
+
+class SceneManager:
+    """
+    Bucle principal del juego y opciones comunes a todas las escenas.
+    Con `dirty_rects=True` solo se redibujan y envían a la pantalla las zonas que cambian.
+    Con `carpeta_repeticiones` se guarda una repetición de cada partida en esa carpeta.
+    Con `ruta_perfil` se mide cada fase del fotograma y se exporta (JSON o CSV) al terminar cada partida.
+    `ia` elige el tipo de IA del oponente (ver IAS).
+    Con `multibola` mayor que cero, las partidas son del modo multibola con ese número de bolas.
+    `calidad` es el QualityController que ajusta la calidad gráfica (por defecto, automático).
+    Con `red` las partidas son a dos jugadores en red: es un diccionario con "anfitrion" (bool),
+    "direccion" (la local del anfitrión o la remota del cliente), "latencia" y "perdida" (ver UdpLink).
+    Con `video` (un FrameRecorder) se graba cada fotograma que se presenta.
+    Con `marcapasos` (un HybridPacer) el ritmo de fotogramas es el del modo de baja latencia
+    en lugar de `reloj.tick`, y con `latencias` (un LatencyMeter) se mide la latencia de la entrada.
+    Con `estadisticas` (un StatsStore) se guarda cada partida contra la IA que termina, a nombre de `jugador`.
+    """
+    def __init__(self, pantalla, fuentes, dirty_rects=False, carpeta_repeticiones=None, ruta_perfil=None,
+                 ia="perseguidora", multibola=0, calidad=None, red=None, video=None, marcapasos=None,
+                 latencias=None, estadisticas=None, jugador=JUGADOR):
+        self.pantalla = pantalla
+        self.fuentes = fuentes
+        self.dirty_rects = dirty_rects
+        self.carpeta_repeticiones = carpeta_repeticiones
+        self.ruta_perfil = ruta_perfil
+        self.ia = ia
+        self.multibola = multibola
+        self.calidad = calidad if calidad is not None else QualityController()
+        self.red = red
+        self.video = video
+        self.marcapasos = marcapasos
+        self.latencias = latencias
+        self.estadisticas = estadisticas
+        self.jugador = jugador
+        # Eventos recogidos y cuándo se recogieron por última vez (ver _sondear)
+        self._eventos = []
+        self._ultimo_sondeo = time.perf_counter()
+        # Momento en que se presentó el primer fotograma, y tareas que se dejan para entonces
+        self.tiempo_primer_fotograma = None
+        self.tras_primer_fotograma = []
+        self.escena = None
+        self._siguiente = None
+        self._cambio = False
+
+    def nueva_partida(self, dificultad):
+        """Escena de una partida nueva en el modo elegido: en red, multibola o contra la IA."""
+        if self.red is not None:
+            return NetMatchScene(self, dificultad)
+        if self.multibola:
+            return MultiBallScene(self, dificultad, self.multibola)
+        return MatchScene(self, dificultad)
+
+    def cambiar(self, escena):
+        """La escena activa pasa a ser `escena` al terminar el fotograma; None termina el bucle."""
+        self._siguiente = escena
+        self._cambio = True
+
+    def _sondear(self):
+        """Recoge los eventos pendientes y anota el momento estimado de cada pulsación."""
+        ahora = time.perf_counter()
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if boton_jugar.collidepoint(event.pos):
-                    return # Sale de la función para continuar
+            if event.type == pygame.KEYDOWN and self.latencias is not None:
+                # Ha llegado entre el sondeo anterior y este
+                self.latencias.key_seen((self._ultimo_sondeo + ahora) / 2)
+            self._eventos.append(event)
+        self._ultimo_sondeo = ahora
+
+    def run(self, escena, max_frames=None):
+        """
+        Ejecuta el bucle a partir de `escena` hasta que se cierra la ventana o una
+        escena cambia a None (o durante `max_frames` fotogramas). Devuelve la escena activa.
+        """
+        self.escena = escena
+        self._siguiente, self._cambio = None, False
+        escena.enter()
+        reloj = pygame.time.Clock()
+        marcapasos = self.marcapasos
+        dt = 0.0
+        frames = 0
+        while self.escena is not None and (max_frames is None or frames < max_frames):
+            escena = self.escena
+            escena.profiler.begin_frame()
+            if marcapasos is not None:
+                # Baja latencia: se espera antes de leer la entrada, no después de presentar,
+                # para que la entrada se lea lo más tarde posible antes del flip
+                dt = marcapasos.wait(self._sondear)
+                escena.profiler.lap("espera")
+            inicio = time.perf_counter()
+            trabajo = None
+            self._sondear()
+            eventos, self._eventos = self._eventos, []
+            for event in eventos:
+                if event.type == pygame.QUIT:
+                    escena.close()
+                    self.escena = None
+                    return None
+                escena.handle_event(event)
+            escena.profiler.lap("eventos")
+
+            if not self._cambio:
+                escena.update(dt)
+            # Si la escena ya ha pedido el cambio no se dibuja: el siguiente fotograma es de la nueva
+            if not self._cambio:
+                escena.draw(self.pantalla)
+                # El trabajo se mide antes del flip: con vsync el flip bloquea hasta el refresco
+                trabajo = time.perf_counter() - inicio
+                if marcapasos is not None:
+                    marcapasos.work_done()
+                presentado = escena.present()
+                if self.latencias is not None and presentado:
+                    self.latencias.flipped()
+                if marcapasos is not None:
+                    marcapasos.frame_done() # Justo tras el flip: con vsync marca el refresco
+                escena.profiler.lap("presentar")
+                if self.video is not None and presentado:
+                    self.video.capture(self.pantalla)
+                    escena.profiler.lap("captura")
+                if self.tiempo_primer_fotograma is None:
+                    self.tiempo_primer_fotograma = time.perf_counter()
+                    for tarea in self.tras_primer_fotograma:
+                        tarea()
+                    self.tras_primer_fotograma.clear()
+            if trabajo is None:
+                trabajo = time.perf_counter() - inicio # Fotograma sin dibujar
+            # Tiempo de trabajo real del fotograma, sin el flip ni la espera
+            self.calidad.record(trabajo * 1000)
+            if marcapasos is None:
+                dt = reloj.tick(60) / 1000
+                escena.profiler.lap("espera")
+            elif self._cambio:
+                marcapasos.frame_done() # Fotograma sin dibujar
+            escena.profiler.end_frame(escena.particles)
+            frames += 1
+
+            if self._cambio:
+                self.escena, self._siguiente, self._cambio = self._siguiente, None, False
+                if self.escena is not None:
+                    self.escena.enter()
+        return self.escena
+
+
+class Scene:
+    """Escena base: una pantalla que no hace nada."""
+    profiler = NULL_PROFILER
+    particles = None
+
+    def __init__(self, juego):
+        self.juego = juego
+
+    def enter(self):
+        """Se llama cada vez que la escena pasa a ser la activa."""
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        pass
+
+    def draw(self, pantalla):
+        pass
+
+    def present(self):
+        """Muestra lo dibujado. Devuelve False si esta vez no ha cambiado nada en la pantalla."""
+        pygame.display.flip()
+        return True
 
-        pantalla.fill(NEGRO)
-        pantalla.blit(titulo_texto, rect_titulo)
+    def close(self):
+        """Se llama si se cierra la ventana mientras la escena está activa."""
 
-        pygame.draw.rect(pantalla, BLANCO, boton_jugar)
-        texto_boton = fuentes["boton"].render("Jugar", True, NEGRO)
-        rect_texto_boton = texto_boton.get_rect(center=boton_jugar.center)
-        pantalla.blit(texto_boton, rect_texto_boton)
 
-        pygame.display.flip()
-        reloj.tick(60)
+class MainMenuScene(Scene):
+    """Menú de inicio: espera a que el jugador haga clic en "Jugar" o en "Estadísticas"."""
+    def __init__(self, juego):
+        super().__init__(juego)
+        fuentes = juego.fuentes
+        self.titulo_texto = textos.render(fuentes["titulo"], "TENIS", True, BLANCO)
+        self.rect_titulo = self.titulo_texto.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2 - 100))
 
-def menu_dificultad(pantalla, fuentes):
-    """Muestra el menú para elegir dificultad y devuelve la selección."""
-    reloj = pygame.time.Clock()
+        # Crear botón para jugar
+        self.boton_jugar = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2, 300, 60)
+        self.texto_boton = textos.render(fuentes["boton"], "Jugar", True, NEGRO)
+        self.rect_texto_boton = self.texto_boton.get_rect(center=self.boton_jugar.center)
 
-    titulo_texto = fuentes["titulo"].render("ELIGE LA DIFICULTAD", True, BLANCO)
-    rect_titulo = titulo_texto.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2 - 150))
+        self.boton_estadisticas = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2 + 80, 300, 60)
+        self.texto_estadisticas = textos.render(fuentes["boton"], "Estadísticas", True, NEGRO)
+        self.rect_texto_estadisticas = self.texto_estadisticas.get_rect(center=self.boton_estadisticas.center)
 
-    # Crear botones para cada dificultad
-    botones = {}
-    pos_y_inicial = ALTO_PANTALLA / 2 - 80
-    for i, dificultad in enumerate(DIFICULTADES.keys()):
-        pos_y = pos_y_inicial + i * 80
-        boton_rect = pygame.Rect(ANCHO_PANTALLA / 2 - 125, pos_y, 250, 60)
-        botones[dificultad] = boton_rect
-
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                for dificultad, rect in botones.items():
-                    if rect.collidepoint(event.pos):
-                        return dificultad # Devolvemos la dificultad elegida
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.boton_jugar.collidepoint(event.pos):
+                self.juego.cambiar(DifficultyScene(self.juego))
+            elif self.boton_estadisticas.collidepoint(event.pos):
+                self.juego.cambiar(StatsScene(self.juego))
 
+    def draw(self, pantalla):
+        pantalla.fill(NEGRO)
+        pantalla.blit(self.titulo_texto, self.rect_titulo)
+        pygame.draw.rect(pantalla, BLANCO, self.boton_jugar)
+        pantalla.blit(self.texto_boton, self.rect_texto_boton)
+        pygame.draw.rect(pantalla, BLANCO, self.boton_estadisticas)
+        pantalla.blit(self.texto_estadisticas, self.rect_texto_estadisticas)
+
+
+class DifficultyScene(Scene):
+    """Menú para elegir la dificultad; al elegirla empieza la partida."""
+    def __init__(self, juego):
+        super().__init__(juego)
+        fuentes = juego.fuentes
+        self.titulo_texto = textos.render(fuentes["titulo"], "ELIGE LA DIFICULTAD", True, BLANCO)
+        self.rect_titulo = self.titulo_texto.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2 - 150))
+
+        # Crear botones para cada dificultad
+        self.botones = {}
+        pos_y_inicial = ALTO_PANTALLA / 2 - 80
+        for i, dificultad in enumerate(DIFICULTADES.keys()):
+            pos_y = pos_y_inicial + i * 80
+            self.botones[dificultad] = pygame.Rect(ANCHO_PANTALLA / 2 - 125, pos_y, 250, 60)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for dificultad, rect in self.botones.items():
+                if rect.collidepoint(event.pos):
+                    self.juego.cambiar(self.juego.nueva_partida(dificultad))
+
+    def draw(self, pantalla):
         pantalla.fill(NEGRO)
-        pantalla.blit(titulo_texto, rect_titulo)
+        pantalla.blit(self.titulo_texto, self.rect_titulo)
 
         # Dibujar cada botón
-        for dificultad, rect in botones.items():
+        for dificultad, rect in self.botones.items():
             pygame.draw.rect(pantalla, BLANCO, rect)
-            texto_boton = fuentes["boton"].render(dificultad.capitalize(), True, NEGRO)
-            rect_texto_boton = texto_boton.get_rect(center=rect.center)
-            pantalla.blit(texto_boton, rect_texto_boton)
+            texto_boton = textos.render(self.juego.fuentes["boton"], dificultad.capitalize(), True, NEGRO)
+            pantalla.blit(texto_boton, texto_boton.get_rect(center=rect.center))
+
+
+class GameOverScene(Scene):
+    """Fin de la partida, con opciones para volver a jugar o volver al menú."""
+    def __init__(self, juego, ganador_texto, dificultad):
+        super().__init__(juego)
+        fuentes = juego.fuentes
+        # Solo se guarda la dificultad: la partida terminada no sigue viva durante la revancha
+        self.dificultad = dificultad
+        self.texto_ganador = textos.render(fuentes["titulo"], ganador_texto, True, BLANCO)
+        self.rect_ganador = self.texto_ganador.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2 - 100))
+
+        self.boton_rejugar = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2 + 50, 300, 60)
+        self.texto_rejugar = textos.render(fuentes["boton"], "Volver a Jugar", True, NEGRO)
+        self.rect_texto_rejugar = self.texto_rejugar.get_rect(center=self.boton_rejugar.center)
+
+        self.boton_menu = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2 + 130, 300, 60)
+        self.texto_menu = textos.render(fuentes["boton"], "Menú Principal", True, NEGRO)
+        self.rect_texto_menu = self.texto_menu.get_rect(center=self.boton_menu.center)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.boton_rejugar.collidepoint(event.pos):
+                self.juego.cambiar(self.juego.nueva_partida(self.dificultad))
+            elif self.boton_menu.collidepoint(event.pos):
+                self.juego.cambiar(MainMenuScene(self.juego))
+
+    def draw(self, pantalla):
+        pantalla.fill(NEGRO)
+        pantalla.blit(self.texto_ganador, self.rect_ganador)
+        pygame.draw.rect(pantalla, BLANCO, self.boton_rejugar)
+        pantalla.blit(self.texto_rejugar, self.rect_texto_rejugar)
+        pygame.draw.rect(pantalla, BLANCO, self.boton_menu)
+        pantalla.blit(self.texto_menu, self.rect_texto_menu)
 
-        pygame.display.flip()
-        reloj.tick(60)
 
-def pantalla_fin_juego(pantalla, ganador_texto, fuentes):
+class StatsScene(Scene):
     """
-    Muestra la pantalla de fin de juego con opciones para rejugar o volver al menú.
-    Devuelve True si se quiere volver a jugar, False para volver al menú.
+    Estadísticas guardadas: totales por dificultad y clasificación de jugadores.
+    Solo lee los totales que StatsStore lleva al día, sin recorrer el historial;
+    la tabla se compone una vez y solo se vuelve a componer si llega otra partida.
     """
-    reloj = pygame.time.Clock()
-
-    texto_ganador = fuentes["titulo"].render(ganador_texto, True, BLANCO)
-    rect_ganador = texto_ganador.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2 - 100))
-
-    boton_rejugar = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2 + 50, 300, 60)
-    texto_rejugar = fuentes["boton"].render("Volver a Jugar", True, NEGRO)
-    rect_texto_rejugar = texto_rejugar.get_rect(center=boton_rejugar.center)
-
-    boton_menu = pygame.Rect(ANCHO_PANTALLA / 2 - 150, ALTO_PANTALLA / 2 + 130, 300, 60)
-    texto_menu = fuentes["boton"].render("Menú Principal", True, NEGRO)
-    rect_texto_menu = texto_menu.get_rect(center=boton_menu.center)
-
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if boton_rejugar.collidepoint(event.pos):
-                    return True  # Volver a jugar
-                if boton_menu.collidepoint(event.pos):
-                    return False # Volver al menú
+    COLUMNAS_DIFICULTAD = (40, 200, 330, 460, 610)
+    COLUMNAS_CLASIFICACION = (40, 110, 400, 530, 660)
+
+    def __init__(self, juego):
+        super().__init__(juego)
+        self.partidas = None
+        self.fondo = None
+
+    def handle_event(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            self.juego.cambiar(MainMenuScene(self.juego))
+
+    def update(self, dt):
+        estadisticas = self.juego.estadisticas
+        partidas = estadisticas.partidas() if estadisticas is not None else 0
+        if partidas != self.partidas:
+            self.partidas = partidas
+            self.fondo = self._componer()
+
+    def _componer(self):
+        fuentes, estadisticas = self.juego.fuentes, self.juego.estadisticas
+        fondo = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA))
+        fondo.fill(NEGRO)
+        titulo = textos.render(fuentes["titulo"], "ESTADÍSTICAS", True, BLANCO)
+        fondo.blit(titulo, titulo.get_rect(center=(ANCHO_PANTALLA / 2, 50)))
+        # Las filas se rasterizan aquí directamente: no caben en la caché de textos y no se repiten
+        fuente = fuentes["info"]
+
+        def fila(y, valores, columnas):
+            for valor, x in zip(valores, columnas):
+                fondo.blit(fuente.render(str(valor), True, BLANCO), (x, y))
+
+        if estadisticas is None:
+            fila(120, ["Las estadísticas están desactivadas."], (40,))
+        else:
+            fila(110, ["Dificultad", "Partidas", "Victorias", "Rally máx.", "Vel. máx."], self.COLUMNAS_DIFICULTAD)
+            por_dificultad = estadisticas.por_dificultad()
+            for i, dificultad in enumerate(DIFICULTADES):
+                total = por_dificultad.get(dificultad)
+                valores = [dificultad.capitalize()] + (
+                    ["-"] * 4 if total is None else
+                    [total["partidas"], total["victorias"], total["rally_maximo"], f"{total['velocidad_maxima']:.1f}"])
+                fila(145 + i * 30, valores, self.COLUMNAS_DIFICULTAD)
+
+            fila(260, ["Puesto", "Jugador", "Partidas", "Victorias", "Puntos"], self.COLUMNAS_CLASIFICACION)
+            for puesto, (jugador, total) in enumerate(estadisticas.clasificacion(), 1):
+                fila(265 + puesto * 25, [f"{puesto}.", jugador, total["partidas"], total["victorias"],
+                                        f"{total['puntos_favor']}-{total['puntos_contra']}"],
+                     self.COLUMNAS_CLASIFICACION)
+        fila(ALTO_PANTALLA - 35, ["Volver: cualquier tecla o clic"], (40,))
+        return fondo
+
+    def draw(self, pantalla):
+        pantalla.blit(self.fondo, (0, 0))
+
+
+class PauseScene(Scene):
+    """
+    Partida en pausa. El último fotograma de la partida sigue en la pantalla, así
+    que solo se oscurece una vez con la capa semitransparente y se deja quieto.
+    """
+    # La capa se crea la primera vez que se pausa y se reutiliza en todas las pausas
+    _capa = None
+
+    def __init__(self, juego, partida):
+        super().__init__(juego)
+        self.partida = partida
+        self._dibujada = False
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_p:
+                self.juego.cambiar(self.partida)
+            elif event.key == pygame.K_x:
+                self.partida.salir()
+
+    def draw(self, pantalla):
+        if self._dibujada:
+            return
+        if PauseScene._capa is None:
+            PauseScene._capa = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA), pygame.SRCALPHA)
+            PauseScene._capa.fill((0, 0, 0, 150)) # Negro con 150 de alpha (0-255)
+        pantalla.blit(PauseScene._capa, (0, 0))
+        # Dibujamos el texto de pausa
+        texto_pausa = textos.render(self.juego.fuentes["titulo"], "PAUSA", True, BLANCO)
+        pantalla.blit(texto_pausa, texto_pausa.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2)))
+
+    def present(self):
+        if self._dibujada:
+            return False
+        pygame.display.flip()
+        self._dibujada = True
+        return True
 
-        pantalla.fill(NEGRO)
-        pantalla.blit(texto_ganador, rect_ganador)
-        pygame.draw.rect(pantalla, BLANCO, boton_rejugar)
-        pantalla.blit(texto_rejugar, rect_texto_rejugar)
-        pygame.draw.rect(pantalla, BLANCO, boton_menu)
-        pantalla.blit(texto_menu, rect_texto_menu)
+    def close(self):
+        self.partida.close()
 
-        pygame.display.flip()
-        reloj.tick(60)
 
-def game_loop(pantalla, dificultad, fuentes):
+class MatchScene(Scene):
     """
-    Esta es la función principal que contendrá nuestro juego.
+    Una partida. Con `repeticion` se reproduce a velocidad normal una partida grabada
+    en lugar de leer el teclado. Al salir con X (o al acabar la repetición) se pasa a
+    `salida`, o al menú principal si no se indica. Con `partida` se juega esa partida
+    ya creada en lugar de una nueva de `dificultad`.
     """
-    # --- Configuración basada en el modo de juego y la dificultad ---
-    config = DIFICULTADES[dificultad]
-    oponente_velocidad = config["oponente_velocidad"]
-    bola_velocidad_inicial = config["bola_velocidad"]
-
-    # --- Creación de los Objetos del Juego usando Clases ---
-    ball = Ball(ANCHO_PANTALLA / 2 - TAMANO_BOLA / 2, ALTO_PANTALLA / 2 - TAMANO_BOLA / 2, TAMANO_BOLA, bola_velocidad_inicial)
-    player = PlayerPaddle(ANCHO_PANTALLA - ANCHO_PALA - 20, ALTO_PANTALLA / 2 - ALTO_PALA / 2, ANCHO_PALA, ALTO_PALA, VELOCIDAD_JUGADOR)
-    opponent = OpponentPaddle(20, ALTO_PANTALLA / 2 - ALTO_PALA / 2, ANCHO_PALA, ALTO_PALA, oponente_velocidad)
-
-    # --- Variables de Puntuación y Estado ---
-    puntuacion_jugador = 0
-    puntuacion_oponente = 0
-    paused = False
-    reset_timer = 0 # Temporizador para el reinicio de la bola
-
-    # --- Control de Tiempo ---
-    reloj = pygame.time.Clock()
-
-    # --- Lista para Partículas ---
-    particles = []
-
-    # --- Bucle de Partida Individual ---
-    while True:
-        # --- Manejo de Eventos ---
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p:
-                    paused = not paused
-                if event.key == pygame.K_x:
-                    return # Salimos de game_loop para volver al menú principal
-
-        # Si hay un temporizador de reinicio, no hacemos nada más hasta que termine
-        if reset_timer > pygame.time.get_ticks():
-            pygame.display.flip()
-            reloj.tick(60)
-            continue
-
-        if not paused:
-            # --- Lógica del Juego ---
-            player.update()
-            ball.move()
-            opponent.update(ball)
-            
-            ball.check_wall_collision()
-            
-            if ball.rect.colliderect(player.rect):
-                ball.bounce(player, particles)
-            if ball.rect.colliderect(opponent.rect):
-                ball.bounce(opponent, particles)
-
-            # Lógica de Puntuación
-            if ball.rect.right >= ANCHO_PANTALLA or ball.rect.left <= 0:
-                if ball.rect.right >= ANCHO_PANTALLA:
-                    puntuacion_oponente += 1
-                else:
-                    puntuacion_jugador += 1
-                ball.reset()
-                reset_timer = pygame.time.get_ticks() + 1000 # Esperar 1 segundo
+    ayuda = AYUDA_PARTIDA
+
+    def __init__(self, juego, dificultad=None, repeticion=None, salida=None, partida=None):
+        super().__init__(juego)
+        # --- Creación de la Partida (semilla propia, o la de la repetición) ---
+        if repeticion is not None:
+            self.partida = Match(repeticion.dificultad, repeticion.seed, repeticion.ia)
+            self.entradas = repeticion.inputs()
+        elif partida is not None:
+            self.partida = partida
+            self.entradas = None
+        else:
+            self.partida = Match(dificultad, ia=juego.ia)
+            self.entradas = None
+        self.repeticion = repeticion
+        self.salida = salida
+        self.particles = self.partida.particles
+
+        # --- Grabación de la Repetición (opcional) ---
+        # (una partida en red no se puede repetir: la pala del rival no sale de la semilla).
+        # Se escribe en disco mientras se juega, así no se pierde si el juego se cierra de golpe.
+        self.grabador = None
+        if juego.carpeta_repeticiones and repeticion is None and not self.partida.rival_remoto:
+            nombre = f"partida-{time.strftime('%Y%m%d-%H%M%S')}-{self.partida.seed}.rep"
+            self.ruta_repeticion = os.path.join(juego.carpeta_repeticiones, nombre)
+            self.grabador = ReplayRecorder.open(self.ruta_repeticion, self.partida.seed,
+                                                self.partida.dificultad, self.partida.ia)
+
+        # --- Perfilador por fases (F3 muestra u oculta el panel) ---
+        self.profiler = self.partida.profiler = FrameProfiler() if juego.ruta_perfil else NULL_PROFILER
+        self.mostrar_perfil = False
+        self._cerrada = False
+
+        # Segundos que faltan para volver a sacar tras un punto, y si ya se ha dibujado
+        # el fotograma del punto (con el nuevo marcador y la bola en el centro)
+        self.espera_punto = 0.0
+        self._punto_dibujado = True
+        # Si el último draw ha cambiado la pantalla
+        self._dibujado = False
+        # La simulación avanza en pasos fijos; el acumulador guarda el tiempo real
+        # aún no simulado y el resto se usa para interpolar el dibujo.
+        self.acumulador = 0.0
+        self.anteriores = self._posiciones()
+
+        # Nivel de calidad aplicado a la bola y las partículas (ver calidad.py)
+        self._calidad = None
+
+        # --- Renderizado por rectángulos sucios (opcional) ---
+        self.renderer = None
+        if juego.dirty_rects:
+            self.marcador = (self.partida.puntuacion_jugador, self.partida.puntuacion_oponente)
+            self.renderer = DirtyRectRenderer(juego.pantalla, componer_fondo(juego.fuentes, *self.marcador, self.ayuda))
+
+    def _posiciones(self):
+        partida = self.partida
+        return (partida.ball.rect.topleft, partida.player.rect.topleft, partida.opponent.rect.topleft)
+
+    def close(self):
+        """Termina la repetición (con el resultado en el pie) y guarda el perfil de la partida."""
+        if self._cerrada:
+            return
+        self._cerrada = True
+        partida = self.partida
+        if self.grabador is not None:
+            self.grabador.close(partida.puntuacion_jugador, partida.puntuacion_oponente)
+            if not self.grabador.pasos:
+                os.remove(self.ruta_repeticion) # No se llegó a jugar
+        if self.juego.ruta_perfil:
+            self.profiler.export(self.juego.ruta_perfil)
+
+    def salir(self):
+        self.close()
+        self.juego.cambiar(self.salida if self.salida is not None else MainMenuScene(self.juego))
+
+    def enter(self):
+        # Al volver de la pausa la pantalla tiene encima la capa oscura
+        if self.renderer is not None:
+            self.renderer.invalidate()
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_p:
+                self.juego.cambiar(PauseScene(self.juego, self))
+            if event.key == pygame.K_x:
+                self.salir() # Volvemos al menú principal
+            if event.key == pygame.K_F3:
+                self.mostrar_perfil = not self.mostrar_perfil
+                if self.mostrar_perfil and not self.profiler.enabled:
+                    # El perfilador se activa la primera vez que se pide el panel
+                    self.profiler = self.partida.profiler = FrameProfiler()
+                if self.renderer is not None:
+                    self.renderer.invalidate()
+
+    def update(self, dt):
+        # Tras un punto no se simula nada hasta que pasa la espera
+        if self.espera_punto > 0:
+            self.espera_punto -= dt
+            return
+
+        # --- Lógica del Juego (paso fijo) ---
+        partida, perfil = self.partida, self.profiler
+        self.acumulador += dt
+        pasos = 0
+        while self.acumulador >= PASO_SIMULACION and pasos < MAX_PASOS_POR_FOTOGRAMA:
+            # La entrada se lee una vez por paso para que la repetición sea exacta
+            if self.entradas is None:
+                entrada = leer_entrada()
             else:
-                # Actualizar partículas
-                for particle in particles:
-                    particle.update()
-                # Eliminar partículas muertas (con list comprehension para eficiencia)
-                particles = [p for p in particles if p.lifespan > 0]
-
-            # --- Dibujo ---
+                entrada = next(self.entradas, None)
+                if entrada is None:
+                    self.salir() # Fin de la repetición
+                    return
+            if self.grabador is not None:
+                self.grabador.record(entrada)
+            perfil.lap("entrada")
+
+            self.anteriores = self._posiciones()
+            self.acumulador -= PASO_SIMULACION
+            pasos += 1
+            if partida.step(entrada):
+                self.espera_punto = SEGUNDOS_ESPERA_PUNTO
+                self._punto_dibujado = False
+                # Tras un punto no se interpola ni se arrastra tiempo pendiente
+                self.anteriores = self._posiciones()
+                self.acumulador = 0.0
+                break
+        if pasos == MAX_PASOS_POR_FOTOGRAMA:
+            # Vamos demasiado retrasados: descartamos el tiempo que no podemos recuperar
+            self.acumulador = min(self.acumulador, PASO_SIMULACION)
+
+        # --- Comprobación de Fin de Juego ---
+        ganador = partida.ganador()
+        if ganador is not None:
+            if self.repeticion is not None:
+                self.salir() # La repetición termina con la partida
+                return
+            self.close()
+            if self.juego.estadisticas is not None:
+                # Solo deja el resumen en la cola: se escribe desde otro hilo
+                self.juego.estadisticas.record(resumen_partida(partida, self.juego.jugador))
+            ganador_texto = "¡Has ganado!" if ganador == "jugador" else "¡Has perdido!"
+            self.juego.cambiar(GameOverScene(self.juego, ganador_texto, partida.dificultad))
+
+    def _aplicar_calidad(self):
+        """Ajusta la estela y las partículas cuando cambia el nivel de calidad."""
+        calidad = self.juego.calidad
+        if calidad.indice == self._calidad:
+            return calidad.ajustes
+        self._calidad = calidad.indice
+        ajustes = calidad.ajustes
+        # Solo cambia el dibujo: la simulación (y las repeticiones) no dependen de ello
+        self.partida.ball.set_trail_length(ajustes["estela"])
+        self.particles.density = ajustes["particulas"]
+        return ajustes
+
+    def draw(self, pantalla):
+        # Durante la espera tras un punto la pantalla no cambia: se dibuja solo el primer fotograma
+        self._dibujado = False
+        if self.espera_punto > 0:
+            if self._punto_dibujado:
+                return
+            self._punto_dibujado = True
+        self._dibujado = True
+        ajustes = self._aplicar_calidad()
+        partida, perfil, renderer = self.partida, self.profiler, self.renderer
+        ball, player, opponent = partida.ball, partida.player, partida.opponent
+        puntuacion_jugador, puntuacion_oponente = partida.puntuacion_jugador, partida.puntuacion_oponente
+
+        # Fracción del siguiente paso ya transcurrida, para interpolar el dibujo
+        alpha = self.acumulador / PASO_SIMULACION
+        rect_bola = interpolar(ball.rect, self.anteriores[0], alpha)
+        rect_jugador = interpolar(player.rect, self.anteriores[1], alpha)
+        rect_oponente = interpolar(opponent.rect, self.anteriores[2], alpha)
+
+        # --- Dibujo ---
+        if renderer is None:
             pantalla.fill(NEGRO)
-            player.draw(pantalla)
-            opponent.draw(pantalla)
-            ball.draw(pantalla)
-            # Dibujar partículas
-            for particle in particles:
-                particle.draw(pantalla)
-            pygame.draw.aaline(pantalla, BLANCO, (ANCHO_PANTALLA / 2, 0), (ANCHO_PANTALLA / 2, ALTO_PANTALLA))
-
-            texto_jugador = fuentes["juego"].render(f"{puntuacion_jugador}", False, BLANCO)
+        else:
+            # El fondo solo se recompone cuando cambia la puntuación
+            if self.marcador != (puntuacion_jugador, puntuacion_oponente):
+                self.marcador = (puntuacion_jugador, puntuacion_oponente)
+                renderer.set_background(componer_fondo(self.juego.fuentes, *self.marcador, self.ayuda))
+            renderer.begin()
+        perfil.lap("dibujo_fondo")
+        player.draw(pantalla, rect_jugador)
+        opponent.draw(pantalla, rect_oponente)
+        perfil.lap("dibujo_palas")
+        ball.draw(pantalla, rect_bola)
+        perfil.lap("dibujo_bola")
+        # Dibujar partículas
+        self.particles.draw(pantalla)
+        perfil.lap("dibujo_particulas")
+
+        fuentes = self.juego.fuentes
+        if renderer is None:
+            linea = pygame.draw.aaline if ajustes["antialias"] else pygame.draw.line
+            linea(pantalla, BLANCO, (ANCHO_PANTALLA / 2, 0), (ANCHO_PANTALLA / 2, ALTO_PANTALLA))
+
+            texto_jugador = textos.render(fuentes["juego"], f"{puntuacion_jugador}", False, BLANCO)
             pantalla.blit(texto_jugador, (ANCHO_PANTALLA / 2 + 20, 20))
-            texto_oponente = fuentes["juego"].render(f"{puntuacion_oponente}", False, BLANCO)
+            texto_oponente = textos.render(fuentes["juego"], f"{puntuacion_oponente}", False, BLANCO)
             pantalla.blit(texto_oponente, (ANCHO_PANTALLA / 2 - 50, 20))
 
             # Dibujamos el texto de ayuda en la parte superior
-            info_texto = fuentes["info"].render("Mover: ↑/↓ | Salir: X | Pausa: P", True, BLANCO)
+            info_texto = textos.render(fuentes["info"], self.ayuda, ajustes["antialias"], BLANCO)
             pantalla.blit(info_texto, (10, 10))
+        else:
+            # La línea y los textos ya están en el fondo; solo marcamos lo que se mueve
+            renderer.mark(rect_jugador)
+            renderer.mark(rect_oponente)
+            renderer.mark(ball.bounds().union(rect_bola))
+            renderer.mark(self.particles.bounds())
+
+        if self.mostrar_perfil:
+            rect_panel = perfil.draw_overlay(pantalla, fuentes["info"], ajustes["transparencias"])
+            if renderer is not None:
+                renderer.mark(rect_panel)
+        perfil.lap("dibujo_hud")
+
+    def present(self):
+        # --- Actualización de la Pantalla ---
+        if not self._dibujado:
+            return False
+        if self.renderer is None:
+            pygame.display.flip()
+            return True
+        return self.renderer.present()
 
-            # --- Comprobación de Fin de Juego ---
-            if paused: # Si el juego está en pausa, mostramos el texto "PAUSA"
-                # Dibujamos una capa semitransparente
-                overlay = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 150)) # Negro con 150 de alpha (0-255)
-                pantalla.blit(overlay, (0, 0))
-                # Dibujamos el texto de pausa
-                texto_pausa = fuentes["titulo"].render("PAUSA", True, BLANCO)
-                rect_pausa = texto_pausa.get_rect(center=(ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2))
-                pantalla.blit(texto_pausa, rect_pausa)
-
-            ganador_texto = ""
-            if puntuacion_jugador >= PUNTUACION_GANADORA:
-                ganador_texto = "¡Has ganado!"
-            if puntuacion_oponente >= PUNTUACION_GANADORA:
-                ganador_texto = "¡Has perdido!"
-                
-            if ganador_texto:
-                if not pantalla_fin_juego(pantalla, ganador_texto, fuentes):
-                    return # Si el jugador elige "Menú Principal", salimos de game_loop
-                else:
-                    game_loop(pantalla, dificultad, fuentes) # Reiniciamos el juego
 
-            # --- Actualización de la Pantalla ---
-            pygame.display.flip()
-            reloj.tick(60)
+class NetMatchScene(MatchScene):
+    """
+    Partida a dos jugadores en red (ver red.py). El anfitrión simula la partida y
+    juega con la pala derecha; el cliente juega con la izquierda y predice su pala
+    y la bola hasta que llega el estado del anfitrión. No hay pausa (el otro jugador
+    seguiría jugando) ni espera tras cada punto.
+    """
+    ayuda = "Mover: ↑/↓ | Salir: X"
+
+    def __init__(self, juego, dificultad="medio"):
+        from red import HostSession, ClientSession, UdpLink
+        super().__init__(juego, partida=Match(dificultad, ia=juego.ia, rival_remoto=True))
+        red = juego.red
+        self.anfitrion = red["anfitrion"]
+        self.direccion = red["direccion"]
+        if self.anfitrion:
+            self.enlace = UdpLink(self.direccion, latencia=red["latencia"], perdida=red["perdida"]).start()
+            self.sesion = HostSession(self.partida, self.enlace.send)
+        else:
+            self.enlace = UdpLink(remoto=self.direccion, latencia=red["latencia"], perdida=red["perdida"]).start()
+            # La dificultad y la semilla las elige el anfitrión: llegan con su primera instantánea
+            self.sesion = ClientSession(self.partida, self.enlace.send, ANCHO_PANTALLA,
+                                        lambda dificultad, seed: Match(dificultad, seed, rival_remoto=True))
+        # Tráfico de la red, medido una vez por segundo para el marcador
+        self._medicion = (time.monotonic(), 0)
+        self.kb_por_segundo = 0.0
+
+    def close(self):
+        super().close()
+        self.enlace.close()
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+            return
+        super().handle_event(event)
+
+    def update(self, dt):
+        sesion = self.sesion
+        for datos, direccion in self.enlace.receive():
+            if self.anfitrion:
+                sesion.receive(datos, direccion)
+            else:
+                sesion.receive(datos)
+        if sesion.partida is not self.partida:
+            self._usar_partida(sesion.partida)
+        self._medir_trafico()
+
+        if sesion.conectado and time.monotonic() - sesion.ultimo_paquete > SEGUNDOS_SIN_RED:
+            self.close()
+            self.juego.cambiar(GameOverScene(self.juego, "Conexión perdida", self.partida.dificultad))
+            return
+        if self.anfitrion and not sesion.conectado:
+            return # Esperando al otro jugador
+
+        # --- Lógica del Juego (paso fijo, como en MatchScene) ---
+        self.acumulador += dt
+        pasos = 0
+        while self.acumulador >= PASO_SIMULACION and pasos < MAX_PASOS_POR_FOTOGRAMA:
+            entrada = leer_entrada()
+            self.profiler.lap("entrada")
+            self.anteriores = self._posiciones()
+            self.acumulador -= PASO_SIMULACION
+            pasos += 1
+            sesion.step(entrada)
+        if pasos == MAX_PASOS_POR_FOTOGRAMA:
+            self.acumulador = min(self.acumulador, PASO_SIMULACION)
+
+        # --- Comprobación de Fin de Juego (en el cliente, con el marcador del anfitrión) ---
+        ganador = self.partida.ganador()
+        if ganador is not None:
+            if self.anfitrion:
+                sesion.send_final()
+            self.close()
+            ganado = ganador == ("jugador" if self.anfitrion else "oponente")
+            ganador_texto = "¡Has ganado!" if ganado else "¡Has perdido!"
+            self.juego.cambiar(GameOverScene(self.juego, ganador_texto, self.partida.dificultad))
+
+    def _usar_partida(self, partida):
+        """Pasa a dibujar `partida`, la que el cliente ha creado con la configuración del anfitrión."""
+        self.partida = partida
+        self.particles = partida.particles
+        partida.profiler = self.profiler
+        self._calidad = None
+        self.anteriores = self._posiciones()
+
+    def _medir_trafico(self):
+        ahora = time.monotonic()
+        inicio, bytes_anteriores = self._medicion
+        if ahora - inicio >= 1:
+            total = self.enlace.bytes_enviados + self.enlace.bytes_recibidos
+            self.kb_por_segundo = (total - bytes_anteriores) / 1024 / (ahora - inicio)
+            self._medicion = (ahora, total)
+
+    def draw(self, pantalla):
+        super().draw(pantalla)
+        if not self.sesion.conectado:
+            if self.anfitrion:
+                estado = f"Esperando al otro jugador en el puerto {self.direccion[1]}..."
+            else:
+                estado = f"Conectando con {self.direccion[0]}:{self.direccion[1]}..."
+        else:
+            rtt = self.sesion.rtt_pasos * PASO_SIMULACION * 1000
+            estado = f"RTT: {rtt:.0f} ms | {self.kb_por_segundo:.1f} KB/s"
+        texto = textos.render(self.juego.fuentes["info"], estado, True, BLANCO)
+        rect = pantalla.blit(texto, (10, ALTO_PANTALLA - 30))
+        if self.renderer is not None:
+            self.renderer.mark(rect)
 
-if __name__ == '__main__':
-    # --- Inicialización General ---
-    pygame.init()
-    # Creamos la superficie principal donde dibujaremos todo.
-    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
-    # Le damos un título a la ventana.
-    pygame.display.set_caption('Tenis con Pygame')
 
-    # --- Cargar Icono ---
+class MultiBallScene(Scene):
+    """
+    Modo multibola: `bolas` bolas a la vez, con choques entre ellas y obstáculos
+    con premio en el centro (ver multibola.py). Cada bola que se escapa es un punto
+    y vuelve a sacarse; se juega hasta salir con X.
+    """
+    def __init__(self, juego, dificultad="medio", bolas=200):
+        super().__init__(juego)
+        ajustes = DIFICULTADES[dificultad]
+        self.player = PlayerPaddle(ANCHO_PANTALLA - ANCHO_PALA - 20, ALTO_PANTALLA / 2 - ALTO_PALA / 2,
+                                   ANCHO_PALA, ALTO_PALA, VELOCIDAD_JUGADOR)
+        self.opponent = OpponentPaddle(20, ALTO_PANTALLA / 2 - ALTO_PALA / 2, ANCHO_PALA, ALTO_PALA,
+                                       ajustes["oponente_velocidad"])
+        self.bolas = MultiBallField(capacity=2 * bolas + 64, ancho=ANCHO_PANTALLA, alto=ALTO_PANTALLA,
+                                    velocidad=ajustes["bola_velocidad"])
+        self.bolas.start(bolas)
+        self.sprite = Ball.sprites.ellipse(TAMANO_BOLA, TAMANO_BOLA, BLANCO)
+        self.puntuacion_jugador = 0
+        self.puntuacion_oponente = 0
+        self.acumulador = 0.0
+        self.profiler = FrameProfiler() if juego.ruta_perfil else NULL_PROFILER
+
+    def close(self):
+        if self.juego.ruta_perfil:
+            self.profiler.export(self.juego.ruta_perfil)
+
+    def salir(self):
+        self.close()
+        self.juego.cambiar(MainMenuScene(self.juego))
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_p:
+                self.juego.cambiar(PauseScene(self.juego, self))
+            if event.key == pygame.K_x:
+                self.salir()
+
+    def step(self, entrada):
+        """Un paso de simulación de las palas y de todas las bolas."""
+        self.player.update(entrada)
+        # El oponente va a por la bola que antes llegará a su lado
+        amenaza = self.bolas.threat("izquierda")
+        self.opponent.move_towards(ALTO_PANTALLA / 2 if amenaza is None else amenaza)
+        self.profiler.lap("palas")
+        puntos_jugador, puntos_oponente = self.bolas.step((self.player.rect, self.opponent.rect))
+        self.puntuacion_jugador += puntos_jugador
+        self.puntuacion_oponente += puntos_oponente
+        self.profiler.lap("bola")
+
+    def update(self, dt):
+        # --- Lógica del Juego (paso fijo, como en MatchScene) ---
+        self.acumulador += dt
+        pasos = 0
+        while self.acumulador >= PASO_SIMULACION and pasos < MAX_PASOS_POR_FOTOGRAMA:
+            entrada = leer_entrada()
+            self.profiler.lap("entrada")
+            self.step(entrada)
+            self.acumulador -= PASO_SIMULACION
+            pasos += 1
+        if pasos == MAX_PASOS_POR_FOTOGRAMA:
+            self.acumulador = min(self.acumulador, PASO_SIMULACION)
+
+    def draw(self, pantalla):
+        perfil, fuentes = self.profiler, self.juego.fuentes
+        antialias = self.juego.calidad.ajustes["antialias"]
+        pantalla.fill(NEGRO)
+        linea = pygame.draw.aaline if antialias else pygame.draw.line
+        linea(pantalla, BLANCO, (ANCHO_PANTALLA / 2, 0), (ANCHO_PANTALLA / 2, ALTO_PANTALLA))
+        perfil.lap("dibujo_fondo")
+        self.player.draw(pantalla)
+        self.opponent.draw(pantalla)
+        perfil.lap("dibujo_palas")
+        self.bolas.draw(pantalla, self.sprite)
+        perfil.lap("dibujo_bola")
+
+        texto_jugador = textos.render(fuentes["juego"], f"{self.puntuacion_jugador}", False, BLANCO)
+        pantalla.blit(texto_jugador, (ANCHO_PANTALLA / 2 + 20, 20))
+        texto_oponente = textos.render(fuentes["juego"], f"{self.puntuacion_oponente}", False, BLANCO)
+        pantalla.blit(texto_oponente, texto_oponente.get_rect(topright=(ANCHO_PANTALLA / 2 - 20, 20)))
+        info_texto = textos.render(fuentes["info"], f"Bolas: {len(self.bolas)} | Salir: X | Pausa: P",
+                                   antialias, BLANCO)
+        pantalla.blit(info_texto, (10, 10))
+        perfil.lap("dibujo_hud")
+
+
+class ReplayListScene(Scene):
+    """Reproduce en ventana, una tras otra, las repeticiones de `rutas` y termina."""
+    def __init__(self, juego, rutas):
+        super().__init__(juego)
+        self.pendientes = deque(rutas)
+
+    def update(self, dt):
+        # Cada repetición se carga justo antes de reproducirla y vuelve aquí al acabar
+        if self.pendientes:
+            repeticion = Replay.load(self.pendientes.popleft())
+            self.juego.cambiar(MatchScene(self.juego, repeticion=repeticion, salida=self))
+        else:
+            self.juego.cambiar(None)
+
+def cargar_icono():
     try:
-        icon = pygame.image.load(resource_path("icon.ico"))
-        pygame.display.set_icon(icon)
+        pygame.display.set_icon(pygame.image.load(resource_path("icon.ico")))
     except (pygame.error, FileNotFoundError):
         print("¡Advertencia! No se pudo cargar el archivo de icono 'icon.ico'.")
 
-    # --- Cargar Fuentes una sola vez ---
-    fuentes = {
-        "titulo": pygame.font.Font(None, 74),
-        "boton": pygame.font.Font(None, 50),
-        "juego": pygame.font.Font(None, 74),
-        "info": pygame.font.Font(None, 24)
-    }
-
-    # Bucle principal del programa
-    while True:
-        menu_principal(pantalla, fuentes)
-        dificultad_elegida = menu_dificultad(pantalla, fuentes)
-        game_loop(pantalla, dificultad_elegida, fuentes)
+if __name__ == '__main__':
+    fin_importacion = time.perf_counter()
+    # --- Opciones de Línea de Comandos ---
+    parser = argparse.ArgumentParser(description="Tenis con Pygame")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redibuja solo las zonas que cambian (más rápido en equipos modestos)")
+    parser.add_argument("--ia", choices=IAS, default="perseguidora",
+                        help="tipo de IA del oponente (por defecto: perseguidora)")
+    parser.add_argument("--multibola", metavar="N", type=int, default=0,
+                        help="modo multibola: juega con N bolas a la vez, con choques entre ellas y obstáculos")
+    parser.add_argument("--calidad", choices=("auto",) + NOMBRES_CALIDAD, default="auto",
+                        help="calidad gráfica fija, o 'auto' para bajarla y subirla según los FPS (por defecto)")
+    parser.add_argument("--anfitrion", action="store_true",
+                        help="juega en red a dos jugadores: espera a que otro se conecte en --puerto")
+    parser.add_argument("--conectar", metavar="HOST[:PUERTO]",
+                        help="juega en red a dos jugadores contra el anfitrión HOST")
+    parser.add_argument("--puerto", type=int,
+                        help="puerto UDP del anfitrión (por defecto: 50007, ver red.PUERTO)")
+    parser.add_argument("--latencia", metavar="MS", type=float, default=0,
+                        help="latencia simulada en cada envío por la red, para probar en local")
+    parser.add_argument("--perdida", metavar="P", type=float, default=0,
+                        help="fracción de paquetes enviados que se descartan (0.05 = 5%%), para probar en local")
+    parser.add_argument("--baja-latencia", action="store_true",
+                        help="lee la entrada justo antes de dibujar y ajusta el ritmo de fotogramas al milisegundo "
+                             "(usa algo más de CPU)")
+    parser.add_argument("--vsync", action="store_true",
+                        help="sincroniza el flip con el refresco de la pantalla (si el sistema lo permite)")
+    parser.add_argument("--medir-latencia", metavar="ARCHIVO",
+                        help="mide la latencia de cada pulsación hasta que se ve en pantalla, la muestra al salir "
+                             "y la guarda en ARCHIVO (JSON)")
+    parser.add_argument("--estadisticas", metavar="CARPETA", default="estadisticas",
+                        help="carpeta donde se guardan las estadísticas de las partidas (por defecto: estadisticas)")
+    parser.add_argument("--sin-estadisticas", action="store_true",
+                        help="no guarda las estadísticas de las partidas")
+    parser.add_argument("--jugador", metavar="NOMBRE", default=JUGADOR,
+                        help=f"nombre con el que se guardan las estadísticas (por defecto: {JUGADOR})")
+    parser.add_argument("--video", metavar="CARPETA",
+                        help="graba en CARPETA todo lo que se ve en la pantalla (ver captura.py)")
+    parser.add_argument("--video-ligero", action="store_true",
+                        help="con --video, graba a mitad de tamaño y con 256 colores (con pérdida, ocupa menos)")
+    parser.add_argument("--perfil", metavar="ARCHIVO",
+                        help="mide cada fase del fotograma y la exporta a ARCHIVO (.json o .csv) "
+                             "al terminar cada partida")
+    parser.add_argument("--grabar", metavar="CARPETA",
+                        help="guarda una repetición de cada partida en CARPETA")
+    parser.add_argument("--reproducir", metavar="ARCHIVO", nargs="+",
+                        help="reproduce una o varias repeticiones grabadas")
+    parser.add_argument("--sin-ventana", action="store_true",
+                        help="con --reproducir, reproduce sin ventana a máxima velocidad y comprueba el resultado")
+    parser.add_argument("--medir-arranque", "--measure-startup", action="store_true",
+                        help="muestra cuánto tardan la importación, la inicialización y el primer fotograma, y sale")
+    args = parser.parse_args()
+    if args.anfitrion and args.conectar:
+        parser.error("--anfitrion y --conectar no se pueden usar a la vez")
+
+    # --- Partidas en Red ---
+    red = None
+    if args.anfitrion or args.conectar:
+        from red import PUERTO
+        puerto = args.puerto or PUERTO
+        if args.anfitrion:
+            red = {"anfitrion": True, "direccion": ("0.0.0.0", puerto)}
+        else:
+            host, _, puerto_host = args.conectar.partition(":")
+            red = {"anfitrion": False, "direccion": (socket.gethostbyname(host), int(puerto_host or puerto))}
+        red.update(latencia=args.latencia / 1000, perdida=args.perdida)
+
+    # --- Reproducción sin Ventana (p. ej. en CI) ---
+    if args.reproducir and args.sin_ventana:
+        fallos = 0
+        for ruta in args.reproducir:
+            repeticion = Replay.load(ruta)
+            partida = reproducir_sin_ventana(repeticion)
+            resultado = (partida.puntuacion_jugador, partida.puntuacion_oponente)
+            if repeticion.resultado is None:
+                # Grabación cortada (el juego se cerró): no hay resultado con el que comparar
+                print(f"SIN PIE {ruta}: {resultado[0]}-{resultado[1]} tras {partida.pasos} pasos")
+                continue
+            correcta = resultado == repeticion.resultado and partida.pasos == repeticion.pasos
+            fallos += not correcta
+            print(f"{'OK     ' if correcta else 'FALLO  '} {ruta}: {resultado[0]}-{resultado[1]} "
+                  f"(grabado {repeticion.resultado[0]}-{repeticion.resultado[1]}, {partida.pasos} pasos)")
+        sys.exit(1 if fallos else 0)
+
+    if args.grabar:
+        os.makedirs(args.grabar, exist_ok=True)
 
-        # Cuando game_loop termina (porque el usuario eligió "Menú Principal"),
-        # el bucle vuelve a empezar, mostrando de nuevo el menú de inicio.
+    # --- Inicialización General ---
+    inicio_init = time.perf_counter()
+    # Solo los módulos que usa el juego: pygame.init() también abriría el audio, los mandos...
+    pygame.display.init()
+    pygame.font.init()
+    # Creamos la superficie principal donde dibujaremos todo.
+    pantalla = None
+    if args.vsync:
+        # pygame solo admite vsync con ventanas SCALED (u OpenGL)
+        try:
+            pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA), pygame.SCALED, vsync=1)
+        except pygame.error:
+            print("¡Advertencia! Este sistema no permite activar el vsync.")
+    if pantalla is None:
+        pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    # Le damos un título a la ventana.
+    pygame.display.set_caption('Tenis con Pygame')
 
-    pygame.quit()
\ No newline at end of file
+    # --- Fuentes y Textos de los Menús ---
+    # Las fuentes se cargan al rasterizar el primer texto que no está en el atlas
+    fuentes = cargar_fuentes()
+    textos.load_atlas(resource_path(RUTA_ATLAS), resource_path(RUTA_INDICE_ATLAS), fuentes)
+
+    if args.calidad == "auto":
+        calidad = QualityController()
+    else:
+        calidad = QualityController(args.calidad, automatico=False)
+    # La grabación de vídeo escribe en disco desde su propio hilo
+    video = None
+    if args.video:
+        from captura import FrameRecorder
+        video = FrameRecorder(pantalla, args.video, ligera=args.video_ligero).start()
+    marcapasos = HybridPacer(vsync=args.vsync) if args.baja_latencia else None
+    latencias = LatencyMeter() if args.medir_latencia else None
+    estadisticas = None if args.sin_estadisticas else StatsStore(args.estadisticas)
+    juego = SceneManager(pantalla, fuentes, args.dirty_rects, args.grabar, args.perfil, args.ia, args.multibola,
+                         calidad, red, video, marcapasos, latencias, estadisticas, args.jugador)
+
+    def abrir_estadisticas():
+        try:
+            estadisticas.start()
+        except (StatsError, OSError) as error:
+            print(f"¡Advertencia! No se pueden guardar las estadísticas: {error}")
+            juego.estadisticas = None
+
+    # --- Cargar Icono y Estadísticas (cuando la ventana ya muestra el primer fotograma) ---
+    juego.tras_primer_fotograma.append(cargar_icono)
+    # Al medir el arranque solo se dibuja un fotograma: no se abren las estadísticas
+    if estadisticas is not None and not args.medir_arranque:
+        juego.tras_primer_fotograma.append(abrir_estadisticas)
+    fin_init = time.perf_counter()
+
+    if args.medir_arranque:
+        juego.run(MainMenuScene(juego), max_frames=1)
+        print(f"Importación:      {(fin_importacion - INICIO_PROCESO) * 1000:8.1f} ms")
+        print(f"Inicialización:   {(fin_init - inicio_init) * 1000:8.1f} ms")
+        print(f"Primer fotograma: {(juego.tiempo_primer_fotograma - fin_init) * 1000:8.1f} ms")
+        print(f"Total:            {(juego.tiempo_primer_fotograma - INICIO_PROCESO) * 1000:8.1f} ms")
+        pygame.quit()
+        sys.exit()
+
+    if args.reproducir:
+        # --- Reproducción en Ventana a Velocidad Normal ---
+        juego.run(ReplayListScene(juego, args.reproducir))
+    elif args.conectar:
+        # El cliente entra directamente en la partida: la dificultad y la semilla llegan del anfitrión
+        juego.run(NetMatchScene(juego))
+    else:
+        # Bucle principal del programa: del menú a la partida y vuelta, sin recursión
+        juego.run(MainMenuScene(juego))
+
+    if video is not None:
+        video.close()
+    if juego.estadisticas is not None:
+        juego.estadisticas.close()
+    if latencias is not None:
+        print(latencias.informe())
+        latencias.export(args.medir_latencia)
+    pygame.quit()
+    sys.exit()
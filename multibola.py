@@ -0,0 +1,332 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Modo multibola: cientos de bolas a la vez, con choques entre ellas y
+obstáculos con premio en el centro del campo.
+
+Como en `ParticlePool`, el estado de todas las bolas vive en arrays de NumPy
+y se actualiza en bloque. Los pares de bolas que pueden chocar salen de una
+rejilla uniforme (`UniformGrid`): cada bola solo se compara con las de su
+celda y las vecinas, en lugar de con todas las demás.
+"""
+import numpy as np
+import pygame
+
+# Mismos valores que Ball y Ball.bounce de main.py
+TAMANO_BOLA = 20
+FACTOR_ACELERACION = 1.05
+VELOCIDAD_MAXIMA_X = 15
+
+# --- Obstáculos ---
+# "rebote": solo desvía la bola.
+# "multiplicar": además lanza COPIAS_MULTIPLICAR bolas nuevas desde el punto de impacto.
+# "acelerar": además multiplica por FACTOR_ACELERAR la velocidad de la bola.
+TIPOS_OBSTACULO = ("rebote", "multiplicar", "acelerar")
+COPIAS_MULTIPLICAR = 2
+FACTOR_ACELERAR = 1.25
+RECARGA_OBSTACULO = 180 # Pasos que un obstáculo con premio tarda en volver a estar activo
+COLORES_OBSTACULO = {
+    "rebote": (120, 120, 120),
+    "multiplicar": (80, 200, 120),
+    "acelerar": (220, 120, 60),
+}
+
+# Vecinos de una celda que se comparan con ella: la propia y la mitad de las
+# ocho adyacentes, para que cada par de celdas se recorra una sola vez.
+VECINOS = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+class UniformGrid:
+    """
+    Rejilla uniforme para la fase amplia de colisiones. Con celdas al menos tan
+    grandes como el diámetro de las bolas, dos bolas que se tocan están siempre
+    en la misma celda o en celdas vecinas.
+    """
+    def __init__(self, ancho, alto, celda):
+        self.celda = celda
+        self.columnas = max(1, int(np.ceil(ancho / celda)))
+        self.filas = max(1, int(np.ceil(alto / celda)))
+
+    def pairs(self, x, y):
+        """Índices (i, j), con i != j, de los pares de puntos en celdas iguales o vecinas."""
+        n = len(x)
+        if n < 2:
+            vacio = np.empty(0, dtype=np.intp)
+            return vacio, vacio
+        columna = np.clip((x // self.celda).astype(np.intp), 0, self.columnas - 1)
+        fila = np.clip((y // self.celda).astype(np.intp), 0, self.filas - 1)
+        clave = fila * self.columnas + columna
+
+        # Ordenando por celda, las bolas de cada celda quedan contiguas
+        orden = np.argsort(clave, kind="stable")
+        claves = clave[orden]
+        columna, fila = columna[orden], fila[orden]
+        posiciones = np.arange(n)
+
+        lista_i, lista_j = [], []
+        for dx, dy in VECINOS:
+            if (dx, dy) == (0, 0):
+                # En la propia celda, cada bola solo con las que van detrás de ella
+                inicio = posiciones + 1
+                fin = np.searchsorted(claves, claves, side="right")
+            else:
+                vecina_columna, vecina_fila = columna + dx, fila + dy
+                validas = ((vecina_columna >= 0) & (vecina_columna < self.columnas)
+                           & (vecina_fila < self.filas))
+                vecina = vecina_fila * self.columnas + vecina_columna
+                inicio = np.searchsorted(claves, vecina, side="left")
+                fin = np.where(validas, np.searchsorted(claves, vecina, side="right"), inicio)
+            cuantos = np.maximum(fin - inicio, 0)
+            total = int(cuantos.sum())
+            if total == 0:
+                continue
+            # Expandimos cada rango [inicio, fin) sin bucles de Python
+            i = np.repeat(posiciones, cuantos)
+            desplazamiento = np.arange(total) - np.repeat(np.cumsum(cuantos) - cuantos, cuantos)
+            lista_i.append(i)
+            lista_j.append(np.repeat(inicio, cuantos) + desplazamiento)
+        if not lista_i:
+            vacio = np.empty(0, dtype=np.intp)
+            return vacio, vacio
+        return orden[np.concatenate(lista_i)], orden[np.concatenate(lista_j)]
+
+
+class Obstacle:
+    """Obstáculo rectangular en el campo. Los que tienen premio se desactivan un rato tras usarse."""
+    def __init__(self, x, y, width, height, tipo="rebote"):
+        if tipo not in TIPOS_OBSTACULO:
+            raise ValueError(f"Tipo de obstáculo desconocido: {tipo}")
+        self.rect = pygame.Rect(x, y, width, height)
+        self.tipo = tipo
+        self.recarga = 0
+
+    @property
+    def activo(self):
+        return self.recarga == 0
+
+    def draw(self, screen):
+        if self.activo:
+            pygame.draw.rect(screen, COLORES_OBSTACULO[self.tipo], self.rect)
+
+
+def obstaculos_por_defecto(ancho, alto):
+    """Disposición inicial: un muro en el centro y un obstáculo con premio a cada lado."""
+    return [
+        Obstacle(ancho // 2 - 10, alto // 2 - 60, 20, 120, "rebote"),
+        Obstacle(ancho // 2 - 120, alto // 4 - 20, 40, 40, "multiplicar"),
+        Obstacle(ancho // 2 + 80, alto * 3 // 4 - 20, 40, 40, "multiplicar"),
+        Obstacle(ancho // 2 + 80, alto // 4 - 20, 40, 40, "acelerar"),
+        Obstacle(ancho // 2 - 120, alto * 3 // 4 - 20, 40, 40, "acelerar"),
+    ]
+
+
+class MultiBallField:
+    """
+    Todas las bolas del modo multibola. Las posiciones son los centros. Cuando
+    una bola sale por un lado cuenta como punto y vuelve a sacarse desde el
+    centro, salvo que haya más bolas que `objetivo` (las de los premios), en
+    cuyo caso desaparece.
+    """
+    def __init__(self, capacity=1024, ancho=800, alto=600, velocidad=7, rng=None, obstaculos=None):
+        self.capacity = capacity
+        self.ancho, self.alto = ancho, alto
+        self.radio = TAMANO_BOLA / 2
+        self.velocidad = velocidad
+        self.rng = np.random.default_rng(rng)
+        self.obstaculos = obstaculos_por_defecto(ancho, alto) if obstaculos is None else obstaculos
+        self.grid = UniformGrid(ancho, alto, TAMANO_BOLA * 2)
+        self.objetivo = 0
+
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.speed_x = np.zeros(capacity)
+        self.speed_y = np.zeros(capacity)
+        self.viva = np.zeros(capacity, dtype=bool)
+        # Pares que han chocado en el último paso (para pruebas y el panel de rendimiento)
+        self.choques = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.viva))
+
+    def spawn(self, count, x=None, y=None, speed_x=None, speed_y=None):
+        """
+        Añade hasta `count` bolas (las que quepan). Por defecto salen del centro
+        como en Ball.reset: velocidad inicial con dirección aleatoria en cada eje.
+        Devuelve los índices de las bolas creadas.
+        """
+        libres = np.flatnonzero(~self.viva)[:count]
+        count = len(libres)
+        self.x[libres] = self.ancho / 2 if x is None else x
+        self.y[libres] = self.rng.uniform(self.radio, self.alto - self.radio, count) if y is None else y
+        signos = self.rng.choice((-1.0, 1.0), (2, count))
+        self.speed_x[libres] = self.velocidad * signos[0] if speed_x is None else speed_x
+        self.speed_y[libres] = self.velocidad * signos[1] * self.rng.uniform(0.3, 1, count) \
+            if speed_y is None else speed_y
+        self.viva[libres] = True
+        return libres
+
+    def start(self, count):
+        """Empieza con `count` bolas; es también el número que se mantiene al marcar."""
+        self.viva[:] = False
+        self.objetivo = count
+        self.spawn(count)
+
+    def step(self, palas):
+        """
+        Avanza un paso. `palas` son los rectángulos de las palas (se rebota en ellas
+        igual que en Ball.bounce). Devuelve los puntos de (la pala derecha, la izquierda).
+        """
+        vivas = np.flatnonzero(self.viva)
+        x, y = self.x, self.y
+        x[vivas] += self.speed_x[vivas]
+        y[vivas] += self.speed_y[vivas]
+
+        self._paredes(vivas)
+        for pala in palas:
+            self._palas(vivas, pala)
+        for obstaculo in self.obstaculos:
+            self._obstaculo(vivas, obstaculo)
+        self._choques(vivas)
+        return self._puntos(vivas)
+
+    def _paredes(self, vivas):
+        r = self.radio
+        y, speed_y = self.y, self.speed_y
+        arriba = vivas[y[vivas] < r]
+        y[arriba] = r
+        speed_y[arriba] = np.abs(speed_y[arriba])
+        abajo = vivas[y[vivas] > self.alto - r]
+        y[abajo] = self.alto - r
+        speed_y[abajo] = -np.abs(speed_y[abajo])
+
+    def _tocan(self, vivas, rect):
+        """Bolas vivas cuyo rectángulo toca `rect`."""
+        r = self.radio
+        x, y = self.x[vivas], self.y[vivas]
+        return vivas[(x + r > rect.left) & (x - r < rect.right) & (y + r > rect.top) & (y - r < rect.bottom)]
+
+    def _palas(self, vivas, pala):
+        golpeadas = self._tocan(vivas, pala)
+        # Solo rebotan las que van hacia la pala; las que ya se alejan no se tocan
+        derecha = pala.centerx > self.ancho / 2
+        speed_x = self.speed_x[golpeadas]
+        golpeadas = golpeadas[speed_x > 0] if derecha else golpeadas[speed_x < 0]
+        if golpeadas.size == 0:
+            return
+        speed_x = self.speed_x[golpeadas]
+        speed_x = np.where(np.abs(speed_x) < VELOCIDAD_MAXIMA_X, speed_x * -FACTOR_ACELERACION, -speed_x)
+        self.speed_x[golpeadas] = speed_x
+        factor = (self.y[golpeadas] - pala.centery) / (pala.height / 2)
+        self.speed_y[golpeadas] = factor * np.abs(speed_x)
+        # Sacamos la bola de la pala para que no vuelva a chocar en el paso siguiente
+        self.x[golpeadas] = pala.left - self.radio if derecha else pala.right + self.radio
+
+    def _obstaculo(self, vivas, obstaculo):
+        if not obstaculo.activo:
+            obstaculo.recarga -= 1
+            return
+        golpeadas = self._tocan(vivas, obstaculo.rect)
+        if golpeadas.size == 0:
+            return
+        r, rect = self.radio, obstaculo.rect
+        x, y = self.x[golpeadas], self.y[golpeadas]
+        # Se rebota en el eje en el que la bola ha entrado menos en el obstáculo
+        hueco_x = np.minimum(x + r - rect.left, rect.right - (x - r))
+        hueco_y = np.minimum(y + r - rect.top, rect.bottom - (y - r))
+        lateral = hueco_x < hueco_y
+        por_la_izquierda = x < rect.centerx
+        por_arriba = y < rect.centery
+        self.speed_x[golpeadas] = np.where(
+            lateral, np.where(por_la_izquierda, -1, 1) * np.abs(self.speed_x[golpeadas]), self.speed_x[golpeadas])
+        self.speed_y[golpeadas] = np.where(
+            lateral, self.speed_y[golpeadas], np.where(por_arriba, -1, 1) * np.abs(self.speed_y[golpeadas]))
+        self.x[golpeadas] = np.where(lateral, np.where(por_la_izquierda, rect.left - r, rect.right + r), x)
+        self.y[golpeadas] = np.where(lateral, y, np.where(por_arriba, rect.top - r, rect.bottom + r))
+
+        if obstaculo.tipo == "rebote":
+            return
+        if obstaculo.tipo == "acelerar":
+            rapidas = np.abs(self.speed_x[golpeadas]) * FACTOR_ACELERAR <= VELOCIDAD_MAXIMA_X
+            self.speed_x[golpeadas[rapidas]] *= FACTOR_ACELERAR
+            self.speed_y[golpeadas[rapidas]] *= FACTOR_ACELERAR
+        elif obstaculo.tipo == "multiplicar":
+            # Las copias salen del primer impacto, en abanico respecto a la bola original
+            origen = golpeadas[0]
+            angulos = self.rng.uniform(-0.6, 0.6, COPIAS_MULTIPLICAR)
+            coseno, seno = np.cos(angulos), np.sin(angulos)
+            vx, vy = self.speed_x[origen], self.speed_y[origen]
+            self.spawn(COPIAS_MULTIPLICAR, self.x[origen], self.y[origen],
+                       vx * coseno - vy * seno, vx * seno + vy * coseno)
+        obstaculo.recarga = RECARGA_OBSTACULO
+
+    def _choques(self, vivas):
+        """Choques elásticos entre bolas (todas con la misma masa)."""
+        i, j = self.grid.pairs(self.x[vivas], self.y[vivas])
+        i, j = vivas[i], vivas[j]
+        dx, dy = self.x[j] - self.x[i], self.y[j] - self.y[i]
+        distancia2 = dx * dx + dy * dy
+        diametro = 2 * self.radio
+        cerca = (distancia2 < diametro * diametro) & (distancia2 > 0)
+        i, j, dx, dy = i[cerca], j[cerca], dx[cerca], dy[cerca]
+        self.choques = len(i)
+        if not self.choques:
+            return
+        distancia = np.sqrt(distancia2[cerca])
+        nx, ny = dx / distancia, dy / distancia
+
+        # Solo se intercambia velocidad si se están acercando
+        relativa = (self.speed_x[j] - self.speed_x[i]) * nx + (self.speed_y[j] - self.speed_y[i]) * ny
+        impulso = np.minimum(relativa, 0.0)
+        np.add.at(self.speed_x, i, impulso * nx)
+        np.add.at(self.speed_y, i, impulso * ny)
+        np.subtract.at(self.speed_x, j, impulso * nx)
+        np.subtract.at(self.speed_y, j, impulso * ny)
+
+        # Separamos las bolas que se solapan, la mitad cada una
+        solape = (diametro - distancia) / 2
+        np.subtract.at(self.x, i, solape * nx)
+        np.subtract.at(self.y, i, solape * ny)
+        np.add.at(self.x, j, solape * nx)
+        np.add.at(self.y, j, solape * ny)
+
+    def _puntos(self, vivas):
+        x = self.x[vivas]
+        por_la_izquierda = vivas[x < -self.radio]
+        por_la_derecha = vivas[x > self.ancho + self.radio]
+        fuera = np.concatenate((por_la_izquierda, por_la_derecha))
+        if fuera.size:
+            self.viva[fuera] = False
+            faltan = self.objetivo - len(self)
+            if faltan > 0:
+                self.spawn(faltan)
+        # Una bola que sale por la izquierda es punto de la pala derecha, y al revés
+        return len(por_la_izquierda), len(por_la_derecha)
+
+    def threat(self, lado):
+        """
+        Altura de la bola que antes llegará al lado indicado ("izquierda" o
+        "derecha"), o None si ninguna va hacia allí.
+        """
+        vivas = np.flatnonzero(self.viva)
+        if lado == "izquierda":
+            candidatas = vivas[self.speed_x[vivas] < 0]
+            tiempo = self.x[candidatas] / -self.speed_x[candidatas]
+        else:
+            candidatas = vivas[self.speed_x[vivas] > 0]
+            tiempo = (self.ancho - self.x[candidatas]) / self.speed_x[candidatas]
+        if candidatas.size == 0:
+            return None
+        return float(self.y[candidatas[np.argmin(tiempo)]])
+
+    def draw(self, screen, sprite):
+        """Dibuja todas las bolas con una sola llamada a `blits`."""
+        vivas = np.flatnonzero(self.viva)
+        for obstaculo in self.obstaculos:
+            obstaculo.draw(screen)
+        if vivas.size == 0:
+            return
+        r = self.radio
+        screen.blits([(sprite, (x, y)) for x, y in zip((self.x[vivas] - r).tolist(),
+                                                       (self.y[vivas] - r).tolist())],
+                     doreturn=False)
@@ -0,0 +1,97 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Sistema de partículas con un pool de capacidad fija.
+
+En lugar de crear un objeto `Particle` por partícula, las posiciones,
+velocidades, tamaños y tiempos de vida viven en arrays contiguos de NumPy.
+Todas se actualizan en una sola pasada vectorizada y se dibujan con una
+única llamada a `Surface.blits`.
+"""
+import numpy as np
+import pygame
+
+# Mismos valores que la clase Particle de main.py
+TAMANO_MIN = 2
+TAMANO_MAX = 4
+VIDA_PARTICULA = 30  # Fotogramas (aprox. medio segundo a 60 FPS)
+
+
+class ParticlePool:
+    def __init__(self, capacity=1024, color=(255, 255, 255), rng=None):
+        self.capacity = capacity
+        # Fracción de las partículas pedidas en `emit` que se lanzan (la baja el control de calidad)
+        self.density = 1.0
+        # Acepta un generador ya creado, una semilla o None
+        self.rng = np.random.default_rng(rng)
+
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.speed_x = np.zeros(capacity, dtype=np.float32)
+        self.speed_y = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.int8)
+        self.lifespan = np.zeros(capacity, dtype=np.int16)
+        # Máscara reutilizada en cada actualización para no reservar memoria
+        self._vivas = np.zeros(capacity, dtype=bool)
+        # Siguiente hueco a ocupar. Como todas las partículas viven lo mismo,
+        # recorrer el pool en anillo reutiliza siempre primero las más antiguas.
+        self._siguiente = 0
+
+        # Un cuadrado pre-dibujado por cada tamaño posible
+        self._sprites = {}
+        for tamano in range(TAMANO_MIN, TAMANO_MAX + 1):
+            sprite = pygame.Surface((tamano, tamano))
+            sprite.fill(color)
+            self._sprites[tamano] = sprite
+
+    def __len__(self):
+        return int(np.count_nonzero(self.lifespan > 0))
+
+    def emit(self, x, y, direction, count):
+        """Lanza `count` partículas (por `density`) desde (x, y) en la dirección horizontal indicada."""
+        count = min(round(count * self.density), self.capacity)
+        if count <= 0:
+            return
+        indices = (self._siguiente + np.arange(count)) % self.capacity
+        self._siguiente = int((self._siguiente + count) % self.capacity)
+
+        self.x[indices] = x
+        self.y[indices] = y
+        self.size[indices] = self.rng.integers(TAMANO_MIN, TAMANO_MAX + 1, count)
+        # La velocidad horizontal es en la dirección opuesta al golpe
+        self.speed_x[indices] = direction * self.rng.uniform(1, 4, count)
+        # La velocidad vertical es aleatoria hacia arriba o abajo
+        self.speed_y[indices] = self.rng.uniform(-3, 3, count)
+        self.lifespan[indices] = VIDA_PARTICULA
+
+    def update(self):
+        vivas = np.greater(self.lifespan, 0, out=self._vivas)
+        np.add(self.x, self.speed_x, out=self.x, where=vivas)
+        np.add(self.y, self.speed_y, out=self.y, where=vivas)
+        np.subtract(self.lifespan, 1, out=self.lifespan, where=vivas)
+
+    def clear(self):
+        self.lifespan.fill(0)
+
+    def bounds(self):
+        """Rectángulo que contiene todas las partículas vivas, o None si no hay ninguna."""
+        indices = np.flatnonzero(self.lifespan > 0)
+        if indices.size == 0:
+            return None
+        x, y = self.x[indices], self.y[indices]
+        izquierda, arriba = int(x.min()), int(y.min())
+        return pygame.Rect(izquierda, arriba,
+                           int(x.max()) - izquierda + TAMANO_MAX, int(y.max()) - arriba + TAMANO_MAX)
+
+    def draw(self, screen):
+        indices = np.flatnonzero(self.lifespan > 0)
+        if indices.size == 0:
+            return
+        sprites = self._sprites
+        screen.blits(
+            [(sprites[s], (x, y)) for s, x, y in zip(self.size[indices].tolist(),
+                                                    self.x[indices].tolist(),
+                                                    self.y[indices].tolist())],
+            doreturn=False,
+        )
@@ -0,0 +1,156 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Perfilador por fases de cada fotograma.
+
+Cada fotograma se divide en fases (eventos, física, cada grupo de dibujo,
+presentación en pantalla...). El perfilador mide cuánto tarda cada una y lo
+guarda en un buffer circular de tamaño fijo, de modo que medir no reserva
+memoria. Con `NullProfiler` (el valor por defecto) todas las llamadas son
+funciones vacías y el coste es prácticamente nulo.
+"""
+import csv
+import json
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+FASES = (
+    "eventos",
+    "entrada",
+    "palas",             # player.update / opponent.update
+    "bola",              # ball.move_swept: movimiento y colisiones continuas
+    "particulas",        # particles.update
+    "dibujo_fondo",
+    "dibujo_palas",
+    "dibujo_bola",
+    "dibujo_particulas",
+    "dibujo_hud",
+    "presentar",         # pygame.display.flip / update(rects)
+    "captura",           # copia del fotograma para la grabación de vídeo (--video)
+    "espera",            # reloj.tick
+)
+
+# Cada cuántos fotogramas se recalcula el texto del panel en pantalla
+REFRESCO_PANEL = 30
+
+
+class NullProfiler:
+    """Perfilador desactivado: no mide nada."""
+    enabled = False
+
+    def begin_frame(self):
+        pass
+
+    def lap(self, fase):
+        pass
+
+    def end_frame(self, particles=None):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler:
+    enabled = True
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        # Segundos por fase; una fila por fotograma, reutilizadas en anillo
+        self.tiempos = np.zeros((capacity, len(FASES)))
+        self.particulas = np.zeros(capacity, dtype=np.int32)
+        self.frames = 0
+        self._fila = 0
+        self._ultimo = perf_counter()
+        self._indices = {fase: i for i, fase in enumerate(FASES)}
+        self._panel = None
+        self._transparente = True
+
+    def begin_frame(self):
+        self._fila = self.frames % self.capacity
+        self.tiempos[self._fila] = 0.0
+        self._ultimo = perf_counter()
+
+    def lap(self, fase):
+        """Atribuye a `fase` el tiempo transcurrido desde la medición anterior."""
+        ahora = perf_counter()
+        self.tiempos[self._fila, self._indices[fase]] += ahora - self._ultimo
+        self._ultimo = ahora
+
+    def end_frame(self, particles=None):
+        if particles is not None:
+            self.particulas[self._fila] = len(particles)
+        self.frames += 1
+
+    def _orden(self):
+        """Índices de las filas completas del buffer, de la más antigua a la más reciente."""
+        if self.frames < self.capacity:
+            return np.arange(self.frames)
+        return np.roll(np.arange(self.capacity), -(self.frames % self.capacity))
+
+    def summary(self):
+        """Percentiles 50 y 99 de cada fase (y del fotograma completo) en milisegundos."""
+        orden = self._orden()
+        if orden.size == 0:
+            return {}
+        tiempos = self.tiempos[orden] * 1000
+        resumen = {}
+        for i, fase in enumerate(FASES):
+            p50, p99 = np.percentile(tiempos[:, i], (50, 99))
+            resumen[fase] = {"p50": float(p50), "p99": float(p99)}
+        p50, p99 = np.percentile(tiempos.sum(axis=1), (50, 99))
+        resumen["total"] = {"p50": float(p50), "p99": float(p99)}
+        return resumen
+
+    def export(self, ruta):
+        """Guarda las mediciones en JSON o CSV según la extensión de `ruta`."""
+        orden = self._orden()
+        tiempos = self.tiempos[orden] * 1000
+        particulas = self.particulas[orden]
+        if ruta.lower().endswith(".csv"):
+            with open(ruta, "w", newline="") as archivo:
+                escritor = csv.writer(archivo)
+                escritor.writerow([f"{fase}_ms" for fase in FASES] + ["particulas"])
+                for fila, cuantas in zip(tiempos.tolist(), particulas.tolist()):
+                    escritor.writerow([f"{t:.4f}" for t in fila] + [cuantas])
+        else:
+            with open(ruta, "w") as archivo:
+                json.dump({
+                    "fases": list(FASES),
+                    "resumen_ms": self.summary(),
+                    "fotogramas_ms": tiempos.round(4).tolist(),
+                    "particulas": particulas.tolist(),
+                }, archivo)
+
+    def draw_overlay(self, screen, font, transparente=True):
+        """
+        Dibuja el panel con p50/p99 por fase en la esquina superior derecha y
+        devuelve su rectángulo. El texto solo se vuelve a generar cada
+        REFRESCO_PANEL fotogramas; como los números cambian siempre, no pasa
+        por la caché de textos para no expulsar de ella los textos fijos.
+        Con `transparente=False` el panel es opaco, que es más barato de copiar.
+        """
+        if self._panel is None or self.frames % REFRESCO_PANEL == 0 or self._transparente != transparente:
+            self._transparente = transparente
+            resumen = self.summary()
+            orden = self._orden()
+            particulas = int(self.particulas[orden[-1]]) if orden.size else 0
+            lineas = [f"{fase:<18}{v['p50']:6.2f}{v['p99']:7.2f}" for fase, v in resumen.items()]
+            lineas = [f"{'fase (ms)':<18}{'p50':>6}{'p99':>7}"] + lineas + [f"particulas {particulas}"]
+            superficies = [font.render(linea, True, (255, 255, 255)) for linea in lineas]
+            alto_linea = font.get_linesize()
+            ancho = max(s.get_width() for s in superficies) + 10
+            if transparente:
+                self._panel = pygame.Surface((ancho, alto_linea * len(lineas) + 10), pygame.SRCALPHA)
+                self._panel.fill((0, 0, 0, 180))
+            else:
+                self._panel = pygame.Surface((ancho, alto_linea * len(lineas) + 10))
+                self._panel.fill((0, 0, 0))
+            for i, superficie in enumerate(superficies):
+                self._panel.blit(superficie, (5, 5 + i * alto_linea))
+        rect = self._panel.get_rect(topright=(screen.get_width() - 10, 40))
+        screen.blit(self._panel, rect)
+        return rect
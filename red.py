@@ -0,0 +1,378 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Modo a dos jugadores en red sobre UDP.
+
+Una instancia es el anfitrión: simula la partida (es la autoridad) y juega con
+la pala derecha. La otra es el cliente y juega con la izquierda:
+
+- El cliente solo envía su entrada de cada paso (con las últimas
+  REDUNDANCIA entradas repetidas en cada paquete, por si se pierde alguno).
+- El anfitrión envía cada PASOS_POR_ESTADO pasos una instantánea del estado
+  (bola, palas y marcador) codificada como diferencia respecto a la última
+  instantánea que el cliente ha confirmado. Las instantáneas completas llevan
+  además la dificultad y la semilla de la partida: las elige el anfitrión y el
+  cliente rehace su partida con ellas.
+- El cliente mueve su pala en cuanto pulsa la tecla (predicción). Cuando llega
+  una instantánea, coloca su pala donde dice el anfitrión y vuelve a aplicar
+  las entradas que el anfitrión aún no había procesado (reconciliación). La
+  bola se adelanta medio RTT para compensar el retraso de la instantánea.
+
+Las sesiones (`HostSession`, `ClientSession`) no hacen E/S: reciben datagramas
+y entregan los suyos a una función `enviar`. `UdpLink` es el socket real, un
+endpoint de asyncio en un hilo propio, con latencia y pérdida simuladas para
+probar en localhost.
+"""
+import asyncio
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+PUERTO = 50007
+
+# --- Mensajes ---
+ENTRADA = 1
+ESTADO = 2
+
+# Entrada: tipo, último paso del cliente, última instantánea recibida, número de entradas
+CABECERA_ENTRADA = struct.Struct("<BIIB")
+# Estado: tipo, secuencia, secuencia base (SIN_BASE = completa), paso del anfitrión,
+# último paso del cliente aplicado, máscara de campos incluidos
+CABECERA_ESTADO = struct.Struct("<BIIIIH")
+VALOR = struct.Struct("<h")
+SIN_BASE = 0xFFFFFFFF
+# Tras los campos, si la máscara lleva CON_CONFIGURACION: dificultad y semilla de la partida
+CONFIGURACION = struct.Struct("<16sQ")
+CON_CONFIGURACION = 1 << 15
+
+# Campos de una instantánea, todos enteros de 16 bits
+CAMPOS = ("bola_x", "bola_y", "bola_vx", "bola_vy", "pala_anfitrion", "pala_cliente",
+          "puntos_anfitrion", "puntos_cliente")
+ESCALA_VELOCIDAD = 1000 # Las velocidades viajan en milésimas de píxel por paso
+
+REDUNDANCIA = 8 # Entradas que se repiten en cada paquete del cliente
+PASOS_POR_ESTADO = 2 # Una instantánea cada dos pasos (30 por segundo)
+HISTORIAL_ESTADOS = 64 # Instantáneas que se recuerdan para usarlas como base
+MAX_COLA_ENTRADAS = 6 # Si el cliente se adelanta más, el anfitrión descarta las más antiguas
+MAX_ADELANTO = 30 # Pasos que puede adelantarse la bola en el cliente
+COPIAS_FINAL = 5 # Veces que se envía la instantánea final, por si se pierde alguna
+
+
+def estado_de_partida(partida):
+    """Valores de los CAMPOS de una partida del anfitrión."""
+    ball = partida.ball
+    return (ball.rect.x, ball.rect.y,
+            round(ball.speed_x * ESCALA_VELOCIDAD), round(ball.speed_y * ESCALA_VELOCIDAD),
+            partida.player.rect.y, partida.opponent.rect.y,
+            partida.puntuacion_jugador, partida.puntuacion_oponente)
+
+
+def encode_state(seq, paso, ack_entrada, valores, base=None, base_seq=SIN_BASE, configuracion=None):
+    """
+    Instantánea con solo los campos que han cambiado respecto a `base` (o todos si no
+    hay base). Las completas llevan también la `configuracion` (dificultad, semilla), si se indica.
+    """
+    mascara = 0
+    cambiados = []
+    for i, valor in enumerate(valores):
+        if base is None or base[i] != valor:
+            mascara |= 1 << i
+            cambiados.append(VALOR.pack(valor))
+    if base is None:
+        base_seq = SIN_BASE
+        if configuracion is not None:
+            mascara |= CON_CONFIGURACION
+            dificultad, seed = configuracion
+            cambiados.append(CONFIGURACION.pack(dificultad.encode("utf-8"), seed))
+    return CABECERA_ESTADO.pack(ESTADO, seq, base_seq, paso, ack_entrada, mascara) + b"".join(cambiados)
+
+
+def decode_state(datos, bases):
+    """
+    Devuelve (seq, paso, ack_entrada, valores, configuracion), o None si la base no
+    está en `bases` ({seq: valores}). `configuracion` es None si no la lleva.
+    """
+    _, seq, base_seq, paso, ack_entrada, mascara = CABECERA_ESTADO.unpack_from(datos)
+    if base_seq == SIN_BASE:
+        valores = [0] * len(CAMPOS)
+    else:
+        base = bases.get(base_seq)
+        if base is None:
+            return None
+        valores = list(base)
+    posicion = CABECERA_ESTADO.size
+    for i in range(len(CAMPOS)):
+        if mascara & (1 << i):
+            valores[i], = VALOR.unpack_from(datos, posicion)
+            posicion += VALOR.size
+    configuracion = None
+    if mascara & CON_CONFIGURACION:
+        dificultad, seed = CONFIGURACION.unpack_from(datos, posicion)
+        configuracion = (dificultad.rstrip(b"\0").decode("utf-8"), seed)
+    return seq, paso, ack_entrada, tuple(valores), configuracion
+
+
+def encode_inputs(paso, ack_estado, entradas):
+    """Paquete del cliente con las entradas de los pasos `paso - len(entradas) + 1` .. `paso`."""
+    return CABECERA_ENTRADA.pack(ENTRADA, paso, ack_estado, len(entradas)) + bytes(entradas)
+
+
+def decode_inputs(datos):
+    _, paso, ack_estado, cuantas = CABECERA_ENTRADA.unpack_from(datos)
+    entradas = datos[CABECERA_ENTRADA.size:CABECERA_ENTRADA.size + cuantas]
+    return paso, ack_estado, entradas
+
+
+class HostSession:
+    """
+    Lado del anfitrión. `partida` debe crearse con `rival_remoto=True`: la pala
+    izquierda se mueve con las entradas que llegan del cliente.
+    """
+    def __init__(self, partida, enviar):
+        self.partida = partida
+        self.enviar = enviar
+        self.cliente = None
+        # Entradas del cliente pendientes de aplicar, en orden: (paso del cliente, entrada)
+        self.entradas = deque()
+        self._ultimo_recibido = 0
+        self.ultima_aplicada = 0
+        self.entrada_rival = 0
+        self.seq = 0
+        # Instantáneas enviadas que aún pueden servir de base: {seq: (paso, valores)}
+        self._enviados = {}
+        self._base = None
+        self.rtt_pasos = 0
+        self.ultimo_paquete = None
+
+    @property
+    def conectado(self):
+        return self.cliente is not None
+
+    def receive(self, datos, direccion):
+        if not datos or datos[0] != ENTRADA or len(datos) < CABECERA_ENTRADA.size:
+            return
+        self.cliente = direccion
+        self.ultimo_paquete = time.monotonic()
+        paso, ack_estado, entradas = decode_inputs(datos)
+        primero = paso - len(entradas) + 1
+        for i, entrada in enumerate(entradas):
+            if primero + i > self._ultimo_recibido:
+                self.entradas.append((primero + i, entrada))
+                self._ultimo_recibido = primero + i
+        # El cliente se ha adelantado (p. ej. tras un tirón de la red): nos ponemos al día
+        while len(self.entradas) > MAX_COLA_ENTRADAS:
+            self.ultima_aplicada, self.entrada_rival = self.entradas.popleft()
+        if ack_estado in self._enviados and (self._base is None or ack_estado > self._base):
+            self._base = ack_estado
+            self.rtt_pasos = self.partida.pasos - self._enviados[ack_estado][0]
+
+    def step(self, entrada):
+        """Avanza un paso con la entrada local y la siguiente del cliente. Devuelve True si hay punto."""
+        if self.entradas:
+            self.ultima_aplicada, self.entrada_rival = self.entradas.popleft()
+        # Si no ha llegado la entrada del cliente, se repite la última
+        punto = self.partida.step(entrada, self.entrada_rival)
+        if punto or self.partida.pasos % PASOS_POR_ESTADO == 0:
+            self.send_state()
+        return punto
+
+    def send_state(self, completa=False):
+        if self.cliente is None:
+            return
+        self.seq += 1
+        valores = estado_de_partida(self.partida)
+        base = None if completa or self._base is None else self._enviados[self._base][1]
+        datos = encode_state(self.seq, self.partida.pasos, self.ultima_aplicada, valores, base, self._base,
+                             (self.partida.dificultad, self.partida.seed))
+        self._enviados[self.seq] = (self.partida.pasos, valores)
+        self._enviados.pop(self.seq - HISTORIAL_ESTADOS, None)
+        if self._base is not None and self._base <= self.seq - HISTORIAL_ESTADOS:
+            self._base = None
+        self.enviar(datos, self.cliente)
+
+    def send_final(self):
+        """Envía varias veces el estado final completo para que el cliente vea el resultado."""
+        for _ in range(COPIAS_FINAL):
+            self.send_state(completa=True)
+
+
+class ClientSession:
+    """
+    Lado del cliente. `partida` (creada con `rival_remoto=True`) solo guarda lo que
+    se dibuja: la pala izquierda es la del cliente y la derecha la del anfitrión.
+    `ancho` es el del campo, para no adelantar la bola más allá de la línea de fondo.
+    Cuando el anfitrión juega otra dificultad o semilla, `nueva_partida(dificultad, seed)`
+    crea la partida que la sustituye.
+    """
+    def __init__(self, partida, enviar, ancho, nueva_partida=None):
+        self.partida = partida
+        self.enviar = enviar
+        self.ancho = ancho
+        self.nueva_partida = nueva_partida
+        self.paso = 0
+        # Entradas que el anfitrión todavía no ha confirmado: (paso, entrada)
+        self.pendientes = deque(maxlen=256)
+        self._recientes = deque(maxlen=REDUNDANCIA)
+        self._recibidos = {}
+        self.ultimo_seq = 0
+        self.rtt_pasos = 0
+        self.ultimo_paquete = None
+
+    @property
+    def conectado(self):
+        return self.ultimo_seq > 0
+
+    def step(self, entrada):
+        """Predice un paso (su pala y la bola) y envía la entrada al anfitrión."""
+        partida = self.partida
+        self.paso += 1
+        self.pendientes.append((self.paso, entrada))
+        self._recientes.append(entrada)
+        partida.opponent.update(entrada)
+        if self.conectado:
+            partida.ball.move_swept((partida.player, partida.opponent), partida.particles)
+            if partida.particles is not None:
+                partida.particles.update()
+        self.enviar(encode_inputs(self.paso, self.ultimo_seq, self._recientes))
+
+    def receive(self, datos):
+        if not datos or datos[0] != ESTADO or len(datos) < CABECERA_ESTADO.size:
+            return
+        estado = decode_state(datos, self._recibidos)
+        if estado is None:
+            return # Falta la base: esperamos a la siguiente
+        seq, paso, ack_entrada, valores, configuracion = estado
+        self._recibidos[seq] = valores
+        self._recibidos.pop(seq - HISTORIAL_ESTADOS, None)
+        if seq <= self.ultimo_seq:
+            return # Llega desordenada: ya tenemos una más reciente
+        if (configuracion is not None and self.nueva_partida is not None
+                and configuracion != (self.partida.dificultad, self.partida.seed)):
+            self.partida = self.nueva_partida(*configuracion)
+        self.ultimo_seq = seq
+        self.ultimo_paquete = time.monotonic()
+        self._aplicar(valores, ack_entrada)
+
+    def _aplicar(self, valores, ack_entrada):
+        partida = self.partida
+        bola_x, bola_y, bola_vx, bola_vy, pala_anfitrion, pala_cliente, puntos_anfitrion, puntos_cliente = valores
+        partida.player.rect.y = pala_anfitrion
+        partida.puntuacion_jugador, partida.puntuacion_oponente = puntos_anfitrion, puntos_cliente
+
+        # Reconciliación: partimos de donde el anfitrión ve nuestra pala y repetimos
+        # las entradas que todavía no había aplicado
+        while self.pendientes and self.pendientes[0][0] <= ack_entrada:
+            self.pendientes.popleft()
+        partida.opponent.rect.y = pala_cliente
+        for _, entrada in self.pendientes:
+            partida.opponent.update(entrada)
+
+        # La instantánea tiene medio RTT de retraso: adelantamos la bola ese tiempo
+        ball = partida.ball
+        ball.rect.x, ball.rect.y = bola_x, bola_y
+        ball.speed_x, ball.speed_y = bola_vx / ESCALA_VELOCIDAD, bola_vy / ESCALA_VELOCIDAD
+        if ack_entrada:
+            self.rtt_pasos = self.paso - ack_entrada
+        for _ in range(min(self.rtt_pasos // 2, MAX_ADELANTO)):
+            ball.move_swept((partida.player, partida.opponent), None)
+            if ball.rect.left <= 0 or ball.rect.right >= self.ancho:
+                break
+
+
+class _Protocolo(asyncio.DatagramProtocol):
+    def __init__(self, recibidos):
+        self.recibidos = recibidos
+
+    def datagram_received(self, datos, direccion):
+        self.recibidos.append((datos, direccion))
+
+
+class UdpLink:
+    """
+    Socket UDP con un bucle de asyncio en un hilo propio. `send` se puede llamar
+    desde el hilo del juego; lo recibido se recoge con `receive`. `latencia`
+    (segundos, en cada envío) y `perdida` (probabilidad de descartar un paquete)
+    simulan una red real: con la misma latencia en las dos instancias, el RTT es
+    el doble.
+    """
+    def __init__(self, local=("0.0.0.0", 0), remoto=None, latencia=0.0, perdida=0.0, seed=None):
+        self.local = local
+        self.remoto = remoto
+        self.latencia = latencia
+        self.perdida = perdida
+        self._rng = random.Random(seed)
+        self._recibidos = deque()
+        self._listo = threading.Event()
+        self._error = None
+        self._loop = None
+        self._transporte = None
+        self._hilo = None
+        # Estadísticas
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+        self.paquetes_perdidos = 0
+
+    def start(self):
+        self._hilo = threading.Thread(target=self._ejecutar, name="red-udp", daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _ejecutar(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._transporte, _ = self._loop.run_until_complete(self._loop.create_datagram_endpoint(
+                lambda: _Protocolo(self._recibidos), local_addr=self.local))
+        except OSError as error:
+            self._error = error
+            self._listo.set()
+            self._loop.close()
+            return
+        self._listo.set()
+        self._loop.run_forever()
+        self._transporte.close()
+        self._loop.run_until_complete(asyncio.sleep(0))
+        self._loop.close()
+
+    @property
+    def address(self):
+        return self._transporte.get_extra_info("sockname")
+
+    def send(self, datos, direccion=None):
+        self.bytes_enviados += len(datos)
+        self._loop.call_soon_threadsafe(self._enviar, datos, direccion or self.remoto)
+
+    def _enviar(self, datos, direccion):
+        if self._transporte.is_closing():
+            return
+        if self.perdida and self._rng.random() < self.perdida:
+            self.paquetes_perdidos += 1
+            return
+        if self.latencia:
+            self._loop.call_later(self.latencia, self._enviar_ya, datos, direccion)
+        else:
+            self._transporte.sendto(datos, direccion)
+
+    def _enviar_ya(self, datos, direccion):
+        if not self._transporte.is_closing():
+            self._transporte.sendto(datos, direccion)
+
+    def receive(self):
+        """Datagramas recibidos desde la última llamada: lista de (datos, dirección)."""
+        recibidos = []
+        while self._recibidos:
+            datos, direccion = self._recibidos.popleft()
+            self.bytes_recibidos += len(datos)
+            recibidos.append((datos, direccion))
+        return recibidos
+
+    def close(self):
+        """Cierra el socket cuando han salido los envíos pendientes (los retrasados por `latencia` también)."""
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.call_later, self.latencia, self._loop.stop)
+            self._hilo.join(timeout=self.latencia + 1)
@@ -0,0 +1,65 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Renderizado por rectángulos sucios.
+
+Los elementos estáticos (fondo, línea central, textos) se componen una sola
+vez en una superficie de fondo. En cada fotograma solo se restauran desde el
+fondo las zonas que ocupaban los elementos móviles en el fotograma anterior,
+se dibujan los elementos en su nueva posición y se envían a la pantalla con
+`pygame.display.update(rects)` en lugar de `pygame.display.flip()`.
+"""
+import pygame
+
+
+class DirtyRectRenderer:
+    def __init__(self, pantalla, fondo):
+        self.pantalla = pantalla
+        self.fondo = fondo
+        self._limites = pantalla.get_rect()
+        self._anteriores = []
+        self._actuales = []
+        # El primer fotograma siempre se dibuja completo
+        self._completo = True
+
+    def set_background(self, fondo):
+        """Cambia el fondo (p. ej. al cambiar la puntuación) y fuerza un redibujado completo."""
+        self.fondo = fondo
+        self.invalidate()
+
+    def invalidate(self):
+        """El siguiente fotograma se restaurará y enviará entero."""
+        self._completo = True
+
+    def begin(self):
+        """Restaura desde el fondo las zonas sucias del fotograma anterior."""
+        if self._completo:
+            self.pantalla.blit(self.fondo, (0, 0))
+        else:
+            for rect in self._anteriores:
+                self.pantalla.blit(self.fondo, rect, rect)
+
+    def mark(self, rect):
+        """Registra una zona dibujada en este fotograma."""
+        if rect is None:
+            return
+        rect = self._limites.clip(rect)
+        if rect.width and rect.height:
+            self._actuales.append(rect)
+
+    def present(self):
+        """Envía a la pantalla solo las zonas que han cambiado. Devuelve False si no había ninguna."""
+        if self._completo:
+            pygame.display.update()
+            self._completo = False
+            enviado = True
+        else:
+            zonas = self._anteriores + self._actuales
+            if zonas:
+                pygame.display.update(zonas)
+            enviado = bool(zonas)
+        # Las zonas de este fotograma serán las que haya que borrar en el siguiente
+        self._anteriores, self._actuales = self._actuales, self._anteriores
+        self._actuales.clear()
+        return enviado
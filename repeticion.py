@@ -0,0 +1,155 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Formato binario de las repeticiones.
+
+Como la simulación es determinista (paso fijo y generadores aleatorios con
+semilla propia por partida), para reproducir una partida basta con guardar
+la semilla, la dificultad, el tipo de IA y la entrada del jugador en cada paso. La entrada
+se guarda comprimida por longitud de racha, porque una tecla suele mantenerse
+pulsada (o suelta) durante muchos pasos seguidos.
+
+El archivo se escribe mientras se juega: la cabecera al empezar, cada racha
+al cerrarse (como mucho PASOS_POR_VOLCADO pasos después) y el pie al terminar.
+Si el juego se cierra de golpe, la repetición queda sin pie pero se puede
+reproducir hasta donde llegó.
+
+Estructura del archivo:
+    cabecera  "<4sBQ16s"  magia, versión, semilla, dificultad
+    ia        "<16s"      tipo de IA del oponente (desde la versión 2)
+    rachas    "<BH"       entrada, número de pasos con esa entrada
+    pie       "<BBBI"     FIN, puntuación del jugador, del oponente, pasos totales
+"""
+import io
+import struct
+
+MAGIA = b"TNRP"
+VERSION = 2
+FIN = 0xFF
+
+CABECERA = struct.Struct("<4sBQ16s")
+IA = struct.Struct("<16s")
+RACHA = struct.Struct("<BH")
+PIE = struct.Struct("<BBBI")
+MAX_RACHA = 0xFFFF
+# Al grabar en disco, una racha se escribe como mucho tras este número de pasos
+# (un segundo), aunque la entrada no cambie: es lo máximo que se pierde si el juego se cierra
+PASOS_POR_VOLCADO = 60
+
+
+class ReplayError(Exception):
+    """El archivo no es una repetición válida."""
+
+
+class ReplayRecorder:
+    """
+    Escribe la repetición en `archivo` (un archivo binario abierto) a medida que se
+    juega. Sin `archivo` se guarda en memoria y se obtiene con `getvalue`.
+    """
+
+    def __init__(self, seed, dificultad, ia="perseguidora", archivo=None):
+        self.seed = seed
+        self.dificultad = dificultad
+        self.ia = ia
+        self.pasos = 0
+        self._archivo = archivo if archivo is not None else io.BytesIO()
+        self._max_racha = MAX_RACHA if archivo is None else PASOS_POR_VOLCADO
+        self._entrada = None
+        self._repeticiones = 0
+        self._escribir(CABECERA.pack(MAGIA, VERSION, seed, dificultad.encode("utf-8")) + IA.pack(ia.encode("utf-8")))
+
+    @classmethod
+    def open(cls, ruta, seed, dificultad, ia="perseguidora"):
+        """Empieza a grabar en el archivo `ruta`."""
+        return cls(seed, dificultad, ia, open(ruta, "wb"))
+
+    def _escribir(self, datos):
+        self._archivo.write(datos)
+        self._archivo.flush()
+
+    def record(self, entrada):
+        """Registra la entrada de un paso de simulación."""
+        self.pasos += 1
+        if entrada == self._entrada and self._repeticiones < self._max_racha:
+            self._repeticiones += 1
+            return
+        self._cerrar_racha()
+        self._entrada = entrada
+        self._repeticiones = 1
+
+    def _cerrar_racha(self):
+        if self._repeticiones:
+            self._escribir(RACHA.pack(self._entrada, self._repeticiones))
+        self._entrada, self._repeticiones = None, 0
+
+    def finish(self, puntuacion_jugador, puntuacion_oponente):
+        """Escribe la última racha y el pie con el resultado final."""
+        self._cerrar_racha()
+        self._escribir(PIE.pack(FIN, puntuacion_jugador, puntuacion_oponente, self.pasos))
+
+    def getvalue(self, puntuacion_jugador, puntuacion_oponente):
+        """Contenido completo de una repetición en memoria, con el resultado final en el pie."""
+        self.finish(puntuacion_jugador, puntuacion_oponente)
+        return self._archivo.getvalue()
+
+    def close(self, puntuacion_jugador, puntuacion_oponente):
+        """Termina la repetición y cierra el archivo."""
+        self.finish(puntuacion_jugador, puntuacion_oponente)
+        self._archivo.close()
+
+
+class Replay:
+    """Repetición leída de disco."""
+
+    def __init__(self, seed, dificultad, rachas, resultado, pasos, ia="perseguidora"):
+        self.seed = seed
+        self.dificultad = dificultad
+        self.ia = ia
+        self.rachas = rachas
+        # (puntuación del jugador, puntuación del oponente) al terminar la grabación,
+        # o None si la grabación se cortó antes del pie
+        self.resultado = resultado
+        self.pasos = pasos
+
+    @classmethod
+    def frombytes(cls, datos):
+        if len(datos) < CABECERA.size:
+            raise ReplayError("Archivo demasiado corto")
+        magia, version, seed, dificultad = CABECERA.unpack_from(datos)
+        if magia != MAGIA or version not in (1, VERSION):
+            raise ReplayError("No es una repetición compatible")
+
+        rachas = []
+        posicion = CABECERA.size
+        ia = b"perseguidora"
+        if version >= 2:
+            if posicion + IA.size > len(datos):
+                raise ReplayError("Archivo demasiado corto")
+            ia, = IA.unpack_from(datos, posicion)
+            posicion += IA.size
+        while posicion < len(datos) and datos[posicion] != FIN:
+            if posicion + RACHA.size > len(datos):
+                break
+            rachas.append(RACHA.unpack_from(datos, posicion))
+            posicion += RACHA.size
+        if posicion + PIE.size <= len(datos):
+            _, puntuacion_jugador, puntuacion_oponente, pasos = PIE.unpack_from(datos, posicion)
+            resultado = (puntuacion_jugador, puntuacion_oponente)
+        else:
+            # Sin pie (el juego se cerró durante la partida): vale lo que llegó a escribirse
+            resultado, pasos = None, sum(repeticiones for _, repeticiones in rachas)
+
+        return cls(seed, dificultad.rstrip(b"\0").decode("utf-8"), rachas,
+                   resultado, pasos, ia.rstrip(b"\0").decode("utf-8"))
+
+    @classmethod
+    def load(cls, ruta):
+        with open(ruta, "rb") as archivo:
+            return cls.frombytes(archivo.read())
+
+    def inputs(self):
+        """Entrada de cada paso, en orden."""
+        for entrada, repeticiones in self.rachas:
+            for _ in range(repeticiones):
+                yield entrada
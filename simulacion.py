@@ -0,0 +1,270 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Motor de simulación sin ventana que ejecuta muchas partidas a la vez.
+
+El estado de N partidas se guarda en arrays de NumPy y todas avanzan juntas
+con las mismas reglas que `Match.step` de `main.py`: las palas persiguen la
+bola (`OpponentPaddle.update`) y la bola avanza con colisiones continuas
+(`Ball.move_swept`, `tiempo_de_impacto` y `Ball.bounce`). Sirve para enfrentar
+IA contra IA en masa y ajustar la tabla `DIFICULTADES`.
+"""
+import numpy as np
+
+from main import (
+    ANCHO_PANTALLA, ALTO_PANTALLA, TAMANO_BOLA, ANCHO_PALA, ALTO_PALA,
+    PUNTUACION_GANADORA, VELOCIDAD_JUGADOR, DIFICULTADES, MAX_IMPACTOS_POR_PASO, PUNTERIA_PERSEGUIDORA,
+)
+
+# Posiciones iniciales, idénticas a las de Match
+BOLA_X_INICIAL = ANCHO_PANTALLA // 2 - TAMANO_BOLA // 2
+BOLA_Y_INICIAL = ALTO_PANTALLA // 2 - TAMANO_BOLA // 2
+PALA_Y_INICIAL = ALTO_PANTALLA // 2 - ALTO_PALA // 2
+JUGADOR_X = ANCHO_PANTALLA - ANCHO_PALA - 20
+OPONENTE_X = 20
+
+# Mismos valores que en Ball.bounce
+FACTOR_ACELERACION = 1.05
+VELOCIDAD_MAXIMA_X = 15
+
+# La partida espera 1 segundo (60 fotogramas) tras cada punto
+FOTOGRAMAS_ESPERA = 60
+
+
+def _redondear(valores):
+    """Redondea como pygame.Rect al asignar un float (mitades lejos del cero)."""
+    return np.trunc(valores + np.copysign(0.5, valores))
+
+
+def _tiempo_de_impacto(x, y, dx, dy, pala_x, pala_y):
+    """
+    Equivalente vectorizado de `tiempo_de_impacto` entre la bola y una pala:
+    el instante en [0, 1) del primer contacto, o infinito si no la toca.
+    """
+    t_entrada = np.zeros_like(x)
+    t_salida = np.ones_like(x)
+    valido = np.ones(x.shape, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for pos, tam, vel, o_pos, o_tam in ((x, TAMANO_BOLA, dx, pala_x, ANCHO_PALA),
+                                            (y, TAMANO_BOLA, dy, pala_y, ALTO_PALA)):
+            # Sin movimiento en este eje tiene que estar ya solapada en él
+            quieta = vel == 0
+            valido &= ~quieta | ((pos + tam > o_pos) & (pos < o_pos + o_tam))
+            t1 = (o_pos - pos - tam) / vel
+            t2 = (o_pos + o_tam - pos) / vel
+            t_entrada = np.where(quieta, t_entrada, np.maximum(t_entrada, np.minimum(t1, t2)))
+            t_salida = np.where(quieta, t_salida, np.minimum(t_salida, np.maximum(t1, t2)))
+    # La entrada solo crece y la salida solo decrece: basta con comprobarlas al final
+    return np.where(valido & (t_entrada < t_salida), t_entrada, np.inf)
+
+
+def _velocidades(dificultades, n, clave):
+    """Convierte una dificultad (o una lista de ellas) en un array de velocidades."""
+    if isinstance(dificultades, str):
+        return np.full(n, DIFICULTADES[dificultades][clave], dtype=np.float64)
+    valores = [DIFICULTADES[d][clave] for d in dificultades]
+    if len(valores) != n:
+        raise ValueError("Se necesita una dificultad por partida")
+    return np.asarray(valores, dtype=np.float64)
+
+
+class VectorizedMatches:
+    """
+    N partidas de IA contra IA simuladas en paralelo.
+
+    La pala izquierda es siempre el oponente de la dificultad elegida. La pala
+    derecha (la del jugador) persigue la bola con `velocidad_jugador`, salvo que
+    `step` reciba acciones explícitas (-1 arriba, 0 quieta, 1 abajo). Como en
+    `OpponentPaddle`, con cada trayectoria nueva las palas apuntan a la bola con
+    un desvío aleatorio de hasta `punteria` píxeles.
+    """
+
+    def __init__(self, n, dificultad="medio", velocidad_jugador=VELOCIDAD_JUGADOR,
+                 seed=None, frames_espera=FOTOGRAMAS_ESPERA, punteria=PUNTERIA_PERSEGUIDORA):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.frames_espera = frames_espera
+        self.punteria = punteria
+
+        self.velocidad_bola = _velocidades(dificultad, n, "bola_velocidad")
+        self.velocidad_oponente = _velocidades(dificultad, n, "oponente_velocidad")
+        self.velocidad_jugador = np.broadcast_to(
+            np.asarray(velocidad_jugador, dtype=np.float64), (n,)).copy()
+
+        # --- Estado de la bola ---
+        self.ball_x = np.empty(n)
+        self.ball_y = np.empty(n)
+        self.speed_x = np.empty(n)
+        self.speed_y = np.empty(n)
+
+        # --- Estado de las palas (solo se mueven en vertical) ---
+        self.player_y = np.empty(n)
+        self.opponent_y = np.empty(n)
+        self.desvio_jugador = np.zeros(n)
+        self.desvio_oponente = np.zeros(n)
+
+        # --- Puntuación y control ---
+        self.puntuacion_jugador = np.zeros(n, dtype=np.int64)
+        self.puntuacion_oponente = np.zeros(n, dtype=np.int64)
+        self.espera = np.zeros(n, dtype=np.int64)
+        self.frames = np.zeros(n, dtype=np.int64)
+        self.terminada = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+    def reset(self, mascara=None):
+        """Vuelve a empezar desde cero las partidas de la máscara (todas si no se indica)."""
+        if mascara is None:
+            mascara = np.ones(self.n, dtype=bool)
+        self.player_y[mascara] = PALA_Y_INICIAL
+        self.opponent_y[mascara] = PALA_Y_INICIAL
+        self.puntuacion_jugador[mascara] = 0
+        self.puntuacion_oponente[mascara] = 0
+        self.espera[mascara] = 0
+        self.frames[mascara] = 0
+        self.terminada[mascara] = False
+        self._reset_bolas(mascara)
+        self._apuntar(mascara)
+
+    def _reset_bolas(self, mascara):
+        """Equivalente vectorizado de Ball.reset para las partidas de la máscara."""
+        cuantas = int(np.count_nonzero(mascara))
+        if cuantas == 0:
+            return
+        self.ball_x[mascara] = BOLA_X_INICIAL
+        self.ball_y[mascara] = BOLA_Y_INICIAL
+        signos = self.rng.choice((1.0, -1.0), size=(2, cuantas))
+        self.speed_x[mascara] = self.velocidad_bola[mascara] * signos[0]
+        self.speed_y[mascara] = self.velocidad_bola[mascara] * signos[1]
+
+    def _apuntar(self, mascara):
+        """Nuevo desvío de las dos palas en las partidas de la máscara (trayectoria nueva)."""
+        cuantas = int(np.count_nonzero(mascara))
+        if cuantas == 0:
+            return
+        desvios = self.rng.uniform(-self.punteria, self.punteria, size=(2, cuantas))
+        self.desvio_jugador[mascara] = desvios[0]
+        self.desvio_oponente[mascara] = desvios[1]
+
+    @staticmethod
+    def _perseguir(pala_y, velocidad, bola_y, desvio):
+        """Regla de OpponentPaddle.update: acercar el centro de la pala al de la bola, más el desvío."""
+        centro_bola = bola_y + TAMANO_BOLA // 2 + desvio
+        # Las dos comprobaciones son secuenciales, igual que los dos `if` del original
+        pala_y = pala_y + np.where(pala_y + ALTO_PALA // 2 < centro_bola, velocidad, 0.0)
+        pala_y = pala_y - np.where(pala_y + ALTO_PALA // 2 > centro_bola, velocidad, 0.0)
+        return pala_y
+
+    @staticmethod
+    def _limitar(pala_y):
+        """Regla de Paddle.keep_in_bounds."""
+        return np.clip(pala_y, 0, ALTO_PANTALLA - ALTO_PALA)
+
+    def _rebotar(self, mascara, pala_y):
+        """Regla de Ball.bounce (sin partículas) para las partidas de la máscara."""
+        rapida = np.abs(self.speed_x) >= VELOCIDAD_MAXIMA_X
+        factor = np.where(rapida, -1.0, -FACTOR_ACELERACION)
+        self.speed_x = np.where(mascara, self.speed_x * factor, self.speed_x)
+        diff_y = (self.ball_y + TAMANO_BOLA // 2) - (pala_y + ALTO_PALA // 2)
+        bounce_factor = diff_y / (ALTO_PALA / 2)
+        self.speed_y = np.where(mascara, bounce_factor * np.abs(self.speed_x), self.speed_y)
+
+    def _mover_con_barrido(self, activa):
+        """
+        Regla de Ball.move_swept (sin partículas): avanza la bola un paso resolviendo,
+        en orden, hasta MAX_IMPACTOS_POR_PASO choques con las palas y las paredes.
+        Devuelve la máscara de partidas en las que la bola ha cambiado de trayectoria.
+        """
+        n = self.n
+        x, y = self.ball_x.copy(), self.ball_y.copy()
+        restante = np.ones(n)
+        pendiente = activa.copy()
+        cambio = np.zeros(n, dtype=bool)
+        palas = ((JUGADOR_X, self.player_y), (OPONENTE_X, self.opponent_y))
+        for _ in range(MAX_IMPACTOS_POR_PASO):
+            if not pendiente.any():
+                break
+            dx, dy = self.speed_x * restante, self.speed_y * restante
+            t_impacto = np.ones(n)
+            golpeada = np.full(n, -1) # Índice en `palas` de la pala golpeada, o -1
+            for i, (pala_x, pala_y) in enumerate(palas):
+                # Solo cuenta la pala hacia la que se mueve la bola
+                hacia_ella = (pala_x + ANCHO_PALA // 2 - (x + TAMANO_BOLA / 2)) * dx > 0
+                t = _tiempo_de_impacto(x, y, dx, dy, pala_x, pala_y)
+                golpe = hacia_ella & (t < t_impacto)
+                t_impacto = np.where(golpe, t, t_impacto)
+                golpeada = np.where(golpe, i, golpeada)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t_arriba = np.maximum(0.0, -y / dy)
+                t_abajo = np.maximum(0.0, (ALTO_PANTALLA - TAMANO_BOLA - y) / dy)
+            t_pared = np.where((dy < 0) & (y + dy < 0), t_arriba,
+                               np.where((dy > 0) & (y + TAMANO_BOLA + dy > ALTO_PANTALLA), t_abajo, np.inf))
+            pared = t_pared < t_impacto
+            t_impacto = np.where(pared, t_pared, t_impacto)
+            golpeada = np.where(pared, -1, golpeada)
+
+            x = np.where(pendiente, x + dx * t_impacto, x)
+            y = np.where(pendiente, y + dy * t_impacto, y)
+            choque = pendiente & (pared | (golpeada >= 0))
+            # La bola se coloca en el punto de contacto (redondeado como en el Rect) antes del rebote
+            self.ball_x = np.where(choque, _redondear(x), self.ball_x)
+            self.ball_y = np.where(choque, _redondear(y), self.ball_y)
+            self.speed_y = np.where(choque & pared, -self.speed_y, self.speed_y)
+            for i, (_, pala_y) in enumerate(palas):
+                self._rebotar(choque & (golpeada == i), pala_y)
+            restante = np.where(choque, restante * (1 - t_impacto), restante)
+            pendiente = choque
+            cambio |= choque
+
+        self.ball_x = np.where(activa, _redondear(x), self.ball_x)
+        self.ball_y = np.where(activa, _redondear(y), self.ball_y)
+        return cambio
+
+    def step(self, acciones_jugador=None):
+        """
+        Avanza un fotograma todas las partidas no terminadas.
+        Devuelve la máscara de partidas en las que se ha marcado un punto.
+        """
+        en_espera = self.espera > 0
+        self.espera[en_espera] -= 1
+        activa = ~self.terminada & ~en_espera
+        self.frames[~self.terminada] += 1
+
+        # player.update() y opponent.update(ball), antes de mover la bola como en Match.step
+        if acciones_jugador is None:
+            nuevo_jugador = self._perseguir(self.player_y, self.velocidad_jugador, self.ball_y,
+                                            self.desvio_jugador)
+        else:
+            nuevo_jugador = self.player_y + np.asarray(acciones_jugador) * VELOCIDAD_JUGADOR
+        self.player_y = np.where(activa, self._limitar(nuevo_jugador), self.player_y)
+        nuevo_oponente = self._limitar(
+            self._perseguir(self.opponent_y, self.velocidad_oponente, self.ball_y, self.desvio_oponente))
+        self.opponent_y = np.where(activa, nuevo_oponente, self.opponent_y)
+
+        # ball.move_swept(): colisiones continuas con las palas y las paredes
+        cambio = self._mover_con_barrido(activa)
+
+        # Lógica de puntuación
+        punto_oponente = activa & (self.ball_x + TAMANO_BOLA >= ANCHO_PANTALLA)
+        punto_jugador = activa & ~punto_oponente & (self.ball_x <= 0)
+        self.puntuacion_oponente += punto_oponente
+        self.puntuacion_jugador += punto_jugador
+        punto = punto_jugador | punto_oponente
+        self._reset_bolas(punto)
+        self.espera[punto] = self.frames_espera
+        # Rebote o saque: las palas eligen de nuevo hacia dónde apuntar
+        self._apuntar(cambio | punto)
+
+        self.terminada |= ((self.puntuacion_jugador >= PUNTUACION_GANADORA)
+                           | (self.puntuacion_oponente >= PUNTUACION_GANADORA))
+        return punto
+
+    def run(self, max_frames=1_000_000):
+        """Avanza hasta que terminen todas las partidas o se alcance `max_frames`."""
+        for _ in range(max_frames):
+            if self.terminada.all():
+                break
+            self.step()
+        return self.terminada
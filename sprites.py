@@ -0,0 +1,44 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Caché de sprites pre-dibujados.
+
+Dibujar una elipse con `pygame.draw.ellipse` rasteriza la figura cada vez.
+Aquí cada combinación de tamaño y color se dibuja una sola vez sobre una
+superficie transparente y después solo se copia con `blit`.
+"""
+import pygame
+
+
+class SpriteCache:
+    def __init__(self):
+        self._elipses = {}
+        self._estelas = {}
+
+    def ellipse(self, width, height, color):
+        """Devuelve una superficie con la elipse de ese tamaño y color, dibujándola solo la primera vez."""
+        clave = (width, height, color)
+        sprite = self._elipses.get(clave)
+        if sprite is None:
+            sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+            pygame.draw.ellipse(sprite, color, sprite.get_rect())
+            self._elipses[clave] = sprite
+        return sprite
+
+    def fade_levels(self, width, height, length):
+        """
+        Sprites de la estela para una estela de `length` posiciones,
+        del más tenue (el más antiguo) al más brillante.
+        """
+        clave = (width, height, length)
+        niveles = self._estelas.get(clave)
+        if niveles is None:
+            # El color se desvanece a medida que se aleja, igual que antes
+            paso = 255 // (length + 1)
+            niveles = [self.ellipse(width, height, ((i + 1) * paso,) * 3) for i in range(length)]
+            self._estelas[clave] = niveles
+        return niveles
+
+    def __len__(self):
+        return len(self._elipses)
@@ -0,0 +1,22 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from benchmarks import comparar, medir
+
+
+def test_medir_devuelve_segundos_por_llamada():
+    """medir devuelve un tiempo positivo por llamada."""
+    assert medir(lambda: None) > 0
+
+
+def test_comparar_detecta_regresiones():
+    """Solo se marcan los benchmarks más lentos que la base por encima de la tolerancia."""
+    base = {"a": {"segundos_por_op": 1.0}, "b": {"segundos_por_op": 1.0}}
+    actual = {"a": {"segundos_por_op": 1.1}, "b": {"segundos_por_op": 1.5}, "nuevo": {"segundos_por_op": 9.0}}
+    assert comparar(actual, base, tolerancia=0.2) == ["b"]
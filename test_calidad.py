@@ -0,0 +1,52 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from calidad import QualityController, VENTANA, VENTANAS_ESPERA, VENTANAS_PARA_SUBIR
+
+
+def registrar(calidad, milisegundos, ventanas):
+    for _ in range(ventanas * VENTANA):
+        calidad.record(milisegundos)
+
+
+def test_baja_de_nivel_con_fotogramas_lentos():
+    """Si los fotogramas casi agotan el presupuesto se baja un nivel, y no otro hasta que pasa la espera."""
+    calidad = QualityController()
+    registrar(calidad, 16.0, 1)
+    assert calidad.nombre == "media"
+    registrar(calidad, 16.0, VENTANAS_ESPERA)
+    assert calidad.nombre == "media"
+    registrar(calidad, 16.0, 1)
+    assert calidad.nombre == "baja"
+
+
+def test_sube_solo_tras_varias_ventanas_holgadas():
+    """Para subir hacen falta varias ventanas seguidas con mucho margen; una lenta reinicia la cuenta."""
+    calidad = QualityController("minima")
+    registrar(calidad, 4.0, VENTANAS_PARA_SUBIR - 1)
+    registrar(calidad, 12.0, 1)  # Ni sube ni baja, pero corta la racha
+    registrar(calidad, 4.0, VENTANAS_PARA_SUBIR - 1)
+    assert calidad.nombre == "minima"
+    registrar(calidad, 4.0, 1)
+    assert calidad.nombre == "baja"
+
+
+def test_sin_oscilaciones_cerca_del_umbral():
+    """Alternar fotogramas algo lentos y algo rápidos no hace saltar la calidad de un nivel a otro."""
+    calidad = QualityController("media")
+    for i in range(40 * VENTANA):
+        calidad.record(13.0 if i % 2 else 10.0)
+    assert calidad.cambios == 0
+
+
+def test_nivel_fijo():
+    """Con el control automático desactivado el nivel no cambia."""
+    calidad = QualityController("baja", automatico=False)
+    registrar(calidad, 40.0, 10)
+    assert calidad.nombre == "baja" and calidad.ajustes["estela"] == 3
@@ -0,0 +1,120 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from captura import FrameRecorder, leer_captura
+
+pygame.init()
+
+# Colores que la paleta RGB 3-3-2 de la grabación conserva exactos
+COLORES = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (36, 72, 85)]
+
+
+def nueva_pantalla():
+    return pygame.Surface((64, 48), 0, 32)
+
+
+def test_grabacion_sin_perdida(tmp_path):
+    """Por defecto cada fotograma se recupera exacto, a tamaño completo y con cualquier color."""
+    pantalla = nueva_pantalla()
+    grabacion = FrameRecorder(pantalla, str(tmp_path)).start()
+    rng = np.random.default_rng(0)
+    # Colores que la paleta de 256 no conserva, y píxeles sueltos distintos en cada fotograma
+    esperados = []
+    for i in range(70):
+        pantalla.fill((13 + i, 200, 77))
+        for x, y in rng.integers(0, 48, size=(5, 2)):
+            pantalla.set_at((int(x), int(y)), tuple(int(c) for c in rng.integers(0, 256, 3)))
+        esperados.append(pygame.surfarray.array3d(pantalla).swapaxes(0, 1))
+        grabacion.capture(pantalla)
+        time.sleep(0.001)
+    grabacion.close()
+
+    info, fotogramas, indice = leer_captura(str(tmp_path))
+    assert (info["ancho"], info["alto"], info["escala"], info["paleta"]) == (64, 48, 1, False)
+    assert info["bytes"] < len(esperados) * 64 * 48
+    for i in list(range(len(esperados))) + [65, 2, 60]:
+        assert np.array_equal(fotogramas[i], esperados[i])
+
+
+def test_grabacion_ligera_y_lectura(tmp_path):
+    """Con `ligera` cada fotograma se recupera reducido a la mitad, en orden y en cualquier orden de acceso."""
+    pantalla = nueva_pantalla()
+    grabacion = FrameRecorder(pantalla, str(tmp_path), ligera=True).start()
+    colores = COLORES * 20 # Más de un intervalo entre fotogramas clave
+    for i, color in enumerate(colores):
+        pantalla.fill(color)
+        pantalla.set_at((6 + 2 * (i % 10), 8), (255, 255, 255))
+        grabacion.capture(pantalla)
+        time.sleep(0.001)
+    grabacion.close()
+
+    info, fotogramas, indice = leer_captura(str(tmp_path))
+    assert (info["ancho"], info["alto"], info["descartados"]) == (32, 24, 0)
+    assert len(fotogramas) == len(colores)
+    assert indice[:, 0].tolist() == list(range(len(colores)))
+    # Mucho menos que los 4 bytes por píxel sin comprimir
+    assert info["bytes"] < len(colores) * 32 * 24
+    for i in list(range(len(colores))) + [70, 3, 61]:
+        fotograma = fotogramas[i]
+        assert fotograma.shape == (24, 32, 3)
+        assert tuple(fotograma[0, 0]) == colores[i]
+        assert tuple(fotograma[4, 3 + i % 10]) == (255, 255, 255)
+
+
+class DiscoLento:
+    """Archivo cuya escritura espera a que se libere `puerta`."""
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.puerta = threading.Event()
+
+    def write(self, datos):
+        self.puerta.wait()
+        return self.archivo.write(datos)
+
+    def close(self):
+        self.archivo.close()
+
+
+def test_escritor_lento_descarta_sin_bloquear(tmp_path, capsys):
+    """Si el disco no da abasto, el bucle no espera: se descartan fotogramas y se avisa."""
+    pantalla = nueva_pantalla()
+    grabacion = FrameRecorder(pantalla, str(tmp_path), capacidad=2).start()
+    disco = grabacion._video = DiscoLento(grabacion._video)
+
+    inicio = time.perf_counter()
+    capturados = [grabacion.capture(pantalla) for _ in range(10)]
+    assert time.perf_counter() - inicio < 0.5
+    # El escritor suelta cada búfer al comprimirlo, antes de escribir: caben uno o dos más
+    assert capturados[:2] == [True, True] and not all(capturados)
+    assert grabacion.descartados == capturados.count(False)
+    assert "Advertencia" in capsys.readouterr().out
+
+    disco.puerta.set()
+    grabacion.close()
+    info, fotogramas, indice = leer_captura(str(tmp_path))
+    assert info["escritos"] + info["descartados"] == 10
+    assert indice[:, 0].tolist() == [i for i, capturado in enumerate(capturados) if capturado]
+
+
+def test_solo_se_graban_los_fotogramas_presentados(tmp_path):
+    """La pausa se presenta una sola vez: los fotogramas siguientes no se graban."""
+    from main import SceneManager, MatchScene, PauseScene, ANCHO_PANTALLA, ALTO_PANTALLA
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuente = pygame.font.Font(None, 24)
+    grabacion = FrameRecorder(pantalla, str(tmp_path)).start()
+    juego = SceneManager(pantalla, {"titulo": fuente, "boton": fuente, "juego": fuente, "info": fuente},
+                         video=grabacion)
+    juego.run(PauseScene(juego, MatchScene(juego, "medio")), max_frames=5)
+    grabacion.close()
+    assert grabacion.fotogramas == 1
@@ -0,0 +1,100 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from entorno import PongEnv, VectorPongEnv, ARRIBA, ESTADO
+from main import BLANCO
+
+pygame.init()
+
+
+def test_episodio_completo_y_recompensas():
+    """Un agente que se esconde arriba pierde: la suma de recompensas es el marcador final."""
+    entorno = PongEnv("facil", seed=3, max_pasos=20000)
+    estado, info = entorno.reset()
+    assert estado.shape == (len(ESTADO),) and estado.dtype == np.float32
+    total, terminado = 0.0, False
+    while not terminado:
+        estado, recompensa, terminado, truncado, info = entorno.step(ARRIBA)
+        total += recompensa
+        assert not truncado
+    assert total == info["puntuacion_jugador"] - info["puntuacion_oponente"] < 0
+
+
+def test_misma_semilla_mismo_episodio():
+    """Con la misma semilla y las mismas acciones, el episodio se repite exactamente."""
+    a, b = PongEnv(seed=1, max_pasos=500), PongEnv(seed=1, max_pasos=500)
+    a.reset(), b.reset()
+    for paso in range(500):
+        ea, ra, *_ = a.step(paso % 3)
+        eb, rb, _, truncado, _ = b.step(paso % 3)
+        assert np.array_equal(ea, eb) and ra == rb
+    assert truncado
+
+
+def test_observacion_en_pixeles_sin_copia():
+    """La observación es una vista de la superficie: lo dibujado aparece en ella sin copiar."""
+    entorno = PongEnv(seed=0, pixeles=True, escala=4)
+    vista, _ = entorno.reset()
+    assert vista.shape == (200, 150, 3)
+    pintados = np.count_nonzero(vista[:, :, 0])
+    bola = entorno.partida.ball.rect
+    assert tuple(vista[bola.centerx // 4, bola.centery // 4]) == BLANCO
+    vista_siguiente, *_ = entorno.step(ARRIBA)
+    assert vista_siguiente is vista
+    # La bola se ha movido: su posición anterior ya está borrada
+    nueva = entorno.partida.ball.rect
+    assert tuple(vista[nueva.centerx // 4, nueva.centery // 4]) == BLANCO
+    assert np.count_nonzero(vista[:, :, 0]) == pintados
+
+
+def test_vectorizado_reinicia_los_entornos_terminados():
+    """Los entornos que terminan se reinician solos y los arrays de salida se reutilizan."""
+    entornos = VectorPongEnv(4, dificultad=["facil", "medio", "dificil", "medio"], seed=0, max_pasos=100)
+    estados = entornos.reset()
+    acciones = np.zeros(4, dtype=np.int64)
+    for _ in range(100):
+        salida, recompensas, terminados, truncados = entornos.step(acciones)
+    assert salida is estados
+    assert truncados.all()
+    assert (entornos.sim.frames == 0).all()
+
+
+def test_vectorizado_recompensas_y_reinicio_al_terminar():
+    """Agentes que se esconden arriba pierden sus partidas, que vuelven a empezar desde el estado inicial."""
+    entornos = VectorPongEnv(8, dificultad="facil", seed=2)
+    entornos.reset()
+    acciones = np.full(8, ARRIBA)
+    total = np.zeros(8)
+    terminados = np.zeros(8, dtype=bool)
+    for _ in range(20000):
+        _, recompensas, fin, _ = entornos.step(acciones)
+        total += np.where(terminados, 0, recompensas)
+        terminados |= fin
+        # La fila de un entorno terminado ya es la del episodio siguiente
+        assert (entornos.sim.puntuacion_oponente[fin] == 0).all() and (entornos.sim.frames[fin] == 0).all()
+        if terminados.all():
+            break
+    assert terminados.all()
+    assert (total < 0).all()
+
+
+def test_vectorizado_con_pixeles_recorre_los_entornos():
+    """Con píxeles cada entorno tiene su Match y su vista, y también se reinician al truncarse."""
+    entornos = VectorPongEnv(2, seed=0, max_pasos=5, pixeles=True, escala=4)
+    entornos.reset()
+    assert entornos.sim is None and len(entornos.vistas) == 2
+    for _ in range(5):
+        _, _, _, truncados = entornos.step(np.zeros(2, dtype=np.int64))
+    assert truncados.all()
+    assert all(entorno.partida.pasos == 0 for entorno in entornos.entornos)
@@ -0,0 +1,100 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import gc
+import sys
+import os
+import weakref
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import (SceneManager, MatchScene, PauseScene, GameOverScene, MainMenuScene,
+                  ANCHO_PANTALLA, ALTO_PANTALLA, PUNTUACION_GANADORA)
+from repeticion import Replay
+
+pygame.init()
+
+
+def nuevo_juego():
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuente = pygame.font.Font(None, 24)
+    return SceneManager(pantalla, {"titulo": fuente, "boton": fuente, "juego": fuente, "info": fuente})
+
+
+def test_revanchas_no_acumulan_partidas():
+    """Cada revancha libera la partida anterior: la memoria no crece con el número de partidas."""
+    juego = nuevo_juego()
+    escena = MatchScene(juego, "facil")
+    partidas = []
+    for _ in range(20):
+        partidas.append(weakref.ref(escena.partida))
+        escena.partida.puntuacion_oponente = PUNTUACION_GANADORA
+        escena = juego.run(escena, max_frames=1)
+        assert isinstance(escena, GameOverScene)
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=escena.boton_rejugar.center, button=1))
+        escena = juego.run(escena, max_frames=1)
+        assert isinstance(escena, MatchScene)
+    gc.collect()
+    assert sum(ref() is not None for ref in partidas) == 0
+
+
+def test_pausa_y_salida_al_menu():
+    """P pausa y reanuda la misma partida; X desde la pausa vuelve al menú principal."""
+    juego = nuevo_juego()
+    partida = MatchScene(juego, "medio")
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    pausa = juego.run(partida, max_frames=1)
+    assert isinstance(pausa, PauseScene) and pausa.partida is partida
+
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    assert juego.run(pausa, max_frames=1) is partida
+
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    otra_pausa = juego.run(partida, max_frames=2)
+    # La capa oscura se crea una sola vez para todas las pausas
+    capa = PauseScene._capa
+    assert capa is not None
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_x))
+    assert isinstance(juego.run(otra_pausa, max_frames=1), MainMenuScene)
+    assert PauseScene._capa is capa
+
+
+def test_punto_se_dibuja_antes_de_la_espera():
+    """El fotograma del punto muestra ya la bola en el centro; después la pantalla queda quieta."""
+    for dirty_rects in (False, True):
+        juego = nuevo_juego()
+        juego.dirty_rects = dirty_rects
+        escena = MatchScene(juego, "medio")
+        bola = escena.partida.ball
+        bola.rect.topleft = (ANCHO_PANTALLA - bola.rect.width - 2, 20)
+        bola.speed_x, bola.speed_y = 7, 0
+        escena.update(1 / 60)
+        assert escena.espera_punto > 0 and escena.partida.puntuacion_oponente == 1
+        escena.draw(juego.pantalla)
+        escena.present()
+        assert juego.pantalla.get_at(bola.rect.center)[:3] == (255, 255, 255)
+        assert juego.pantalla.get_at((ANCHO_PANTALLA - 10, 30))[:3] == (0, 0, 0)
+        # Durante la espera no se vuelve a dibujar
+        escena.update(1 / 60)
+        escena.draw(juego.pantalla)
+        assert not escena._dibujado
+
+
+def test_repeticion_en_disco_durante_la_partida(tmp_path):
+    """La repetición se va escribiendo mientras se juega y el pie se añade al cerrar la partida."""
+    juego = nuevo_juego()
+    juego.carpeta_repeticiones = str(tmp_path)
+    escena = MatchScene(juego, "medio")
+    # Más de un volcado (PASOS_POR_VOLCADO) de pasos
+    for _ in range(100):
+        escena.update(3 / 60)
+    repeticion = Replay.load(escena.ruta_repeticion)
+    assert repeticion.resultado is None and 0 < repeticion.pasos <= escena.partida.pasos
+    escena.close()
+    repeticion = Replay.load(escena.ruta_repeticion)
+    assert repeticion.resultado is not None and repeticion.pasos == escena.partida.pasos
@@ -0,0 +1,130 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import (SceneManager, MatchScene, StatsScene, GameOverScene, Match, ANCHO_PANTALLA, ALTO_PANTALLA,
+                  PUNTUACION_GANADORA)
+from estadisticas import StatsStore, resumen_partida, codificar, leer_registro, reconstruir, ARCHIVO_REGISTRO
+
+pygame.init()
+
+
+def partida(dificultad, jugador, puntos, rally=3, velocidad=8.0):
+    return {"fecha": 0.0, "dificultad": dificultad, "jugador": jugador, "puntuacion_jugador": puntos[0],
+            "puntuacion_oponente": puntos[1], "pasos": 600, "golpes": 10, "rally_maximo": rally,
+            "velocidad_maxima": velocidad}
+
+
+def test_totales_se_conservan_entre_sesiones(tmp_path):
+    """Los totales por dificultad y por jugador se llevan al día y se leen al volver a abrir."""
+    estadisticas = StatsStore(str(tmp_path)).start()
+    estadisticas.record(partida("facil", "ana", (5, 2), rally=7))
+    estadisticas.record(partida("facil", "luis", (1, 5), velocidad=12.5))
+    estadisticas.record(partida("dificil", "luis", (5, 4)))
+    estadisticas.record(partida("medio", "luis", (5, 0)))
+    estadisticas.close()
+
+    estadisticas = StatsStore(str(tmp_path)).start()
+    facil = estadisticas.por_dificultad()["facil"]
+    assert (facil["partidas"], facil["victorias"], facil["rally_maximo"], facil["velocidad_maxima"]) == (2, 1, 7, 12.5)
+    victorias = [(jugador, total["victorias"]) for jugador, total in estadisticas.clasificacion()]
+    assert victorias == [("luis", 2), ("ana", 1)]
+    estadisticas.record(partida("facil", "ana", (5, 1)))
+    estadisticas.close()
+    assert estadisticas.partidas() == 5
+    assert len(leer_registro(os.path.join(str(tmp_path), ARCHIVO_REGISTRO))) == 5
+
+
+def test_nombres_largos_se_recortan_igual_en_vivo_y_al_reconstruir(tmp_path):
+    """Un nombre de más de 16 bytes se recorta sin partir caracteres y los totales no cambian al reconstruir."""
+    nombre = "José María Núñez"
+    estadisticas = StatsStore(str(tmp_path)).start()
+    estadisticas.record(partida("medio", nombre, (5, 2)))
+    estadisticas.record(partida("medio", nombre, (5, 3)))
+    estadisticas.close()
+    en_vivo = estadisticas.clasificacion()
+    assert [jugador for jugador, _ in en_vivo] == ["José María Nú"]
+    assert len(en_vivo[0][0].encode("utf-8")) <= 16
+    assert reconstruir(str(tmp_path)).clasificacion() == en_vivo
+    assert [p["jugador"] for p in leer_registro(estadisticas.ruta_registro)] == ["José María Nú"] * 2
+
+
+def test_totales_en_vivo_iguales_a_los_reconstruidos(tmp_path):
+    """Los totales se calculan con los valores tal como quedan en el registro (float32, golpes limitados)."""
+    estadisticas = StatsStore(str(tmp_path)).start()
+    resumen = partida("dificil", "ana", (5, 3), velocidad=12.3)
+    resumen["golpes"] = 70000
+    estadisticas.record(resumen)
+    estadisticas.close()
+    assert reconstruir(str(tmp_path)).por_dificultad() == estadisticas.por_dificultad()
+    assert estadisticas.por_dificultad()["dificil"]["golpes"] == 0xFFFF
+
+
+def test_agregados_danados_se_reconstruyen(tmp_path):
+    """Si agregados.json no tiene la forma esperada, los totales se calculan de nuevo desde el registro."""
+    estadisticas = StatsStore(str(tmp_path)).start()
+    estadisticas.record(partida("medio", "ana", (5, 1)))
+    estadisticas.close()
+    for contenido in ('{"dificultades": {}, "jugadores": {}}', '[1, 2]', '{"procesados": "5"}', '"hola"',
+                      '{"procesados": 6, "dificultades": {}, "jugadores": {}}'):
+        with open(estadisticas.ruta_agregados, "w") as archivo:
+            archivo.write(contenido)
+        recuperadas = StatsStore(str(tmp_path)).start()
+        recuperadas.close()
+        assert recuperadas.por_dificultad() == estadisticas.por_dificultad()
+
+
+def test_recupera_partidas_que_no_llegaron_a_los_totales(tmp_path):
+    """Tras un cierre brusco se suman las partidas que faltan y se descarta la que quedó a medias."""
+    StatsStore(str(tmp_path)).start().close()
+    with open(os.path.join(str(tmp_path), ARCHIVO_REGISTRO), "ab") as registro:
+        registro.write(codificar(partida("medio", "ana", (5, 3))))
+        registro.write(codificar(partida("medio", "ana", (2, 5)))[:20])
+
+    estadisticas = StatsStore(str(tmp_path)).start()
+    estadisticas.record(partida("medio", "ana", (5, 4)))
+    estadisticas.close()
+    assert estadisticas.por_dificultad()["medio"]["partidas"] == 2
+    assert [p["puntuacion_oponente"] for p in leer_registro(estadisticas.ruta_registro)] == [3, 4]
+
+
+def test_partida_terminada_llega_a_la_pantalla_de_estadisticas(tmp_path):
+    """Al terminar una partida se guarda su resumen y la pantalla de estadísticas lo muestra."""
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuente = pygame.font.Font(None, 24)
+    fuentes = {"titulo": fuente, "boton": fuente, "juego": fuente, "info": fuente}
+    estadisticas = StatsStore(str(tmp_path)).start()
+    juego = SceneManager(pantalla, fuentes, estadisticas=estadisticas, jugador="ana")
+
+    escena = MatchScene(juego, "dificil")
+    escena.partida.puntuacion_jugador = PUNTUACION_GANADORA
+    escena.update(0.0)
+    assert isinstance(juego._siguiente, GameOverScene)
+    estadisticas.close()
+    assert estadisticas.clasificacion()[0][0] == "ana"
+    assert estadisticas.por_dificultad()["dificil"]["victorias"] == 1
+
+    pantalla_estadisticas = StatsScene(juego)
+    juego.run(pantalla_estadisticas, max_frames=1)
+    assert pantalla_estadisticas.partidas == 1
+
+
+def test_resumen_de_una_partida():
+    """El resumen recoge los rallies y la velocidad máxima que alcanzó la bola."""
+    match = Match("medio", seed=5, efectos=False, jugador_ia=("dificil", "predictiva"))
+    while match.ganador() is None:
+        match.step(0)
+    resumen = resumen_partida(match, "ana")
+    assert resumen["puntuacion_jugador"] + resumen["puntuacion_oponente"] == len(match.rallies)
+    assert resumen["rally_maximo"] == max(match.rallies)
+    assert resumen["velocidad_maxima"] >= 7
+    assert codificar(resumen)
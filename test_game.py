@@ -10,7 +10,8 @@ import os
 # Añadimos la ruta del proyecto al path de Python para que pueda encontrar 'main.py'
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from main import Ball, PlayerPaddle, OpponentPaddle, ANCHO_PANTALLA, ALTO_PANTALLA, VELOCIDAD_JUGADOR
+from main import (Ball, PlayerPaddle, OpponentPaddle, ANCHO_PANTALLA, ALTO_PANTALLA, VELOCIDAD_JUGADOR,
+                  tiempo_de_impacto, predecir_interseccion)
 
 # Inicializamos Pygame para poder usar sus objetos como pygame.Rect
 pygame.init()
@@ -94,4 +95,66 @@ def test_ball_bounce_on_paddle(ball, player_paddle):
     # 1. La velocidad horizontal debe invertirse y aumentar ligeramente
     assert ball.speed_x < 0
     # 2. Se deben haber creado partículas
-    assert len(particles) > 0
\ No newline at end of file
+    assert len(particles) > 0
+
+def test_tiempo_de_impacto():
+    """El test de barrido encuentra el instante de contacto dentro del desplazamiento."""
+    obstaculo = pygame.Rect(100, 0, 15, 100)
+    # A 50 px de la pala moviéndose 100 px: toca a mitad del desplazamiento
+    assert tiempo_de_impacto(30, 40, 20, 20, 100, 0, obstaculo) == pytest.approx(0.5)
+    # Si se aleja, no hay impacto
+    assert tiempo_de_impacto(30, 40, 20, 20, -100, 0, obstaculo) is None
+
+def test_ball_no_atraviesa_la_pala(ball, player_paddle):
+    """Con detección continua, una bola muy rápida rebota aunque acabe detrás de la pala."""
+    ball.rect.right = player_paddle.rect.left - 5
+    ball.rect.centery = player_paddle.rect.centery
+    ball.speed_x, ball.speed_y = 60, 0  # Más que el ancho de la pala y la bola juntas
+
+    ball.move_swept((player_paddle,), [])
+
+    assert ball.speed_x < 0
+    assert ball.rect.right <= player_paddle.rect.left
+
+def test_ball_swept_rebota_en_la_pared(ball):
+    """La bola se refleja en la pared en el instante del impacto, sin salir de la pantalla."""
+    ball.rect.top = 3
+    ball.speed_x, ball.speed_y = 0, -10
+
+    ball.move_swept((), [])
+
+    assert ball.speed_y == 10
+    assert ball.rect.top == 7
+
+def test_predecir_interseccion_con_rebotes(ball):
+    """La predicción analítica coincide con mover la bola paso a paso, con rebotes en las paredes."""
+    ball.speed_x, ball.speed_y = -7, 11  # Varias paredes antes de llegar a x = 35
+    prediccion = predecir_interseccion(ball, 35)
+    while ball.rect.left > 35:
+        ball.move_swept((), [])
+    # La bola acaba un poco más allá de x = 35; la diferencia es de como mucho un paso
+    assert prediccion == pytest.approx(ball.rect.centery, abs=12)
+    # Si la bola se aleja no hay predicción
+    assert predecir_interseccion(ball, ANCHO_PANTALLA) is None
+
+def test_oponente_predictivo_va_a_la_interseccion(ball):
+    """La IA predictiva se coloca donde va a llegar la bola y deja de moverse."""
+    opponent = OpponentPaddle(20, 0, 15, 100, 9, ia="predictiva")
+    ball.speed_x, ball.speed_y = -7, -2
+    objetivo = predecir_interseccion(ball, opponent.rect.right)
+    for _ in range(60):
+        opponent.update(ball)
+    assert opponent.rect.centery == pytest.approx(objetivo, abs=1)
+    y = opponent.rect.y
+    opponent.update(ball)
+    assert opponent.rect.y == y # Sin temblores una vez en su sitio
+
+def test_oponente_predictivo_tiempo_de_reaccion(ball):
+    """Con tiempo de reacción, la IA no se mueve hasta que pasan esos pasos."""
+    opponent = OpponentPaddle(20, 0, 15, 100, 9, ia="predictiva", reaccion=5)
+    ball.speed_x, ball.speed_y = -7, 5
+    for _ in range(5):
+        opponent.update(ball)
+    assert opponent.rect.y == 0
+    opponent.update(ball)
+    assert opponent.rect.y > 0
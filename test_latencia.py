@@ -0,0 +1,101 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import SceneManager, MatchScene, PauseScene, ANCHO_PANTALLA, ALTO_PANTALLA
+from latencia import HybridPacer, LatencyMeter
+
+pygame.init()
+
+
+def test_ritmo_del_marcapasos():
+    """El marcapasos mantiene 60 fotogramas por segundo y devuelve el dt de cada uno."""
+    marcapasos = HybridPacer(fps=60)
+    assert marcapasos.wait() == 0.0
+    marcapasos.frame_done()
+    inicio = time.perf_counter()
+    dts = []
+    for _ in range(30):
+        dts.append(marcapasos.wait())
+        marcapasos.frame_done()
+    transcurrido = time.perf_counter() - inicio
+    assert abs(transcurrido - 30 / 60) < 0.05
+    assert abs(sum(dts) / len(dts) - 1 / 60) < 0.003
+    assert marcapasos.estimacion() < 0.005
+
+
+def test_histograma_y_resumen(tmp_path):
+    """Cada pulsación pendiente se mide en el siguiente flip; lo que pasa del máximo va al último cubo."""
+    latencias = LatencyMeter(capacity=8)
+    assert latencias.resumen() == {"pulsaciones": 0}
+    for visto, flip in [(0.0, 0.003), (1.0, 1.011), (2.0, 2.2)]:
+        latencias.key_seen(visto)
+        latencias.flipped(flip)
+    latencias.flipped(3.0)
+    assert latencias.resumen()["pulsaciones"] == 3
+    bordes, cuentas = latencias.histogram()
+    assert cuentas.sum() == 3
+    assert cuentas[1] == 1 and cuentas[5] == 1 and cuentas[-1] == 1
+    assert "p99" in latencias.informe()
+    latencias.export(str(tmp_path / "latencias.json"))
+
+
+def test_partida_en_modo_baja_latencia():
+    """El bucle con marcapasos mide la latencia de las pulsaciones hasta el flip."""
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuente = pygame.font.Font(None, 24)
+    fuentes = {"titulo": fuente, "boton": fuente, "juego": fuente, "info": fuente}
+    latencias = LatencyMeter()
+    juego = SceneManager(pantalla, fuentes, marcapasos=HybridPacer(), latencias=latencias)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+    juego.run(MatchScene(juego, "medio"), max_frames=5)
+    resumen = latencias.resumen()
+    assert resumen["pulsaciones"] == 1
+    assert 0 <= resumen["max"] < 100
+
+
+class SlowFlipScene(MatchScene):
+    """Partida cuyo flip bloquea como si esperara al vsync."""
+    def present(self):
+        time.sleep(0.015)
+        return super().present()
+
+
+def test_el_flip_no_cuenta_como_trabajo():
+    """La espera del flip no entra en la estimación del marcapasos ni en lo que mide la calidad."""
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuente = pygame.font.Font(None, 24)
+    fuentes = {"titulo": fuente, "boton": fuente, "juego": fuente, "info": fuente}
+    for marcapasos in (HybridPacer(vsync=True), None):
+        juego = SceneManager(pantalla, fuentes, marcapasos=marcapasos)
+        juego.run(SlowFlipScene(juego, "medio"), max_frames=10)
+        # Medianas: un fotograma suelto puede tardar más si la máquina está ocupada
+        assert np.median(juego.calidad.tiempos[:juego.calidad._medidos]) < 10
+        assert juego.calidad.nombre == "alta"
+        if marcapasos is not None:
+            assert np.median(marcapasos.trabajo[:10]) < 0.010 and marcapasos.flip >= 14
+
+
+def test_latencia_solo_en_fotogramas_presentados():
+    """Una pulsación durante la pausa, que no vuelve a presentarse, queda pendiente hasta un flip real."""
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fuente = pygame.font.Font(None, 24)
+    fuentes = {"titulo": fuente, "boton": fuente, "juego": fuente, "info": fuente}
+    latencias = LatencyMeter()
+    juego = SceneManager(pantalla, fuentes, marcapasos=HybridPacer(), latencias=latencias)
+    pausa = PauseScene(juego, MatchScene(juego, "medio"))
+    juego.run(pausa, max_frames=2)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    juego.run(pausa, max_frames=3)
+    assert latencias.total == 0 and len(latencias._pendientes) == 1
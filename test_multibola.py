@@ -0,0 +1,65 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from multibola import UniformGrid, MultiBallField, Obstacle, COPIAS_MULTIPLICAR
+
+
+def test_rejilla_encuentra_todos_los_pares_cercanos():
+    """Todo par de puntos a menos de un diámetro aparece exactamente una vez entre los candidatos."""
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 800, 400), rng.uniform(0, 600, 400)
+    i, j = UniformGrid(800, 600, 40).pairs(x, y)
+    candidatos = set(zip(np.minimum(i, j).tolist(), np.maximum(i, j).tolist()))
+    assert len(candidatos) == len(i)
+    # Muchos menos candidatos que todos los pares posibles
+    assert len(i) < 400 * 399 / 2 / 10
+
+    distancia = np.hypot(x[:, None] - x[None], y[:, None] - y[None])
+    cercanos = zip(*np.nonzero(np.triu(distancia < 40, 1)))
+    assert all((a, b) in candidatos for a, b in cercanos)
+
+
+def test_choque_frontal_intercambia_velocidades():
+    """Dos bolas iguales que chocan de frente intercambian su velocidad."""
+    campo = MultiBallField(capacity=4, obstaculos=[])
+    campo.spawn(1, 300.0, 300.0, 5.0, 0.0)
+    campo.spawn(1, 325.0, 300.0, -3.0, 0.0)
+    campo.step(())
+    assert campo.choques == 1
+    assert campo.speed_x[:2].tolist() == [-3.0, 5.0]
+    # Ya no se solapan
+    assert campo.x[1] - campo.x[0] >= 2 * campo.radio - 1e-9
+
+
+def test_rebote_en_pala_y_puntos():
+    """Las bolas rebotan en las palas como Ball.bounce y las que se escapan vuelven a sacarse."""
+    campo = MultiBallField(capacity=8, obstaculos=[], rng=0)
+    pala = pygame.Rect(765, 250, 15, 100)
+    campo.spawn(1, 750.0, 300.0, 10.0, 0.0)
+    campo.spawn(1, -5.0, 100.0, -10.0, 0.0)
+    campo.objetivo = 2
+    puntos = campo.step((pala,))
+    assert campo.speed_x[0] == -10.5
+    assert campo.x[0] == pala.left - campo.radio
+    # La segunda se ha ido por la izquierda: punto de la pala derecha y nueva bola en el centro
+    assert puntos == (1, 0)
+    assert len(campo) == 2 and campo.x[1] == 400
+
+
+def test_obstaculo_multiplicar():
+    """El obstáculo de multiplicar lanza bolas nuevas y se desactiva un tiempo."""
+    obstaculo = Obstacle(400, 280, 40, 40, "multiplicar")
+    campo = MultiBallField(capacity=8, obstaculos=[obstaculo], rng=0)
+    campo.spawn(1, 388.0, 300.0, 5.0, 0.0)
+    campo.step(())
+    assert len(campo) == 1 + COPIAS_MULTIPLICAR
+    assert campo.speed_x[0] < 0 and not obstaculo.activo
@@ -0,0 +1,62 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+import pygame
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Ball, PlayerPaddle, ANCHO_PANTALLA, ALTO_PANTALLA, VELOCIDAD_JUGADOR
+from particulas import ParticlePool, VIDA_PARTICULA
+
+pygame.init()
+
+
+@pytest.fixture
+def pool():
+    """Fixture que crea un pool pequeño para las pruebas."""
+    return ParticlePool(capacity=32)
+
+
+def test_pool_emite_y_mueve(pool):
+    """Las partículas emitidas se mueven en la dirección indicada."""
+    pool.emit(100, 100, 1, 10)
+    assert len(pool) == 10
+    pool.update()
+    vivas = pool.lifespan > 0
+    assert (pool.x[vivas] > 100).all()
+
+
+def test_pool_las_particulas_mueren(pool):
+    """Tras VIDA_PARTICULA actualizaciones no queda ninguna partícula viva."""
+    pool.emit(100, 100, -1, 10)
+    for _ in range(VIDA_PARTICULA):
+        pool.update()
+    assert len(pool) == 0
+
+
+def test_pool_reutiliza_huecos(pool):
+    """Emitir más partículas que la capacidad reutiliza los huecos más antiguos."""
+    for _ in range(10):
+        pool.emit(100, 100, 1, 15)
+    assert len(pool) == pool.capacity
+
+
+def test_bounce_emite_en_el_pool(pool):
+    """Ball.bounce lanza las partículas en el pool en lugar de crear objetos."""
+    paddle = PlayerPaddle(ANCHO_PANTALLA - 35, ALTO_PANTALLA / 2, 15, 100, VELOCIDAD_JUGADOR)
+    ball = Ball(ANCHO_PANTALLA - 55, ALTO_PANTALLA / 2, 20, 7)
+    ball.bounce(paddle, pool)
+    assert 10 <= len(pool) <= 15
+
+
+def test_pool_dibuja(pool):
+    """El pool dibuja sus partículas sobre la superficie."""
+    pantalla = pygame.Surface((200, 200))
+    pool.emit(100, 100, 1, 5)
+    pool.draw(pantalla)
+    assert pantalla.get_at((100, 100))[:3] == (255, 255, 255)
@@ -0,0 +1,62 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+import csv
+import json
+
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from perfilador import FrameProfiler, FASES
+
+pygame.init()
+
+
+def perfilar(perfil, fotogramas):
+    """Simula `fotogramas` fotogramas pasando por todas las fases."""
+    for _ in range(fotogramas):
+        perfil.begin_frame()
+        for fase in FASES:
+            perfil.lap(fase)
+        perfil.end_frame([1, 2, 3])
+
+
+def test_perfilador_buffer_circular():
+    """El buffer no crece: solo se conservan los últimos `capacity` fotogramas."""
+    perfil = FrameProfiler(capacity=8)
+    perfilar(perfil, 20)
+    assert perfil.frames == 20
+    assert perfil.tiempos.shape == (8, len(FASES))
+    resumen = perfil.summary()
+    assert set(resumen) == set(FASES) | {"total"}
+    assert resumen["total"]["p99"] >= resumen["total"]["p50"] >= 0
+
+
+def test_perfilador_exporta_json_y_csv(tmp_path):
+    """Las mediciones se exportan en JSON o en CSV según la extensión."""
+    perfil = FrameProfiler(capacity=8)
+    perfilar(perfil, 5)
+
+    perfil.export(str(tmp_path / "perfil.json"))
+    datos = json.loads((tmp_path / "perfil.json").read_text())
+    assert len(datos["fotogramas_ms"]) == 5
+    assert datos["particulas"] == [3] * 5
+
+    perfil.export(str(tmp_path / "perfil.csv"))
+    with open(tmp_path / "perfil.csv", newline="") as archivo:
+        filas = list(csv.reader(archivo))
+    assert len(filas) == 6
+    assert filas[0][-1] == "particulas"
+
+
+def test_perfilador_panel():
+    """El panel se dibuja dentro de la pantalla."""
+    pantalla = pygame.Surface((800, 600))
+    perfil = FrameProfiler(capacity=8)
+    perfilar(perfil, 3)
+    rect = perfil.draw_overlay(pantalla, pygame.font.Font(None, 24))
+    assert pantalla.get_rect().contains(rect)
@@ -0,0 +1,135 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Match, ANCHO_PANTALLA, ENTRADA_ARRIBA, ENTRADA_ABAJO
+from red import (HostSession, ClientSession, UdpLink, encode_state, decode_state, CABECERA_ESTADO,
+                 VALOR, CAMPOS)
+
+
+def test_instantaneas_con_diferencias():
+    """Solo viajan los campos que cambian respecto a la base; sin la base no se puede decodificar."""
+    base = (390, 290, 7000, -3500, 250, 250, 0, 0)
+    completa = encode_state(1, 2, 0, base)
+    assert len(completa) == CABECERA_ESTADO.size + len(CAMPOS) * VALOR.size
+    assert decode_state(completa, {}) == (1, 2, 0, base, None)
+
+    nuevo = (397, 286, 7000, -3500, 250, 240, 0, 0)
+    delta = encode_state(2, 4, 3, nuevo, base, 1)
+    assert len(delta) == CABECERA_ESTADO.size + 3 * VALOR.size
+    assert decode_state(delta, {1: base}) == (2, 4, 3, nuevo, None)
+    assert decode_state(delta, {}) is None
+
+    # La completa puede llevar la dificultad y la semilla de la partida
+    con_configuracion = encode_state(3, 6, 3, nuevo, configuracion=("dificil", 2**62 + 5))
+    assert decode_state(con_configuracion, {}) == (3, 6, 3, nuevo, ("dificil", 2**62 + 5))
+
+
+def test_cliente_usa_la_dificultad_del_anfitrion():
+    """El cliente rehace su partida con la dificultad y la semilla que elige el anfitrión."""
+    red = RedSimulada(retraso=2, perdida=0.0)
+    host = HostSession(Match("dificil", seed=11, efectos=False, rival_remoto=True), None)
+    cliente = ClientSession(Match("medio", efectos=False, rival_remoto=True), None, ANCHO_PANTALLA,
+                            lambda dificultad, seed: Match(dificultad, seed, efectos=False, rival_remoto=True))
+    host.enviar = red.enviar(cliente.receive)
+    cliente.enviar = red.enviar(lambda datos: host.receive(datos, "cliente"))
+    for _ in range(20):
+        red.entregar()
+        cliente.step(0)
+        if host.conectado:
+            host.step(0)
+    assert cliente.conectado
+    assert (cliente.partida.dificultad, cliente.partida.seed) == ("dificil", 11)
+    assert abs(cliente.partida.ball.speed_x) == abs(host.partida.ball.speed_x)
+
+
+class RedSimulada:
+    """Entrega los paquetes con `retraso` pasos de latencia y pierde una fracción `perdida`."""
+    def __init__(self, retraso, perdida, seed=0):
+        self.retraso = retraso
+        self.perdida = perdida
+        self.rng = random.Random(seed)
+        self.en_vuelo = []
+        self.paso = 0
+
+    def enviar(self, destino):
+        def enviar(datos, direccion=None):
+            if self.rng.random() >= self.perdida:
+                self.en_vuelo.append((self.paso + self.retraso, destino, datos))
+        return enviar
+
+    def entregar(self):
+        self.paso += 1
+        pendientes = []
+        for llegada, destino, datos in self.en_vuelo:
+            if llegada <= self.paso:
+                destino(datos)
+            else:
+                pendientes.append((llegada, destino, datos))
+        self.en_vuelo = pendientes
+
+
+def test_prediccion_y_reconciliacion_con_perdidas():
+    """Con latencia y pérdidas, la pala y el marcador del cliente acaban coincidiendo con los del anfitrión."""
+    red = RedSimulada(retraso=6, perdida=0.2)
+    host = HostSession(Match("medio", seed=3, efectos=False, rival_remoto=True), None)
+    cliente = ClientSession(Match("medio", efectos=False, rival_remoto=True), None, ANCHO_PANTALLA)
+    host.enviar = red.enviar(cliente.receive)
+    cliente.enviar = red.enviar(lambda datos: host.receive(datos, "cliente"))
+
+    for paso in range(600):
+        red.entregar()
+        entrada_cliente = ENTRADA_ARRIBA if (paso // 40) % 2 else ENTRADA_ABAJO
+        cliente.step(entrada_cliente)
+        # La pala del cliente responde en el mismo paso, sin esperar al anfitrión
+        if paso == 0:
+            assert cliente.partida.opponent.rect.y == host.partida.opponent.rect.y + 10
+        if host.conectado:
+            host.step(ENTRADA_ABAJO if (paso // 30) % 2 else ENTRADA_ARRIBA)
+    assert host.conectado and cliente.conectado
+    assert 0 < cliente.rtt_pasos < 30
+
+    # Sin más entradas del cliente, todo lo que predijo acaba confirmado por el anfitrión
+    for _ in range(60):
+        red.entregar()
+        cliente.step(0)
+        host.step(0)
+    assert cliente.partida.opponent.rect.y == host.partida.opponent.rect.y
+    assert cliente.partida.player.rect.y == host.partida.player.rect.y
+    marcador = (host.partida.puntuacion_jugador, host.partida.puntuacion_oponente)
+    assert (cliente.partida.puntuacion_jugador, cliente.partida.puntuacion_oponente) == marcador
+
+
+def test_udp_local():
+    """Las dos sesiones se encuentran y juegan a través de sockets UDP reales."""
+    enlace_host = UdpLink(("127.0.0.1", 0)).start()
+    enlace_cliente = UdpLink(remoto=enlace_host.address, latencia=0.01).start()
+    try:
+        host = HostSession(Match("medio", seed=1, efectos=False, rival_remoto=True), enlace_host.send)
+        cliente = ClientSession(Match("medio", efectos=False, rival_remoto=True), enlace_cliente.send,
+                                ANCHO_PANTALLA)
+        limite = time.monotonic() + 5
+        while not (cliente.conectado and host.partida.pasos > 30) and time.monotonic() < limite:
+            for datos, direccion in enlace_host.receive():
+                host.receive(datos, direccion)
+            for datos, _ in enlace_cliente.receive():
+                cliente.receive(datos)
+            cliente.step(ENTRADA_ABAJO)
+            if host.conectado:
+                host.step(0)
+            time.sleep(0.005)
+        assert host.conectado and cliente.conectado
+        assert host.partida.opponent.rect.y > host.partida.player.rect.y
+        assert enlace_host.bytes_recibidos > 0 and enlace_cliente.bytes_recibidos > 0
+    finally:
+        enlace_host.close()
+        enlace_cliente.close()
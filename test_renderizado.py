@@ -0,0 +1,47 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Ball, ANCHO_PANTALLA, ALTO_PANTALLA
+from renderizado import DirtyRectRenderer
+
+pygame.init()
+
+
+def test_dirty_rects_restaura_el_fondo():
+    """Las zonas dibujadas en un fotograma se restauran desde el fondo en el siguiente."""
+    pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fondo = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA))
+    fondo.fill((10, 20, 30))
+    renderer = DirtyRectRenderer(pantalla, fondo)
+
+    renderer.begin()
+    zona = pygame.Rect(100, 100, 20, 20)
+    pantalla.fill((255, 255, 255), zona)
+    renderer.mark(zona)
+    renderer.present()
+    assert pantalla.get_at(zona.center)[:3] == (255, 255, 255)
+
+    renderer.begin()
+    renderer.present()
+    assert pantalla.get_at(zona.center)[:3] == (10, 20, 30)
+
+
+def test_ball_bounds_cubre_la_estela():
+    """El rectángulo sucio de la bola incluye todas las posiciones de la estela."""
+    ball = Ball(100, 100, 20, 7)
+    for _ in range(5):
+        ball.move()
+    bounds = ball.bounds()
+    assert bounds.contains(ball.rect)
+    for x, y in ball.trail:
+        assert bounds.contains(pygame.Rect(x, y, 20, 20))
@@ -0,0 +1,86 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+import random
+
+import pygame
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Match, reproducir_sin_ventana, ENTRADA_ARRIBA, ENTRADA_ABAJO
+from repeticion import ReplayRecorder, Replay, ReplayError
+
+pygame.init()
+
+
+def jugar(seed, pasos=3000):
+    """Juega una partida con entradas pseudoaleatorias y devuelve la partida y su grabación."""
+    partida = Match("medio", seed)
+    grabador = ReplayRecorder(partida.seed, partida.dificultad)
+    entradas = random.Random(seed)
+    entrada = 0
+    for _ in range(pasos):
+        if entradas.random() < 0.05:
+            entrada = entradas.choice((0, ENTRADA_ARRIBA, ENTRADA_ABAJO))
+        grabador.record(entrada)
+        partida.step(entrada)
+        if partida.ganador():
+            break
+    return partida, grabador
+
+
+def test_repeticion_ida_y_vuelta():
+    """Una repetición guardada se lee con la misma semilla, dificultad y entradas."""
+    partida, grabador = jugar(7)
+    datos = grabador.getvalue(partida.puntuacion_jugador, partida.puntuacion_oponente)
+    repeticion = Replay.frombytes(datos)
+    assert repeticion.seed == 7
+    assert repeticion.dificultad == "medio"
+    assert repeticion.pasos == partida.pasos
+    assert sum(1 for _ in repeticion.inputs()) == partida.pasos
+    # Comprimida por rachas ocupa bastante menos de un byte por paso
+    assert len(datos) < partida.pasos
+
+
+def test_reproducir_sin_ventana_es_determinista():
+    """Reproducir la grabación da exactamente el mismo resultado que la partida original."""
+    partida, grabador = jugar(42)
+    repeticion = Replay.frombytes(grabador.getvalue(partida.puntuacion_jugador, partida.puntuacion_oponente))
+    reproducida = reproducir_sin_ventana(repeticion)
+    assert (reproducida.puntuacion_jugador, reproducida.puntuacion_oponente) == repeticion.resultado
+    assert reproducida.ball.rect == partida.ball.rect
+
+
+def test_repeticion_se_escribe_durante_la_partida(tmp_path):
+    """Sin llegar a cerrar la grabación (como si el juego fallara), lo jugado ya está en disco y se reproduce."""
+    ruta = str(tmp_path / "partida.rep")
+    partida = Match("medio", 5)
+    grabador = ReplayRecorder.open(ruta, partida.seed, partida.dificultad)
+    entradas = [ENTRADA_ARRIBA if (paso // 100) % 2 else 0 for paso in range(500)]
+    for entrada in entradas:
+        grabador.record(entrada)
+        partida.step(entrada)
+
+    repeticion = Replay.load(ruta)
+    assert repeticion.resultado is None
+    # Como mucho se pierde el último volcado
+    assert 500 - 60 <= repeticion.pasos <= 500
+    hasta_el_corte = Match("medio", 5)
+    for entrada in entradas[:repeticion.pasos]:
+        hasta_el_corte.step(entrada)
+    assert reproducir_sin_ventana(repeticion).ball.rect == hasta_el_corte.ball.rect
+
+    grabador.close(partida.puntuacion_jugador, partida.puntuacion_oponente)
+    repeticion = Replay.load(ruta)
+    assert repeticion.pasos == 500
+    assert reproducir_sin_ventana(repeticion).ball.rect == partida.ball.rect
+
+
+def test_repeticion_invalida():
+    """Un archivo que no es una repetición produce ReplayError."""
+    with pytest.raises(ReplayError):
+        Replay.frombytes(b"esto no es una repeticion")
@@ -0,0 +1,41 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Match
+from simulacion import VectorizedMatches
+
+
+def test_simulacion_igual_que_match_step():
+    """El simulador vectorizado reproduce paso a paso Match.step, colisiones continuas incluidas."""
+    for seed in range(4):
+        partida = Match("medio", seed=seed, efectos=False, jugador_ia=("medio", "perseguidora"))
+        # Sin desvío, para que los generadores aleatorios de cada uno no cuenten
+        partida.player.punteria = partida.opponent.punteria = 0
+        sim = VectorizedMatches(1, dificultad="medio", velocidad_jugador=7, seed=0, frames_espera=0, punteria=0)
+        sim.speed_x[0], sim.speed_y[0] = partida.ball.speed_x, partida.ball.speed_y
+        for _ in range(3000):
+            punto_partida = partida.step(0)
+            punto = sim.step()
+            assert punto_partida == punto[0]
+            if punto_partida:
+                break
+            assert (partida.ball.rect.x, partida.ball.rect.y) == (sim.ball_x[0], sim.ball_y[0])
+            assert (partida.player.rect.y, partida.opponent.rect.y) == (sim.player_y[0], sim.opponent_y[0])
+            assert np.isclose(partida.ball.speed_x, sim.speed_x[0])
+            assert np.isclose(partida.ball.speed_y, sim.speed_y[0])
+        assert partida.golpes + sum(partida.rallies) > 0
+
+
+def test_simulacion_termina_las_partidas():
+    """Con el desvío de la perseguidora, las partidas terminan también entre palas que persiguen la bola."""
+    sim = VectorizedMatches(48, dificultad=["facil", "medio", "dificil"] * 16, seed=1)
+    assert sim.run(max_frames=20000).all()
+    assert ((sim.puntuacion_jugador == 5) | (sim.puntuacion_oponente == 5)).all()
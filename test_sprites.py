@@ -0,0 +1,48 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+import pygame
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Ball, LONGITUD_ESTELA
+from sprites import SpriteCache
+
+pygame.init()
+
+
+def test_sprite_cache_reutiliza_superficies():
+    """Pedir dos veces el mismo sprite devuelve la misma superficie."""
+    cache = SpriteCache()
+    assert cache.ellipse(20, 20, (255, 255, 255)) is cache.ellipse(20, 20, (255, 255, 255))
+    niveles = cache.fade_levels(20, 20, 10)
+    assert len(niveles) == 10
+    assert niveles is cache.fade_levels(20, 20, 10)
+
+
+def test_estela_limitada():
+    """La estela nunca guarda más de LONGITUD_ESTELA posiciones."""
+    ball = Ball(100, 100, 20, 7)
+    for _ in range(LONGITUD_ESTELA * 3):
+        ball.move()
+    assert len(ball.trail) == LONGITUD_ESTELA
+    ball.reset()
+    assert len(ball.trail) == 0
+
+
+def test_ball_draw_con_estela():
+    """La bola y su estela se dibujan copiando sprites de la caché."""
+    pantalla = pygame.Surface((800, 600))
+    ball = Ball(100, 100, 20, 7)
+    # Velocidad fija y mayor que el tamaño para que las posiciones no se solapen
+    ball.speed_x, ball.speed_y = 30, 0
+    for _ in range(5):
+        ball.move()
+    ball.draw(pantalla)
+    assert pantalla.get_at(ball.rect.center)[:3] == (255, 255, 255)
+    x, y = ball.trail[0]
+    assert pantalla.get_at((x + 10, y + 10))[:3] == (42, 42, 42)
@@ -0,0 +1,89 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+
+import pygame
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from textos import TextCache, LazyFont, guardar_atlas
+
+pygame.init()
+
+
+@pytest.fixture
+def fuente():
+    """Fixture con la fuente por defecto de pygame."""
+    return pygame.font.Font(None, 24)
+
+
+def test_text_cache_reutiliza_el_render(fuente):
+    """El mismo texto con la misma fuente y color solo se rasteriza una vez."""
+    cache = TextCache()
+    primero = cache.render(fuente, "PAUSA", True, (255, 255, 255))
+    segundo = cache.render(fuente, "PAUSA", True, (255, 255, 255))
+    assert primero is segundo
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Cambiar el color produce una superficie distinta
+    assert cache.render(fuente, "PAUSA", True, (0, 0, 0)) is not primero
+
+
+def test_text_cache_expulsa_el_menos_usado(fuente):
+    """Al superar la capacidad se expulsa el texto usado hace más tiempo."""
+    cache = TextCache(capacity=2)
+    cache.render(fuente, "0", False, (255, 255, 255))
+    cache.render(fuente, "1", False, (255, 255, 255))
+    cache.render(fuente, "0", False, (255, 255, 255))
+    cache.render(fuente, "2", False, (255, 255, 255))
+    assert len(cache) == 2
+    misses = cache.misses
+    cache.render(fuente, "0", False, (255, 255, 255))
+    assert cache.misses == misses
+    cache.render(fuente, "1", False, (255, 255, 255))
+    assert cache.misses == misses + 1
+
+
+def sobre_gris(superficie):
+    """Píxeles de `superficie` dibujada sobre un fondo gris, como se vería en pantalla."""
+    fondo = pygame.Surface(superficie.get_size())
+    fondo.fill((128, 128, 128))
+    fondo.blit(superficie, (0, 0))
+    return pygame.image.tobytes(fondo, "RGB")
+
+
+def test_atlas_evita_cargar_las_fuentes(tmp_path):
+    """Los textos del atlas salen iguales que rasterizados y la fuente no llega a cargarse."""
+    textos = [("titulo", "TENIS", True, (255, 255, 255)), ("boton", "Jugar", True, (0, 0, 0)),
+              ("titulo", "3", False, (255, 255, 255))]
+    referencia = {"titulo": pygame.font.Font(None, 74), "boton": pygame.font.Font(None, 50)}
+    imagen, indice = str(tmp_path / "atlas.bmp"), str(tmp_path / "atlas.json")
+    guardar_atlas(textos, referencia, imagen, indice)
+
+    fuentes = {"titulo": LazyFont(74), "boton": LazyFont(50)}
+    cache = TextCache()
+    assert cache.load_atlas(imagen, indice, fuentes) == len(textos)
+    for nombre, texto, antialias, color in textos:
+        superficie = cache.render(fuentes[nombre], texto, antialias, color)
+        esperada = referencia[nombre].render(texto, antialias, color)
+        assert superficie.get_size() == esperada.get_size()
+        assert sobre_gris(superficie) == sobre_gris(esperada)
+    assert cache.misses == 0
+    assert not any(fuente.loaded for fuente in fuentes.values())
+
+    # Un texto que no está en el atlas sí carga la fuente
+    cache.render(fuentes["boton"], "Otro", True, (0, 0, 0))
+    assert fuentes["boton"].loaded and not fuentes["titulo"].loaded
+
+
+def test_atlas_del_juego_al_dia():
+    """El atlas incluido tiene exactamente los textos de TEXTOS_ATLAS (si no: python textos.py)."""
+    import json
+    from main import TEXTOS_ATLAS, RUTA_INDICE_ATLAS
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), RUTA_INDICE_ATLAS), encoding="utf-8") as archivo:
+        entradas = json.load(archivo)
+    incluidos = [(e["fuente"], e["texto"], e["antialias"], tuple(e["color"])) for e in entradas]
+    assert incluidos == list(TEXTOS_ATLAS)
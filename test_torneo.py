@@ -0,0 +1,54 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+
+import sys
+import os
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from main import Match
+from torneo import jugar_lote, percentil, resumir
+
+
+def test_percentil_de_histograma():
+    """El percentil se calcula sobre las frecuencias del histograma."""
+    histograma = Counter({1: 5, 2: 3, 10: 2})
+    assert percentil(histograma, 0.5) == 1
+    assert percentil(histograma, 0.9) == 10
+    assert percentil(Counter(), 0.5) == 0
+
+
+def test_jugar_lote_es_reproducible():
+    """El mismo lote con las mismas semillas da exactamente el mismo resultado."""
+    izquierda, derecha = ("facil", "perseguidora"), ("dificil", "predictiva")
+    a = jugar_lote(izquierda, derecha, [1, 2], max_pasos=3000)
+    b = jugar_lote(izquierda, derecha, [1, 2], max_pasos=3000)
+    assert a == b
+    assert a["victorias_izquierda"] + a["victorias_derecha"] + a["sin_terminar"] == 2
+
+    resumen = resumir([a])
+    assert resumen["participantes"]["facil/perseguidora"]["partidas"] == 2
+    assert resumen["emparejamientos"][0]["izquierda"] == "facil/perseguidora"
+
+
+def test_partidas_sin_terminar_van_aparte():
+    """Las partidas que llegan al límite de pasos no cuentan en victorias, puntos ni rallies."""
+    lote = jugar_lote(("medio", "perseguidora"), ("dificil", "perseguidora"), [3, 4], max_pasos=100)
+    assert (lote["sin_terminar"], lote["puntos"], lote["segundos"], lote["rallies"]) == (2, 0, 0.0, Counter())
+    participante = resumir([lote])["participantes"]["medio/perseguidora"]
+    assert participante["partidas"] == 2 and participante["sin_terminar"] == 2
+    assert participante["porcentaje_victorias"] == 0.0
+
+
+def test_partida_sin_efectos_es_identica():
+    """Desactivar las partículas no cambia la física de la partida."""
+    con, sin = Match("medio", seed=7), Match("medio", seed=7, efectos=False)
+    for paso in range(3000):
+        entrada = (paso // 40) % 3
+        con.step(entrada)
+        sin.step(entrada)
+    assert sin.particles is None
+    assert (con.ball.rect, con.puntuacion_jugador, con.puntuacion_oponente) == \
+           (sin.ball.rect, sin.puntuacion_jugador, sin.puntuacion_oponente)
@@ -0,0 +1,137 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Caché de textos renderizados.
+
+`Font.render` rasteriza el texto cada vez que se llama. Como la mayoría de
+los textos de la interfaz no cambian entre fotogramas, guardamos la
+superficie resultante y solo volvemos a renderizar cuando cambia el texto
+(por ejemplo, cuando cambia una puntuación).
+
+Los textos fijos de los menús pueden venir ya rasterizados en un atlas (una
+imagen con todos ellos y un índice JSON de dónde está cada uno): así el primer
+fotograma no tiene que cargar las fuentes ni rasterizar nada. El atlas es un
+BMP de 32 bits con alfa porque lo carga SDL directamente; un PNG ocuparía
+menos, pero cargar el primero obliga a inicializar libpng, que tarda más que
+rasterizar los textos.
+"""
+import json
+from collections import OrderedDict
+
+import pygame
+
+
+class LazyFont:
+    """
+    Fuente que no se carga hasta que se usa por primera vez. Se usa igual que
+    `pygame.font.Font(ruta, size)`; si todos sus textos están en la caché, no se
+    llega a cargar nunca.
+    """
+    def __init__(self, size, ruta=None):
+        self.tamano = size
+        self.ruta = ruta
+        self._font = None
+
+    @property
+    def loaded(self):
+        return self._font is not None
+
+    @property
+    def font(self):
+        if self._font is None:
+            self._font = pygame.font.Font(self.ruta, self.tamano)
+        return self._font
+
+    def __getattr__(self, nombre):
+        # render, get_linesize, size... se delegan en la fuente real
+        return getattr(self.font, nombre)
+
+
+class TextCache:
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self._superficies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        """Mismo uso que `font.render(text, antialias, color)`, pero con caché."""
+        clave = (font, text, antialias, color)
+        superficie = self._superficies.get(clave)
+        if superficie is not None:
+            self._superficies.move_to_end(clave)
+            self.hits += 1
+            return superficie
+
+        self.misses += 1
+        superficie = font.render(text, antialias, color)
+        self._superficies[clave] = superficie
+        # Expulsamos el texto usado hace más tiempo si superamos la capacidad
+        if len(self._superficies) > self.capacity:
+            self._superficies.popitem(last=False)
+        return superficie
+
+    def load_atlas(self, ruta_imagen, ruta_indice, fuentes):
+        """
+        Añade a la caché los textos de un atlas creado con `guardar_atlas`. `fuentes`
+        es el diccionario de fuentes del juego (las claves del índice son sus nombres).
+        Devuelve cuántos textos se han cargado; si falta el atlas, no carga ninguno.
+        """
+        try:
+            with open(ruta_indice, encoding="utf-8") as archivo:
+                entradas = json.load(archivo)
+            atlas = pygame.image.load(ruta_imagen)
+        except (OSError, ValueError, pygame.error):
+            return 0
+        for entrada in entradas:
+            fuente = fuentes.get(entrada["fuente"])
+            if fuente is None:
+                continue
+            clave = (fuente, entrada["texto"], entrada["antialias"], tuple(entrada["color"]))
+            self._superficies[clave] = atlas.subsurface(entrada["rect"])
+        return len(entradas)
+
+    def clear(self):
+        self._superficies.clear()
+
+    def __len__(self):
+        return len(self._superficies)
+
+
+def guardar_atlas(textos, fuentes, ruta_imagen, ruta_indice):
+    """
+    Rasteriza `textos` (tuplas (nombre de fuente, texto, antialias, color)) en una
+    sola imagen y guarda en `ruta_indice` dónde está cada uno.
+    """
+    superficies = [fuentes[nombre].render(texto, antialias, color) for nombre, texto, antialias, color in textos]
+    # Se colocan en filas, de los más altos a los más bajos, sin pasar del ancho del más largo
+    ancho = max(superficie.get_width() for superficie in superficies)
+    rects = [None] * len(superficies)
+    x = y = alto_fila = 0
+    for i in sorted(range(len(superficies)), key=lambda i: -superficies[i].get_height()):
+        w, h = superficies[i].get_size()
+        if x + w > ancho:
+            x, y, alto_fila = 0, y + alto_fila, 0
+        rects[i] = [x, y, w, h]
+        x += w
+        alto_fila = max(alto_fila, h)
+    atlas = pygame.Surface((ancho, y + alto_fila), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    entradas = []
+    for (nombre, texto, antialias, color), superficie, rect in zip(textos, superficies, rects):
+        atlas.blit(superficie, rect[:2])
+        entradas.append({"fuente": nombre, "texto": texto, "antialias": antialias, "color": list(color),
+                         "rect": rect})
+    pygame.image.save(atlas, ruta_imagen)
+    with open(ruta_indice, "w", encoding="utf-8") as archivo:
+        # Una entrada por línea, para que los cambios se lean bien en un diff
+        archivo.write("[\n" + ",\n".join(json.dumps(entrada, ensure_ascii=False) for entrada in entradas) + "\n]\n")
+
+
+if __name__ == '__main__':
+    # Vuelve a generar el atlas de los menús (p. ej. tras cambiar un texto de TEXTOS_ATLAS)
+    pygame.font.init()
+    from main import TEXTOS_ATLAS, RUTA_ATLAS, RUTA_INDICE_ATLAS, cargar_fuentes
+    guardar_atlas(TEXTOS_ATLAS, cargar_fuentes(), RUTA_ATLAS, RUTA_INDICE_ATLAS)
+    print(f"{len(TEXTOS_ATLAS)} textos guardados en {RUTA_ATLAS}")
@@ -0,0 +1,189 @@
+# Copyright (c) 2024 abel
+# Este software se distribuye bajo la Licencia MIT.
+# Ver el archivo LICENSE para más detalles.
+"""
+Torneo de IA contra IA para equilibrar las dificultades.
+
+Cada participante es una combinación de nivel de `DIFICULTADES` y tipo de IA
+(`IAS`). Todos juegan contra todos, en los dos lados del campo, partidas
+completas hasta `PUNTUACION_GANADORA` sin ventana. Las partidas se reparten
+entre los núcleos con un pool de procesos; cada una tiene su propia semilla,
+así que el torneo completo es reproducible.
+
+    python torneo.py --partidas 200 --salida torneo.json
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from main import Match, DIFICULTADES, IAS, PASOS_POR_SEGUNDO, SEGUNDOS_ESPERA_PUNTO
+
+# Límite de una partida (en pasos) por si dos IAs no consiguen terminarla. Con el desvío de la
+# perseguidora (PUNTERIA_PERSEGUIDORA) las partidas duran unos pocos minutos de juego.
+MAX_PASOS_PARTIDA = 10 * 60 * PASOS_POR_SEGUNDO
+
+
+def participantes():
+    return [(dificultad, ia) for dificultad in DIFICULTADES for ia in IAS]
+
+
+def nombre(participante):
+    return f"{participante[0]}/{participante[1]}"
+
+
+def jugar_lote(izquierda, derecha, semillas, max_pasos):
+    """
+    Juega en un proceso del pool todas las partidas de `semillas` entre dos
+    participantes y devuelve el resultado ya agregado, para enviar poco entre procesos.
+    Las partidas que llegan a `max_pasos` solo se cuentan en "sin_terminar": no entran
+    en los puntos, el tiempo ni los rallies, para no sesgar las cifras de las demás.
+    """
+    resultado = {
+        "izquierda": izquierda, "derecha": derecha,
+        "victorias_izquierda": 0, "victorias_derecha": 0, "sin_terminar": 0,
+        "puntos": 0, "segundos": 0.0, "rallies": Counter(),
+    }
+    for seed in semillas:
+        partida = Match(izquierda[0], seed, izquierda[1], jugador_ia=derecha, efectos=False)
+        while partida.ganador() is None and partida.pasos < max_pasos:
+            partida.step(0)
+
+        ganador = partida.ganador()
+        if ganador is None:
+            resultado["sin_terminar"] += 1
+            continue
+        if ganador == "oponente":
+            resultado["victorias_izquierda"] += 1
+        else:
+            resultado["victorias_derecha"] += 1
+        puntos = partida.puntuacion_jugador + partida.puntuacion_oponente
+        resultado["puntos"] += puntos
+        # Se suma la pausa tras cada punto para calcular los puntos por minuto reales
+        resultado["segundos"] += partida.pasos / PASOS_POR_SEGUNDO + puntos * SEGUNDOS_ESPERA_PUNTO
+        resultado["rallies"].update(partida.rallies)
+    return resultado
+
+
+def percentil(histograma, fraccion):
+    """Percentil de un histograma {valor: frecuencia}."""
+    total = sum(histograma.values())
+    if total == 0:
+        return 0
+    acumulado = 0
+    for valor in sorted(histograma):
+        acumulado += histograma[valor]
+        if acumulado >= fraccion * total:
+            return valor
+    return max(histograma)
+
+
+def resumir(lotes):
+    """Une los resultados de todos los lotes por emparejamiento y por participante."""
+    emparejamientos = {}
+    por_participante = {nombre(p): {"terminadas": 0, "victorias": 0, "sin_terminar": 0,
+                                    "puntos": 0, "segundos": 0.0, "rallies": Counter()}
+                        for p in participantes()}
+
+    for lote in lotes:
+        clave = (nombre(lote["izquierda"]), nombre(lote["derecha"]))
+        total = emparejamientos.setdefault(clave, {"victorias_izquierda": 0, "victorias_derecha": 0,
+                                                   "sin_terminar": 0, "puntos": 0, "segundos": 0.0,
+                                                   "rallies": Counter()})
+        for campo in ("victorias_izquierda", "victorias_derecha", "sin_terminar", "puntos", "segundos"):
+            total[campo] += lote[campo]
+        total["rallies"].update(lote["rallies"])
+
+        terminadas = lote["victorias_izquierda"] + lote["victorias_derecha"]
+        for lado, victorias in ((clave[0], "victorias_izquierda"), (clave[1], "victorias_derecha")):
+            estadisticas = por_participante[lado]
+            estadisticas["terminadas"] += terminadas
+            estadisticas["victorias"] += lote[victorias]
+            estadisticas["sin_terminar"] += lote["sin_terminar"]
+            estadisticas["puntos"] += lote["puntos"]
+            estadisticas["segundos"] += lote["segundos"]
+            estadisticas["rallies"].update(lote["rallies"])
+
+    def estadisticas_rally(rallies):
+        total = sum(rallies.values())
+        return {
+            "media": sum(v * n for v, n in rallies.items()) / total if total else 0.0,
+            "p50": percentil(rallies, 0.5),
+            "p90": percentil(rallies, 0.9),
+            "max": max(rallies) if rallies else 0,
+            "histograma": {str(v): rallies[v] for v in sorted(rallies)},
+        }
+
+    return {
+        "participantes": {
+            participante: {
+                "partidas": e["terminadas"] + e["sin_terminar"],
+                # Solo sobre las partidas terminadas
+                "porcentaje_victorias": e["victorias"] / e["terminadas"] if e["terminadas"] else 0.0,
+                "sin_terminar": e["sin_terminar"],
+                "puntos_por_minuto": e["puntos"] / (e["segundos"] / 60) if e["segundos"] else 0.0,
+                "rallies": estadisticas_rally(e["rallies"]),
+            }
+            for participante, e in por_participante.items()
+        },
+        "emparejamientos": [
+            {
+                "izquierda": izquierda, "derecha": derecha,
+                "victorias_izquierda": e["victorias_izquierda"],
+                "victorias_derecha": e["victorias_derecha"],
+                "sin_terminar": e["sin_terminar"],
+                "puntos_por_minuto": e["puntos"] / (e["segundos"] / 60) if e["segundos"] else 0.0,
+                "rallies": estadisticas_rally(e["rallies"]),
+            }
+            for (izquierda, derecha), e in emparejamientos.items()
+        ],
+    }
+
+
+def ejecutar(partidas, procesos=None, semilla=0, max_pasos=MAX_PASOS_PARTIDA, tamano_lote=10):
+    """Juega el torneo completo y devuelve el resumen."""
+    tareas = []
+    siguiente_semilla = semilla
+    for izquierda, derecha in itertools.permutations(participantes(), 2):
+        semillas = list(range(siguiente_semilla, siguiente_semilla + partidas))
+        siguiente_semilla += partidas
+        for inicio in range(0, partidas, tamano_lote):
+            tareas.append((izquierda, derecha, semillas[inicio:inicio + tamano_lote], max_pasos))
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        lotes = list(pool.map(jugar_lote, *zip(*tareas)))
+    return resumir(lotes)
+
+
+def imprimir(resumen):
+    print(f"{'participante':<26}{'victorias':>10}{'sin terminar':>14}{'puntos/min':>12}"
+          f"{'rally medio':>13}{'rally p90':>11}")
+    for participante, e in sorted(resumen["participantes"].items(),
+                                  key=lambda item: -item[1]["porcentaje_victorias"]):
+        print(f"{participante:<26}{e['porcentaje_victorias']:>10.1%}{e['sin_terminar']:>14}"
+              f"{e['puntos_por_minuto']:>12.2f}{e['rallies']['media']:>13.2f}{e['rallies']['p90']:>11}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Torneo de IA contra IA para equilibrar las dificultades")
+    parser.add_argument("--partidas", type=int, default=50,
+                        help="partidas por emparejamiento (y por lado del campo)")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla de la primera partida")
+    parser.add_argument("--max-pasos", type=int, default=MAX_PASOS_PARTIDA,
+                        help="pasos máximos por partida antes de darla por no terminada")
+    parser.add_argument("--salida", metavar="ARCHIVO", help="guarda el resumen completo en JSON")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumen = ejecutar(args.partidas, args.procesos, args.semilla, args.max_pasos)
+    imprimir(resumen)
+    print(f"\nTorneo completado en {time.perf_counter() - inicio:.1f} s con {args.procesos or os.cpu_count()} procesos")
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(resumen, archivo, indent=2)